@@ -0,0 +1,75 @@
+"""
+Таймер обновления виджета с адаптивным интервалом (core/cadence.py): стоит или тикает
+реже, пока виджет скрыт или окно свёрнуто, чаще - на всплесках нагрузки
+"""
+from typing import Any, Callable, Dict, Optional
+
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QWidget
+
+from core.cadence import Cadence
+
+
+class AdaptiveTimer(QObject):
+    """QTimer, следящий за показом widget; интервалы в миллисекундах"""
+
+    def __init__(self, widget: QWidget, callback: Callable[[], None], interval_ms: int,
+                 hidden_ms: Optional[int] = None, fast_ms: Optional[int] = None):
+        super().__init__(widget)
+        self.widget = widget
+        self.callback = callback
+        # hidden_ms=None - в скрытом виджете таймер стоит; спрос клиентов здесь не нужен
+        self.cadence = Cadence(interval_ms / 1000,
+                               idle_interval=hidden_ms / 1000 if hidden_ms else None,
+                               fast_interval=fast_ms / 1000 if fast_ms else None,
+                               idle_after=None)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(callback)
+        self.active = False
+        widget.installEventFilter(self)
+
+    def start(self):
+        self.active = True
+        self.cadence.set_hidden(not self.is_shown())
+        self.apply()
+
+    def stop(self):
+        self.active = False
+        self.timer.stop()
+
+    def is_shown(self) -> bool:
+        return self.widget.isVisible() and not self.widget.window().isMinimized()
+
+    def apply(self):
+        """Интервал текущего режима; None - таймер стоит до показа виджета"""
+        mode, interval = self.cadence.current()
+        if not self.active or interval is None:
+            self.timer.stop()
+        else:
+            self.timer.start(int(interval * 1000))
+
+    def observe(self, cpu: Optional[float], ram: Optional[float] = None):
+        """Замер нагрузки из обработчика таймера: на всплеске обновления чаще"""
+        if self.cadence.observe(cpu, ram):
+            self.apply()
+
+    def eventFilter(self, watched, event) -> bool:
+        # Сворачивание окна приходит дочерним виджетам спонтанным Hide, восстановление - Show
+        if event.type() in (QEvent.Type.Show, QEvent.Type.Hide):
+            hidden = event.type() == QEvent.Type.Hide or not self.is_shown()
+            if self.cadence.set_hidden(hidden):
+                self.apply()
+                if not hidden and self.active:
+                    # После показа - сразу свежие данные, не дожидаясь тика
+                    self.callback()
+        return False
+
+    def describe(self) -> str:
+        """Режим и интервал для подсказок интерфейса"""
+        mode, interval = self.cadence.current()
+        if interval is None:
+            return f"обновление приостановлено ({mode})"
+        return f"обновление каждые {interval:g} с ({mode})"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.cadence.get_stats(), active=self.active)
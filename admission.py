@@ -0,0 +1,314 @@
+"""
+Контроль допуска запросов: token bucket по клиентам и маршрутам, лимиты параллельности
+по классам маршрутов и сброс низкоприоритетной нагрузки при перегрузке бэкенда
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import psutil
+
+# Класс маршрута по правилу Flask; остальные маршруты - normal
+ROUTE_CLASSES = {
+    '/api/command': 'critical',
+    '/api/health': 'critical',
+    '/api/ready': 'critical',
+    '/api/ai/chat': 'interactive',
+    '/api/skills/jobs/<job_id>': 'interactive',
+    # Долгие соединения (SSE и long-poll до 30 с) почти не нагружают CPU, но держат поток:
+    # у них свой лимит, чтобы ждущие клиенты не занимали места обычного чата
+    '/api/ai/chat/stream': 'streaming',
+    '/api/ai/jobs/<job_id>': 'streaming',
+    '/api/system/processes': 'heavy',
+    '/api/ai/analyze': 'heavy',
+    '/api/ai/summarize': 'heavy',
+    '/api/ai/translate': 'heavy',
+    '/api/ai/models/load': 'heavy',
+    '/api/knowledge/search': 'heavy',
+    '/api/knowledge/reindex': 'heavy',
+    '/api/system/metrics': 'background',
+    '/api/system/cadence': 'background',
+    '/api/metrics': 'background',
+    '/metrics': 'background',
+    '/api/debug/stats': 'background',
+    # Диагностика должна работать и при перегрузке; профилирование - по одному за раз
+    '/api/debug/admission': 'critical',
+    '/api/debug/profile': 'critical',
+    '/api/debug/memory': 'critical',
+    '/api/debug/memory/snapshot': 'critical',
+    '/api/debug/memory/trim': 'critical'
+}
+
+# Политика класса: concurrency - запросов в работе; client_rate и route_rate - (в секунду, запас)
+# для клиента на маршруте и для маршрута в целом; shed_level - уровень нагрузки, с которого
+# класс получает 503 (None - не сбрасывается никогда)
+CLASS_POLICIES = {
+    'critical': {'concurrency': None, 'client_rate': None, 'route_rate': None, 'shed_level': None},
+    'interactive': {'concurrency': 16, 'client_rate': (10, 20), 'route_rate': None, 'shed_level': 2},
+    'streaming': {'concurrency': 8, 'client_rate': (10, 20), 'route_rate': None, 'shed_level': 2},
+    'normal': {'concurrency': 16, 'client_rate': (20, 40), 'route_rate': None, 'shed_level': 2},
+    'heavy': {'concurrency': 2, 'client_rate': (2, 4), 'route_rate': (5, 10), 'shed_level': 1},
+    'background': {'concurrency': 4, 'client_rate': (10, 20), 'route_rate': None, 'shed_level': 1}
+}
+
+# Пороги нагрузки: CPU процесса бэкенда (% одного ядра) и задержка в очереди обработчиков
+CPU_ELEVATED = float(os.environ.get('RAVEN_SHED_CPU', 85))
+CPU_OVERLOADED = CPU_ELEVATED * 1.15
+QUEUE_ELEVATED_MS = float(os.environ.get('RAVEN_SHED_QUEUE_MS', 50))
+QUEUE_OVERLOADED_MS = QUEUE_ELEVATED_MS * 4
+RECOVERY_RATIO = 0.8  # уровень снижается, когда сигнал ниже порога * RECOVERY_RATIO
+LOAD_INTERVAL = 0.5
+QUEUE_EWMA_ALPHA = 0.2
+MAX_BUCKETS = 4096  # сверх лимита вытесняются давно не использованные вёдра (LRU)
+
+# Ключ environ со временем постановки запроса в очередь пула (asgi_server, ipc_transport)
+QUEUED_AT_KEY = 'raven.queued_at'
+
+LEVEL_NAMES = ('normal', 'elevated', 'overloaded')
+
+
+class TokenBucket:
+    """Ведро токенов: rate пополнений в секунду, не больше burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Взять токен; 0 - допущен, иначе секунды до следующего токена (вызывать под lock)"""
+        # now берётся до создания ведра, поэтому отрицательный интервал не списывает запас
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Rejection(Exception):
+    """Запрос не допущен: HTTP статус, причина и Retry-After"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def client_key(request) -> str:
+    """Ключ клиента для token bucket: все локальные клиенты (Electron, Qt, скрипты) приходят
+    с одного адреса, поэтому сначала заголовок клиента и сессия, адрес - в последнюю очередь"""
+    client = (request.headers.get('X-Client-Id') or request.headers.get('X-Session-Id')
+              or request.args.get('session_id'))
+    if client:
+        return f"client:{client[:64]}"
+    return f"addr:{request.remote_addr or 'unknown'}"
+
+
+class AdmissionController:
+    """Допуск запросов по классам маршрутов (хуки Flask before/teardown_request)"""
+
+    def __init__(self, policies: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.policies = policies or CLASS_POLICIES
+        self.buckets: Dict[Tuple[str, ...], TokenBucket] = OrderedDict()
+        self.in_flight = {name: 0 for name in self.policies}
+        self.admitted = {name: 0 for name in self.policies}
+        self.rejected: Dict[Tuple[str, str], int] = {}
+        self.process = psutil.Process()
+        self.process.cpu_percent(interval=None)
+        self.cpu_percent = 0.0
+        self.queue_ms = 0.0
+        self.level = 0
+        self.level_changed_at = time.time()
+        self.load_checked = time.monotonic()
+        self.collector_added = False
+        self.lock = threading.Lock()
+
+    def route_class(self, rule: Optional[str]) -> str:
+        return ROUTE_CLASSES.get(rule, 'normal') if rule else 'normal'
+
+    def observe_queue(self, queued_ms: float):
+        """Учёт ожидания запроса в очереди пула (скользящее среднее)"""
+        with self.lock:
+            self.queue_ms += (queued_ms - self.queue_ms) * QUEUE_EWMA_ALPHA
+
+    def update_load(self, now: float):
+        """Пересчёт уровня нагрузки не чаще LOAD_INTERVAL (вызывать под lock)"""
+        if now - self.load_checked < LOAD_INTERVAL:
+            return
+        self.load_checked = now
+        try:
+            self.cpu_percent = self.process.cpu_percent(interval=None)
+        except psutil.Error:
+            self.cpu_percent = 0.0
+
+        if self.cpu_percent >= CPU_OVERLOADED or self.queue_ms >= QUEUE_OVERLOADED_MS:
+            level = 2
+        elif self.cpu_percent >= CPU_ELEVATED or self.queue_ms >= QUEUE_ELEVATED_MS:
+            level = 1
+        else:
+            level = 0
+        if level < self.level:
+            # Гистерезис: уровень снижается, только когда оба сигнала заметно ниже порога
+            thresholds = ((CPU_ELEVATED, QUEUE_ELEVATED_MS), (CPU_OVERLOADED, QUEUE_OVERLOADED_MS))
+            cpu_limit, queue_limit = thresholds[self.level - 1]
+            if (self.cpu_percent > cpu_limit * RECOVERY_RATIO
+                    or self.queue_ms > queue_limit * RECOVERY_RATIO):
+                level = self.level
+        if level != self.level:
+            print(f"🚦 Нагрузка: {LEVEL_NAMES[self.level]} -> {LEVEL_NAMES[level]} "
+                  f"(CPU {self.cpu_percent:.0f}%, очередь {self.queue_ms:.1f} мс)")
+            self.level = level
+            self.level_changed_at = time.time()
+
+    def _bucket(self, key: Tuple[str, ...], rate: Tuple[float, float]) -> TokenBucket:
+        """Ведро по ключу в порядке последнего использования (вызывать под lock)"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            while len(self.buckets) >= MAX_BUCKETS:
+                self.buckets.popitem(last=False)
+            bucket = self.buckets[key] = TokenBucket(*rate)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, route_class: str, rule: str, client: str):
+        """Допуск запроса или Rejection; при допуске занимает место в классе"""
+        policy = self.policies[route_class]
+        now = time.monotonic()
+        with self.lock:
+            self.update_load(now)
+            try:
+                shed_level = policy['shed_level']
+                if shed_level is not None and self.level >= shed_level:
+                    raise Rejection(503, 'overload', LOAD_INTERVAL * 2 * self.level)
+                limit = policy['concurrency']
+                if limit is not None and self.in_flight[route_class] >= limit:
+                    raise Rejection(503, 'concurrency', 1)
+                if policy['route_rate'] is not None:
+                    wait = self._bucket(('route', rule), policy['route_rate']).take(now)
+                    if wait:
+                        raise Rejection(503, 'route_rate', wait)
+                if policy['client_rate'] is not None:
+                    wait = self._bucket((client, rule), policy['client_rate']).take(now)
+                    if wait:
+                        raise Rejection(429, 'client_rate', wait)
+            except Rejection as rejection:
+                key = (route_class, rejection.reason)
+                self.rejected[key] = self.rejected.get(key, 0) + 1
+                raise
+            self.in_flight[route_class] += 1
+            self.admitted[route_class] += 1
+
+    def release(self, route_class: str):
+        with self.lock:
+            self.in_flight[route_class] -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Уровень нагрузки, сигналы и счётчики по классам"""
+        with self.lock:
+            self.update_load(time.monotonic())
+            classes = {
+                name: {
+                    'in_flight': self.in_flight[name],
+                    'admitted': self.admitted[name],
+                    'rejected': {reason: count for (cls, reason), count in self.rejected.items()
+                                 if cls == name},
+                    'concurrency_limit': policy['concurrency'],
+                    'shed_level': policy['shed_level']
+                }
+                for name, policy in self.policies.items()
+            }
+            return {
+                'level': LEVEL_NAMES[self.level],
+                'level_since': self.level_changed_at,
+                'cpu_percent': round(self.cpu_percent, 1),
+                'queue_ms': round(self.queue_ms, 2),
+                'thresholds': {
+                    'cpu_percent': [CPU_ELEVATED, round(CPU_OVERLOADED, 1)],
+                    'queue_ms': [QUEUE_ELEVATED_MS, QUEUE_OVERLOADED_MS]
+                },
+                'buckets': len(self.buckets),
+                'classes': classes
+            }
+
+    def collect_metrics(self):
+        """Семейства метрик допуска для /metrics"""
+        stats = self.get_stats()
+        rejected = [('_total', {'class': name, 'reason': reason}, count)
+                    for name, info in sorted(stats['classes'].items())
+                    for reason, count in sorted(info['rejected'].items())]
+        return [
+            ('raven_admission_load_level', 'gauge',
+             'Backend load level (0 normal, 1 elevated, 2 overloaded).',
+             [('', {}, LEVEL_NAMES.index(stats['level']))]),
+            ('raven_admission_queue_seconds', 'gauge', 'Smoothed wait for a handler thread.',
+             [('', {}, stats['queue_ms'] / 1000.0)]),
+            ('raven_admission_in_flight', 'gauge', 'Admitted requests in progress by route class.',
+             [('', {'class': name}, info['in_flight'])
+              for name, info in sorted(stats['classes'].items())]),
+            ('raven_admission_rejected', 'counter', 'Requests rejected by route class and reason.',
+             rejected)
+        ]
+
+    def install(self, app):
+        """Хуки допуска (ставить после RequestMetrics.install, чтобы отказы попадали в статистику)"""
+        from flask import g, jsonify, request
+
+        @app.before_request
+        def admission_check():
+            queued_at = request.environ.get(QUEUED_AT_KEY)
+            if queued_at is not None:
+                self.observe_queue((time.perf_counter() - queued_at) * 1000)
+            rule = request.url_rule.rule if request.url_rule else None
+            route_class = self.route_class(rule)
+            try:
+                self.admit(route_class, rule or request.path, client_key(request))
+            except Rejection as rejection:
+                response = jsonify({
+                    'success': False,
+                    'error': 'Сервер перегружен, повторите позже'
+                    if rejection.status == 503 else 'Слишком много запросов',
+                    'reason': rejection.reason,
+                    'route_class': route_class
+                })
+                response.status_code = rejection.status
+                response.headers['Retry-After'] = str(rejection.retry_after)
+                return response
+            g.admission_class = route_class
+
+        @app.teardown_request
+        def admission_release(error=None):
+            route_class = g.pop('admission_class', None)
+            if route_class is not None:
+                self.release(route_class)
+
+        @app.route('/api/debug/admission', methods=['GET'])
+        def debug_admission():
+            """Уровень нагрузки и отказы по классам маршрутов"""
+            return jsonify(self.get_stats())
+
+        with self.lock:
+            if self.collector_added:
+                return
+            self.collector_added = True
+        from openmetrics import get_metrics_exporter
+        get_metrics_exporter().add_collector(self.collect_metrics)
+
+
+_default_controller = None
+_default_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Общий контроллер допуска"""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            _default_controller = AdmissionController()
+        return _default_controller
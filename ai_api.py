@@ -2,33 +2,137 @@
 API endpoints для AI Assistant
 """
 import json
+import os
+import tempfile
 import time
 from datetime import datetime
 from flask import jsonify, request
 import threading
 import queue
 
+from ai_jobs import AIJob, JobStore
+from ai_scheduler import PRIORITY_CLASSES, PriorityWorkQueue
+from chat_log import ChatHistoryStore, HistoryConnectionCache, parse_time
+from shared_state import create_context_store
+from memory_diagnostics import get_memory_diagnostics
+from model_registry import LatencyStats
+from openmetrics import get_metrics_exporter
+from singleflight import StreamKey, get_single_flight, make_key
+from streaming import sse_response
+from phrase_table import get_translator
+from request_metrics import collect_phases, merge_phases, phase
+from summarizer import DEFAULT_MAX_SENTENCES, summarize, summarize_batch
+from text_analytics import analyze_text_stream, decode_stream, iter_json_field
+
+MAX_CHAT_HISTORY = 100
+DEFAULT_AI_WORKERS = int(os.environ.get('RAVEN_AI_WORKERS', 2))
+DEFAULT_AI_QUEUE_SIZE = int(os.environ.get('RAVEN_AI_QUEUE_SIZE', 64))
+DEFAULT_BULK_WORKERS = int(os.environ.get('RAVEN_AI_BULK_WORKERS', max(1, DEFAULT_AI_WORKERS - 1)))
+MAX_LONG_POLL_SECONDS = 30
+SYNC_JOB_TIMEOUT = 60
+
+# Тексты длиннее порога обрабатываются как bulk, по чанкам
+BULK_TEXT_CHARS = 20000
+TEXT_CHUNK_CHARS = 64 * 1024
+# Тела запросов больше порога анализируются потоково, без загрузки в память
+STREAM_BODY_BYTES = 1024 * 1024
+MAX_SUMMARY_BATCH = 64
+
+
+def iter_file_chunks(file, size=TEXT_CHUNK_CHARS):
+    """Чтение текстового файла чанками с начала"""
+    file.seek(0)
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_text_chunks(text, size=TEXT_CHUNK_CHARS):
+    """Разбиение текста на чанки по границе пробела"""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            space = text.rfind(' ', start, end)
+            if space > start:
+                end = space + 1
+        yield text[start:end]
+        start = end
+
+
+def get_summary_budget(data):
+    """Бюджет длины резюме из запроса: max_sentences, max_chars, ratio"""
+    budget = {'max_sentences': int(data.get('max_sentences') or DEFAULT_MAX_SENTENCES)}
+    if data.get('max_chars'):
+        budget['max_chars'] = int(data['max_chars'])
+    if data.get('ratio'):
+        budget['ratio'] = min(max(float(data['ratio']), 0.01), 1.0)
+    return budget
+
+
+def get_session_id(data=None):
+    """ID сессии клиента из тела запроса, заголовка или параметров"""
+    if data and data.get('session_id'):
+        return str(data['session_id'])
+    return request.headers.get('X-Session-ID') or request.args.get('session_id')
+
 class AIAPI:
     """API для работы с искусственным интеллектом"""
     
-    def __init__(self, raven_ai):
+    def __init__(self, raven_ai, neural_core=None, workers=DEFAULT_AI_WORKERS,
+                 max_queue=DEFAULT_AI_QUEUE_SIZE, bulk_workers=DEFAULT_BULK_WORKERS):
         self.raven = raven_ai
-        self.chat_history = []
-        self.thinking_queue = queue.Queue()
+        self.neural_core = neural_core
+        self.raven_stats = LatencyStats()
+        self.history = ChatHistoryStore()
+        self.sessions = create_context_store('ai_contexts', capacity=MAX_CHAT_HISTORY)
+        
+        # Приоритетная очередь с ограниченной глубиной (backpressure) и пул обработчиков;
+        # bulk не занимает все потоки, чтобы interactive всегда находил свободный
+        self.workers = max(1, workers)
+        self.thinking_queue = PriorityWorkQueue(
+            maxsize=max_queue,
+            concurrency={'bulk': max(1, min(bulk_workers, self.workers))}
+        )
+        self.jobs = JobStore()
+        self.queue_wait_stats = LatencyStats()
+        self.service_stats = LatencyStats()
+        self.rejected_jobs = 0
+        self.single_flight = get_single_flight()
+        self.translator = get_translator()
+        get_metrics_exporter().add_collector(self.collect_metrics)
+        diagnostics = get_memory_diagnostics()
+        diagnostics.register('chat_history', HistoryConnectionCache(self.history))
+        diagnostics.register('ai_contexts', self.sessions)
+        diagnostics.register('phrase_cache', self.translator)
         self.setup_ai_threads()
     
     def setup_ai_threads(self):
         """Настройка потоков для обработки AI запросов"""
         self.is_processing = True
-        self.ai_thread = threading.Thread(target=self.process_ai_queue, daemon=True)
-        self.ai_thread.start()
+        self.ai_threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self.process_ai_queue, daemon=True,
+                                      name=f'raven-ai-worker-{i}')
+            thread.start()
+            self.ai_threads.append(thread)
+        self.ai_thread = self.ai_threads[0]
     
     def process_ai_queue(self):
         """Обработка очереди AI запросов"""
         while self.is_processing:
             try:
-                task = self.thinking_queue.get(timeout=0.5)
-                if task:
+                task, priority = self.thinking_queue.get_with_priority(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            try:
+                if isinstance(task, AIJob):
+                    self.run_job(task)
+                elif task:
                     task_id, message, callback = task
                     try:
                         # Обработка сообщения через ИИ
@@ -36,14 +140,214 @@ class AIAPI:
                         callback(task_id, response, True)
                     except Exception as e:
                         callback(task_id, str(e), False)
+            finally:
+                self.thinking_queue.task_done(priority)
+    
+    def collect_metrics(self):
+        """Глубина очереди AI и время ожидания/обработки для /metrics"""
+        queue_stats = self.thinking_queue.get_stats()
+        pending, running = [], []
+        for name in PRIORITY_CLASSES:
+            pending.append(('', {'priority': name}, queue_stats[name]['pending']))
+            running.append(('', {'priority': name}, queue_stats[name]['running']))
+        
+        timings = []
+        for stage, stats in (('wait', self.queue_wait_stats), ('service', self.service_stats)):
+            summary = stats.to_dict()
+            for key in ('avg_ms', 'p50_ms', 'p95_ms', 'max_ms'):
+                if summary[key] is not None:
+                    timings.append(('', {'stage': stage, 'stat': key[:-3]}, summary[key] / 1000.0))
+        
+        return [
+            ('raven_ai_queue_depth', 'gauge', 'AI jobs waiting in the queue by priority.', pending),
+            ('raven_ai_jobs_running', 'gauge', 'AI jobs being processed by priority.', running),
+            ('raven_ai_job_seconds', 'gauge', 'Recent AI job queue wait and service time.', timings),
+            ('raven_ai_jobs_rejected', 'counter', 'AI jobs rejected because the queue was full.',
+             [('_total', {}, self.rejected_jobs)]),
+            ('raven_chat_history_entries', 'gauge', 'Persisted chat history records.',
+             [('', {}, self.history.count())])
+        ]
+    
+    def run_job(self, job):
+        """Выполнение задачи из очереди с учётом времени ожидания и обработки"""
+        job.started_at = time.time()
+        job.status = 'running'
+        self.queue_wait_stats.record(job.wait_ms)
+        try:
+            with collect_phases(job.phases):
+                result = self.execute_job(job)
+            job.finish(result=result)
+        except Exception as e:
+            job.finish(error=str(e))
+        self.service_stats.record(job.service_ms, ok=job.status == 'done')
+    
+    def execute_job(self, job):
+        """Выполнение задачи по её виду (в обработчике очереди)"""
+        if job.kind == 'analyze' and 'file' in job.payload:
+            # Загруженное потоком тело: задача владеет временным файлом
+            with job.payload['file'] as file:
+                return analyze_text_stream(iter_file_chunks(file), self.checkpoint)
+        if job.kind == 'analyze':
+            return self.analyze_text(job.payload['text'], self.checkpoint)
+        if job.kind == 'summarize' and 'texts' in job.payload:
+            return summarize_batch(job.payload['texts'], checkpoint=self.checkpoint,
+                                   **job.payload.get('budget', {}))
+        if job.kind == 'summarize':
+            return self.summarize_text(job.payload['text'], self.checkpoint,
+                                       job.payload.get('budget'))
+        # Обычный и потоковый чат идут через один движок; различается только доставка
+        response = None
+        for event, data in self.chat_events(job):
+            if event == 'done':
+                response = data['response']
+            if job.kind == 'chat_stream':
+                job.events.put((event, data))
+        return response
+    
+    def checkpoint(self):
+        """Граница чанка длинной задачи: сначала выполняем ожидающие interactive"""
+        while True:
+            task = self.thinking_queue.take_interactive()
+            if task is None:
+                return
+            try:
+                self.run_job(task)
+            finally:
+                self.thinking_queue.task_done('interactive')
+    
+    def submit_job(self, job):
+        """Постановка задачи в очередь; queue.Full если очередь переполнена"""
+        self.jobs.add(job)
+        try:
+            self.thinking_queue.put_nowait(job, job.priority)
+        except queue.Full:
+            self.jobs.remove(job.job_id)
+            self.rejected_jobs += 1
+            raise
+        return job
+    
+    def run_job_sync(self, job, timeout=SYNC_JOB_TIMEOUT):
+        """Постановка задачи и ожидание результата; queue.Full если очередь переполнена"""
+        self.submit_job(job)
+        if job.done_event.wait(timeout):
+            merge_phases(job.phases)
+        return job
+    
+    def queue_full_response(self):
+        """Ответ 429 при переполненной очереди"""
+        response = jsonify({
+            'success': False,
+            'error': 'AI queue is full',
+            'queue_size': self.thinking_queue.qsize()
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    
+    def pending_job_response(self, job):
+        """Ответ 202 для задачи, не успевшей завершиться"""
+        return jsonify({
+            'success': True,
+            'job_id': job.job_id,
+            'status': job.status
+        }), 202
+    
+    def stream_chat(self, job):
+        """Потоковая обработка сообщения: события accepted, intent, skill, chunk, done
+        (генерирует обработчик очереди, здесь - только передача событий клиенту)"""
+        yield 'accepted', {'message': job.message, 'model': job.model,
+                           'session_id': job.session_id, 'job_id': job.job_id}
+        while True:
+            try:
+                item = job.events.get(timeout=SYNC_JOB_TIMEOUT)
             except queue.Empty:
-                continue
+                raise TimeoutError(f'Нет ответа за {SYNC_JOB_TIMEOUT} с')
+            if item is None:
+                break
+            yield item
+        merge_phases(job.phases)
+        if job.status == 'error':
+            raise RuntimeError(job.error)
+    
+    def chat_events(self, job):
+        """События ответа на сообщение чата: intent, skill, chunk по мере готовности текста
+        и итоговый done. Движок выбирается по модели задачи, ответ пишется в историю"""
+        message, model, settings, session_id = job.message, job.model, job.settings, job.session_id
+        if model == 'neural_core' and self.neural_core:
+            for event, data in self.neural_core.process_query_stream(message, None, session_id):
+                if event == 'done':
+                    self.record_chat(message, data['response'], model, settings, session_id)
+                    data = dict(data, model=model)
+                yield event, data
+            return
+        
+        response = self.process_ai_message(message)
+        yield 'chunk', {'text': response}
+        self.record_chat(message, response, model, settings, session_id)
+        yield 'done', {
+            'response': response,
+            'model': model,
+            'session_id': session_id,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def analyze_text(self, text, checkpoint=None):
+        """Анализ текста по чанкам (checkpoint вызывается между чанками)"""
+        return analyze_text_stream(iter_text_chunks(text), checkpoint)
+    
+    def spool_request_text(self):
+        """Текст тела запроса (text/plain или поле text JSON) во временный файл за один
+        проход: в памяти не больше STREAM_BODY_BYTES, ключ single-flight считается по ходу.
+        Возвращает файл, число символов и ключ"""
+        chunks = decode_stream(request.stream)
+        if request.is_json:
+            chunks = iter_json_field(chunks, 'text')
+        spool = tempfile.SpooledTemporaryFile(max_size=STREAM_BODY_BYTES, mode='w+',
+                                              encoding='utf-8')
+        key = StreamKey('analyze')
+        characters = 0
+        try:
+            for chunk in chunks:
+                spool.write(chunk)
+                key.update(chunk)
+                characters += len(chunk)
+        except Exception:
+            spool.close()
+            raise
+        return spool, characters, key.key()
+    
+    def summarize_text(self, text, checkpoint=None, budget=None):
+        """Экстрактивная суммаризация TextRank с бюджетом длины"""
+        return summarize(text, checkpoint=checkpoint, **(budget or {}))
+    
+    def record_chat(self, message, response, model, settings, session_id):
+        """Сохранение обмена сообщениями в историю"""
+        chat_entry = {
+            'user': message,
+            'ai': response,
+            'model': model,
+            'settings': settings,
+            'session_id': session_id,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        # Журнал на диске хранит всю историю, хранилище сессий - недавний контекст
+        chat_entry['id'] = self.history.append(chat_entry)
+        self.sessions.append(session_id, chat_entry)
+        return chat_entry
     
     def process_ai_message(self, message):
         """Обработка сообщения через ИИ"""
         # Используем существующий raven_ai для обработки
         if hasattr(self.raven, 'process_command'):
-            return self.raven.process_command(message)
+            start = time.perf_counter()
+            try:
+                with phase('skill'):
+                    response = self.raven.process_command(message)
+            except Exception:
+                self.raven_stats.record((time.perf_counter() - start) * 1000, ok=False)
+                raise
+            self.raven_stats.record((time.perf_counter() - start) * 1000)
+            return response
         
         # Fallback обработка
         return self.fallback_ai_response(message)
@@ -94,6 +398,7 @@ class AIAPI:
                 model = data.get('model', 'neural_core')
                 settings = data.get('settings', {})
                 context = data.get('context', [])
+                session_id = get_session_id(data)
                 
                 if not message:
                     return jsonify({
@@ -101,30 +406,26 @@ class AIAPI:
                         'error': 'No message provided'
                     }), 400
                 
-                # Обработка сообщения
-                response = self.process_ai_message(message)
-                
-                # Сохраняем в историю
-                chat_entry = {
-                    'user': message,
-                    'ai': response,
-                    'model': model,
-                    'settings': settings,
-                    'timestamp': datetime.now().isoformat()
-                }
+                # Обработка сообщения в приоритетной очереди (история пишется обработчиком)
+                try:
+                    job = self.run_job_sync(AIJob(message, session_id, model, settings,
+                                                  priority='interactive'))
+                except queue.Full:
+                    return self.queue_full_response()
                 
-                self.chat_history.append(chat_entry)
-                
-                # Ограничиваем историю
-                if len(self.chat_history) > 100:
-                    self.chat_history = self.chat_history[-100:]
+                if job.status == 'error':
+                    raise RuntimeError(job.error)
+                if job.status != 'done':
+                    return self.pending_job_response(job)
+                response = job.result
                 
                 return jsonify({
                     'success': True,
                     'response': response,
                     'model': model,
+                    'session_id': session_id,
                     'timestamp': datetime.now().isoformat(),
-                    'history_length': len(self.chat_history)
+                    'history_length': self.sessions.count(session_id)
                 })
                 
             except Exception as e:
@@ -133,73 +434,182 @@ class AIAPI:
                     'error': str(e)
                 }), 500
         
+        @app.route('/api/ai/chat/stream', methods=['POST'])
+        def ai_chat_stream():
+            """Потоковый чат (Server-Sent Events)"""
+            data = request.json or {}
+            message = data.get('message', '')
+            
+            if not message:
+                return jsonify({
+                    'success': False,
+                    'error': 'No message provided'
+                }), 400
+            
+            # Генерация идёт через ту же приоритетную очередь, что и /api/ai/chat
+            job = AIJob(message, get_session_id(data), data.get('model', 'neural_core'),
+                        data.get('settings', {}), kind='chat_stream', priority='interactive')
+            try:
+                self.submit_job(job)
+            except queue.Full:
+                return self.queue_full_response()
+            return sse_response(self.stream_chat(job))
+        
+        @app.route('/api/ai/jobs', methods=['POST'])
+        def create_ai_job():
+            """Постановка сообщения в очередь AI, возвращает ID задачи"""
+            data = request.json or {}
+            message = data.get('message', '')
+            kind = data.get('kind', 'chat')
+            text = data.get('text', '')
+            
+            if kind not in ('chat', 'analyze', 'summarize'):
+                return jsonify({
+                    'success': False,
+                    'error': f'Unknown job kind: {kind}'
+                }), 400
+            if (kind == 'chat' and not message) or (kind != 'chat' and not text):
+                return jsonify({
+                    'success': False,
+                    'error': 'No message provided' if kind == 'chat' else 'No text provided'
+                }), 400
+            
+            payload = {'text': text}
+            if kind == 'summarize':
+                try:
+                    payload['budget'] = get_summary_budget(data)
+                except (TypeError, ValueError):
+                    return jsonify({'success': False, 'error': 'Invalid summary budget'}), 400
+            
+            job = AIJob(message, get_session_id(data),
+                        data.get('model', 'neural_core'), data.get('settings', {}),
+                        kind=kind, priority=PriorityWorkQueue.normalize(data.get('priority')),
+                        payload=payload)
+            try:
+                self.submit_job(job)
+            except queue.Full:
+                return self.queue_full_response()
+            
+            return jsonify({
+                'success': True,
+                'job_id': job.job_id,
+                'status': job.status,
+                'queue_position': self.thinking_queue.qsize()
+            }), 202
+        
+        @app.route('/api/ai/jobs/<job_id>', methods=['GET'])
+        def get_ai_job(job_id):
+            """Результат задачи; ?wait=N - long-poll до N секунд"""
+            wait = min(request.args.get('wait', default=0, type=float), MAX_LONG_POLL_SECONDS)
+            job = self.jobs.wait(job_id, wait)
+            if not job:
+                return jsonify({
+                    'success': False,
+                    'error': f'Job {job_id} not found'
+                }), 404
+            
+            return jsonify({
+                'success': True,
+                'job': job.to_dict()
+            })
+        
         @app.route('/api/ai/models', methods=['GET'])
         def get_ai_models():
-            """Получение списка доступных AI моделей"""
+            """Получение списка доступных AI моделей с измеренной задержкой"""
+            raven_latency = self.raven_stats.to_dict()
             models = [
-                {
-                    'id': 'neural_core',
-                    'name': 'Neural Core v2.1',
-                    'description': 'Локальная нейросеть с памятью контекста',
-                    'type': 'local',
-                    'tokens': 1200,
-                    'context_size': 10,
-                    'accuracy': 0.87,
-                    'speed_ms': 42
-                },
                 {
                     'id': 'raven_ai',
                     'name': 'Raven AI Core',
                     'description': 'Основной движок Raven AI',
                     'type': 'local',
-                    'tokens': 800,
-                    'context_size': 5,
-                    'accuracy': 0.92,
-                    'speed_ms': 28
-                },
-                {
-                    'id': 'openai',
-                    'name': 'OpenAI GPT-3.5',
-                    'description': 'Облачная модель OpenAI',
-                    'type': 'cloud',
-                    'tokens': 4000,
-                    'context_size': 16,
-                    'accuracy': 0.95,
-                    'speed_ms': 1200
-                },
-                {
-                    'id': 'local_llm',
-                    'name': 'Local LLM',
-                    'description': 'Локальная большая языковая модель',
-                    'type': 'local',
-                    'tokens': 2500,
-                    'context_size': 8,
-                    'accuracy': 0.78,
-                    'speed_ms': 850
+                    'available': self.raven is not None,
+                    'latency': raven_latency,
+                    'speed_ms': raven_latency['avg_ms']
                 }
             ]
             
+            swap_state = None
+            if self.neural_core:
+                registry = self.neural_core.registry
+                latency = registry.get_stats(self.neural_core.model_version).to_dict()
+                models.insert(0, {
+                    'id': 'neural_core',
+                    'name': 'Neural Core',
+                    'description': 'Локальная нейросеть с памятью контекста',
+                    'type': 'local',
+                    'available': True,
+                    'context_size': self.neural_core.max_context,
+                    'version': self.neural_core.model_version,
+                    'latency': latency,
+                    'speed_ms': latency['avg_ms']
+                })
+                swap_state = registry.get_swap_state()
+            
             return jsonify({
                 'success': True,
                 'models': models,
-                'default_model': 'neural_core'
+                'versions': self.neural_core.registry.list_models() if self.neural_core else [],
+                'swap': swap_state,
+                'default_model': 'neural_core' if self.neural_core else 'raven_ai'
             })
         
+        @app.route('/api/ai/models/load', methods=['POST'])
+        def load_ai_model():
+            """Фоновая загрузка версии модели и горячая замена"""
+            if not self.neural_core:
+                return jsonify({'success': False, 'error': 'Neural Core не доступен'}), 503
+            
+            data = request.json or {}
+            model_id = data.get('model_id', '')
+            if not model_id:
+                return jsonify({'success': False, 'error': 'No model_id provided'}), 400
+            
+            try:
+                state = self.neural_core.swap_model(model_id)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 404
+            except RuntimeError as e:
+                return jsonify({'success': False, 'error': str(e)}), 409
+            
+            return jsonify({
+                'success': True,
+                'swap': state,
+                'active_version': self.neural_core.model_version
+            }), 202
+        
         @app.route('/api/ai/history', methods=['GET', 'DELETE'])
         def ai_history():
             """Управление историей чата"""
+            session_id = get_session_id()
+            
             if request.method == 'GET':
-                limit = request.args.get('limit', default=50, type=int)
-                history = self.chat_history[-limit:] if limit > 0 else self.chat_history
+                try:
+                    since = parse_time(request.args.get('since'))
+                    until = parse_time(request.args.get('until'))
+                except ValueError:
+                    return jsonify({'success': False, 'error': 'Invalid time range'}), 400
+                
+                page = self.history.page(
+                    before=request.args.get('before', type=int),
+                    limit=request.args.get('limit', default=50, type=int),
+                    session_id=session_id, since=since, until=until
+                )
                 
                 return jsonify({
                     'success': True,
-                    'history': history,
-                    'total': len(self.chat_history)
+                    'history': page['history'],
+                    'next_before': page['next_before'],
+                    'session_id': session_id,
+                    'total': self.history.count(session_id)
                 })
             
             elif request.method == 'DELETE':
-                self.chat_history = []
+                self.history.clear(session_id)
+                if session_id:
+                    self.sessions.clear(session_id)
+                else:
+                    self.sessions.clear()
                 return jsonify({
                     'success': True,
                     'message': 'Chat history cleared'
@@ -217,10 +627,22 @@ class AIAPI:
             return jsonify({
                 'success': True,
                 'status': 'active',
-                'models_loaded': 2,
+                'models_loaded': int(self.raven is not None) + int(self.neural_core is not None),
+                'model_version': self.neural_core.model_version if self.neural_core else None,
                 'memory_usage_mb': memory_info.rss / (1024 * 1024),
-                'chat_history_count': len(self.chat_history),
+                'chat_history_count': self.history.count(),
+                'chat_history': self.history.get_stats(),
+                'sessions': self.sessions.get_stats(),
                 'queue_size': self.thinking_queue.qsize(),
+                'queue_capacity': self.thinking_queue.maxsize,
+                'workers': self.workers,
+                'queue_wait': self.queue_wait_stats.to_dict(),
+                'service_time': self.service_stats.to_dict(),
+                'jobs': self.jobs.count_by_status(),
+                'priority_classes': self.thinking_queue.get_stats(),
+                'coalescing': self.single_flight.get_stats(),
+                'translation': self.translator.get_stats(),
+                'rejected_jobs': self.rejected_jobs,
                 'timestamp': datetime.now().isoformat()
             })
         
@@ -228,72 +650,108 @@ class AIAPI:
         def ai_analyze():
             """Анализ текста"""
             try:
-                data = request.json
-                text = data.get('text', '')
-                
-                if not text:
-                    return jsonify({'error': 'No text provided'}), 400
+                # Большие и текстовые загрузки читаются из потока за один проход во временный
+                # файл; анализ идёт задачей в очереди, как и для небольших JSON
+                length = request.content_length
+                streamed = not request.is_json or length is None or length > STREAM_BODY_BYTES
+                if streamed:
+                    spool, characters, key = self.spool_request_text()
+                    if not characters:
+                        spool.close()
+                        return jsonify({'error': 'No text provided'}), 400
+                    job = AIJob('', kind='analyze', payload={'file': spool},
+                                priority='bulk' if characters > BULK_TEXT_CHARS else 'normal')
+                else:
+                    text = request.json.get('text', '')
+                    if not text:
+                        return jsonify({'error': 'No text provided'}), 400
+                    key = make_key('analyze', text)
+                    job = AIJob('', kind='analyze', payload={'text': text},
+                                priority='bulk' if len(text) > BULK_TEXT_CHARS else 'normal')
                 
-                # Простой анализ текста
-                word_count = len(text.split())
-                char_count = len(text)
-                sentence_count = text.count('.') + text.count('!') + text.count('?')
+                # Одинаковые одновременные запросы ждут один анализ
+                submitted = []
                 
-                # Определение тональности (очень упрощённо)
-                positive_words = ['хорошо', 'отлично', 'прекрасно', 'спасибо', 'люблю']
-                negative_words = ['плохо', 'ужасно', 'ненавижу', 'разочарован']
+                def run_analysis():
+                    result = self.run_job_sync(job)
+                    submitted.append(job)
+                    return result
                 
-                positive_count = sum(1 for word in positive_words if word in text.lower())
-                negative_count = sum(1 for word in negative_words if word in text.lower())
+                try:
+                    job, _ = self.single_flight.do(key, run_analysis)
+                except queue.Full:
+                    return self.queue_full_response()
+                finally:
+                    # Файл закрывает поставленная задача; иначе (очередь полна или анализ
+                    # выполнил другой запрос) - сам обработчик
+                    if streamed and not submitted:
+                        spool.close()
                 
-                sentiment = 'neutral'
-                if positive_count > negative_count:
-                    sentiment = 'positive'
-                elif negative_count > positive_count:
-                    sentiment = 'negative'
+                if job.status == 'error':
+                    raise RuntimeError(job.error)
+                if job.status != 'done':
+                    return self.pending_job_response(job)
                 
-                return jsonify({
+                result = {
                     'success': True,
-                    'analysis': {
-                        'word_count': word_count,
-                        'character_count': char_count,
-                        'sentence_count': sentence_count,
-                        'reading_time_minutes': round(word_count / 200, 1),  # 200 слов в минуту
-                        'sentiment': sentiment,
-                        'positive_words': positive_count,
-                        'negative_words': negative_count
-                    },
+                    'analysis': job.result,
                     'timestamp': datetime.now().isoformat()
-                })
+                }
+                if streamed:
+                    result['streamed'] = True
+                return jsonify(result)
                 
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
         
         @app.route('/api/ai/summarize', methods=['POST'])
         def ai_summarize():
-            """Суммаризация текста"""
+            """Суммаризация текста или пакета текстов (texts)"""
             try:
                 data = request.json
                 text = data.get('text', '')
+                texts = data.get('texts')
                 
-                if not text:
+                if texts is not None:
+                    if not isinstance(texts, list) or not texts:
+                        return jsonify({'error': 'texts must be a non-empty list'}), 400
+                    if len(texts) > MAX_SUMMARY_BATCH:
+                        return jsonify({
+                            'error': f'Too many texts (max {MAX_SUMMARY_BATCH})'
+                        }), 400
+                    payload = {'texts': [str(item) for item in texts]}
+                    priority = 'bulk'
+                elif text:
+                    payload = {'text': text}
+                    priority = 'bulk' if len(text) > BULK_TEXT_CHARS else 'normal'
+                else:
                     return jsonify({'error': 'No text provided'}), 400
                 
-                # Упрощённая суммаризация
-                sentences = text.split('.')
-                if len(sentences) > 3:
-                    summary = '. '.join(sentences[:3]) + '.'
-                else:
-                    summary = text
+                try:
+                    payload['budget'] = get_summary_budget(data)
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'Invalid summary budget'}), 400
                 
-                return jsonify({
+                job = AIJob('', kind='summarize', payload=payload, priority=priority)
+                try:
+                    self.run_job_sync(job)
+                except queue.Full:
+                    return self.queue_full_response()
+                
+                if job.status == 'error':
+                    raise RuntimeError(job.error)
+                if job.status != 'done':
+                    return self.pending_job_response(job)
+                
+                if texts is not None:
+                    result = {'summaries': job.result}
+                else:
+                    result = dict(job.result)
+                result.update({
                     'success': True,
-                    'original_length': len(text),
-                    'summary_length': len(summary),
-                    'reduction_percent': round((1 - len(summary) / len(text)) * 100, 1),
-                    'summary': summary,
                     'timestamp': datetime.now().isoformat()
                 })
+                return jsonify(result)
                 
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
@@ -309,30 +767,21 @@ class AIAPI:
                 if not text:
                     return jsonify({'error': 'No text provided'}), 400
                 
-                # Упрощённый перевод (для демонстрации)
-                translations = {
-                    'привет': 'hello',
-                    'пока': 'goodbye',
-                    'спасибо': 'thank you',
-                    'пожалуйста': 'you\'re welcome'
-                }
-                
-                words = text.lower().split()
-                translated_words = []
-                
-                for word in words:
-                    if word in translations:
-                        translated_words.append(translations[word])
-                    else:
-                        translated_words.append(word)
-                
-                translation = ' '.join(translated_words)
+                source_lang = data.get('source_lang', 'ru')
+                try:
+                    result = self.translator.translate(text, target_lang, source_lang)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
                 
                 return jsonify({
                     'success': True,
                     'original': text,
-                    'translation': translation,
+                    'translation': result['translation'],
+                    'source_language': source_lang,
                     'target_language': target_lang,
+                    'matched_phrases': result['matched_phrases'],
+                    'unknown_words': result['unknown_words'],
+                    'cached_sentences': result['cached_sentences'],
                     'timestamp': datetime.now().isoformat()
                 })
                 
@@ -0,0 +1,126 @@
+"""
+Асинхронные задачи AI: состояние, ожидание результата и учёт времени
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class AIJob:
+    """Задача AI в очереди thinking_queue"""
+
+    def __init__(self, message: str, session_id: Optional[str] = None,
+                 model: str = 'neural_core', settings: Optional[Dict] = None,
+                 kind: str = 'chat', priority: str = 'normal',
+                 payload: Optional[Dict] = None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.kind = kind  # chat, chat_stream, analyze, summarize
+        self.priority = priority  # interactive, normal, bulk
+        self.payload = payload or {}
+        self.message = message
+        self.session_id = session_id
+        self.model = model
+        self.settings = settings or {}
+        self.status = 'queued'  # queued, running, done, error
+        self.result = None
+        self.error = None
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done_event = threading.Event()
+        # Время этапов (nlu, skill) в обработчике очереди, мс - для Server-Timing запроса
+        self.phases: Dict[str, float] = {}
+        # chat_stream: события для SSE по мере генерации, None - конец потока
+        self.events = queue.Queue() if kind == 'chat_stream' else None
+
+    @property
+    def wait_ms(self) -> Optional[float]:
+        """Время ожидания в очереди"""
+        if self.started_at is None:
+            return None
+        return round((self.started_at - self.enqueued_at) * 1000, 2)
+
+    @property
+    def service_ms(self) -> Optional[float]:
+        """Время обработки"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) * 1000, 2)
+
+    def finish(self, result: Any = None, error: Optional[str] = None):
+        """Завершение задачи и пробуждение ожидающих"""
+        self.finished_at = time.time()
+        if error is None:
+            self.status = 'done'
+            self.result = result
+        else:
+            self.status = 'error'
+            self.error = error
+        self.done_event.set()
+        if self.events is not None:
+            self.events.put(None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация задачи для API"""
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'kind': self.kind,
+            'priority': self.priority,
+            'message': self.message,
+            'session_id': self.session_id,
+            'model': self.model,
+            'response': self.result,
+            'error': self.error,
+            'enqueued_at': datetime.fromtimestamp(self.enqueued_at).isoformat(),
+            'wait_ms': self.wait_ms,
+            'service_ms': self.service_ms
+        }
+
+
+class JobStore:
+    """Хранилище задач с ограничением числа завершённых"""
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, job: AIJob):
+        """Регистрация задачи"""
+        with self.lock:
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > self.max_jobs:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if not oldest.done_event.is_set():
+                    break
+                del self.jobs[oldest_id]
+
+    def remove(self, job_id: str):
+        """Удаление задачи (например, если её не удалось поставить в очередь)"""
+        with self.lock:
+            self.jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[AIJob]:
+        """Задача по ID"""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Optional[AIJob]:
+        """Long-poll: ожидание завершения задачи не дольше timeout секунд"""
+        job = self.get(job_id)
+        if job and timeout > 0:
+            job.done_event.wait(timeout)
+        return job
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Количество задач по статусам"""
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
@@ -3,21 +3,36 @@
 """
 import json
 import os
+import threading
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QFrame, QGroupBox, QTextEdit,
                              QLineEdit, QComboBox, QCheckBox, QListWidget,
                              QListWidgetItem, QSplitter, QProgressBar)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QFont, QColor
+from PyQt6.QtGui import QFont, QColor, QTextCursor
+
+from streaming import split_response_chunks
 
 class AIPage(QWidget):
     """Страница ИИ ассистента"""
     
+    # Сигналы из рабочего потока в GUI поток
+    query_requested = pyqtSignal(str)
+    response_chunk = pyqtSignal(str)
+    response_finished = pyqtSignal(str)
+    response_failed = pyqtSignal(str)
+    
     def __init__(self, raven_ai):
         super().__init__()
         self.raven = raven_ai
         self.conversations = []
         self.current_conversation = []
+        self.response_started = False
+        
+        self.query_requested.connect(self.ask_ai)
+        self.response_chunk.connect(self.on_response_chunk)
+        self.response_finished.connect(self.on_response_finished)
+        self.response_failed.connect(self.on_response_failed)
         
         self.setup_ui()
         self.load_conversations()
@@ -428,64 +443,81 @@ class AIPage(QWidget):
             }
         """)
         
-        # Имитация задержки ИИ
-        from PyQt6.QtCore import QTimer
-        QTimer.singleShot(1000, lambda: self.process_ai_response(query))
+        # Ответ формируется в фоне и выводится по частям
+        self.response_started = False
+        thread = threading.Thread(target=self.generate_ai_response, args=(query,), daemon=True)
+        thread.start()
     
-    def process_ai_response(self, query):
-        """Обработка ответа ИИ"""
+    def generate_ai_response(self, query):
+        """Получение ответа ИИ в рабочем потоке с выдачей по частям"""
         try:
-            # Получаем ответ от ИИ
             response = self.raven.process_command(query)
-            
-            # Отображаем ответ
-            self.chat_scroll.append(f"<div style='background-color: #f8f9fa; padding: 10px; border-radius: 8px; margin: 5px 0;'><b>🤖 Raven AI:</b> {response}</div>")
-            self.current_conversation.append({
-                'role': 'assistant',
-                'content': response
-            })
-            
-            # Сохраняем разговор
-            if len(self.current_conversation) >= 2:  # Минимум 2 сообщения
-                conv_title = self.current_conversation[0]['content'][:50] + "..."
-                self.conversations.append({
-                    'title': conv_title,
-                    'messages': self.current_conversation.copy()
-                })
-                self.save_conversations()
-                self.update_conversation_list()
-            
-            # Возвращаем статус в норму
-            self.ai_status.setText("✅ Ready")
-            self.ai_status.setStyleSheet("""
-                QLabel {
-                    color: #2ecc71;
-                    font-weight: 600;
-                    padding: 6px 12px;
-                    background-color: #e8f8f0;
-                    border-radius: 6px;
-                }
-            """)
-            
-            # Прокрутка вниз
-            self.chat_scroll.verticalScrollBar().setValue(
-                self.chat_scroll.verticalScrollBar().maximum()
-            )
-            
+            for chunk in split_response_chunks(response):
+                self.response_chunk.emit(chunk)
+            self.response_finished.emit(response)
         except Exception as e:
-            error_msg = f"Sorry, I encountered an error: {str(e)}"
-            self.chat_scroll.append(f"<div style='background-color: #ffeaea; padding: 10px; border-radius: 8px; margin: 5px 0; color: #e74c3c;'><b>⚠️ Error:</b> {error_msg}</div>")
-            
-            self.ai_status.setText("❌ Error")
-            self.ai_status.setStyleSheet("""
-                QLabel {
-                    color: #e74c3c;
-                    font-weight: 600;
-                    padding: 6px 12px;
-                    background-color: #ffeaea;
-                    border-radius: 6px;
-                }
-            """)
+            self.response_failed.emit(str(e))
+    
+    def on_response_chunk(self, chunk):
+        """Вывод очередной части ответа"""
+        if not self.response_started:
+            self.response_started = True
+            self.chat_scroll.append("<div style='background-color: #f8f9fa; padding: 10px; border-radius: 8px; margin: 5px 0;'><b>🤖 Raven AI:</b> </div>")
+            self.ai_status.setText("✍️ Responding...")
+        
+        cursor = self.chat_scroll.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(chunk)
+        
+        # Прокрутка вниз
+        self.chat_scroll.verticalScrollBar().setValue(
+            self.chat_scroll.verticalScrollBar().maximum()
+        )
+    
+    def on_response_finished(self, response):
+        """Завершение ответа ИИ"""
+        self.current_conversation.append({
+            'role': 'assistant',
+            'content': response
+        })
+        
+        # Сохраняем разговор
+        if len(self.current_conversation) >= 2:  # Минимум 2 сообщения
+            conv_title = self.current_conversation[0]['content'][:50] + "..."
+            self.conversations.append({
+                'title': conv_title,
+                'messages': self.current_conversation.copy()
+            })
+            self.save_conversations()
+            self.update_conversation_list()
+        
+        # Возвращаем статус в норму
+        self.ai_status.setText("✅ Ready")
+        self.ai_status.setStyleSheet("""
+            QLabel {
+                color: #2ecc71;
+                font-weight: 600;
+                padding: 6px 12px;
+                background-color: #e8f8f0;
+                border-radius: 6px;
+            }
+        """)
+    
+    def on_response_failed(self, error):
+        """Ошибка при получении ответа ИИ"""
+        error_msg = f"Sorry, I encountered an error: {error}"
+        self.chat_scroll.append(f"<div style='background-color: #ffeaea; padding: 10px; border-radius: 8px; margin: 5px 0; color: #e74c3c;'><b>⚠️ Error:</b> {error_msg}</div>")
+        
+        self.ai_status.setText("❌ Error")
+        self.ai_status.setStyleSheet("""
+            QLabel {
+                color: #e74c3c;
+                font-weight: 600;
+                padding: 6px 12px;
+                background-color: #ffeaea;
+                border-radius: 6px;
+            }
+        """)
     
     def voice_query(self):
         """Голосовой запрос"""
@@ -498,7 +530,7 @@ class AIPage(QWidget):
         def listen():
             text = self.raven.listen(timeout=10)
             if text:
-                self.ask_ai(text)
+                self.query_requested.emit(text)
             else:
                 self.chat_scroll.append("<div style='background-color: #ffeaea; padding: 10px; border-radius: 8px; margin: 5px 0; color: #e74c3c;'><b>⚠️ Could not recognize speech</b></div>")
         
@@ -0,0 +1,127 @@
+"""
+Приоритетная очередь AI задач: классы interactive/normal/bulk со старением
+"""
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+PRIORITY_CLASSES = ('interactive', 'normal', 'bulk')
+BASE_PRIORITY = {'interactive': 0, 'normal': 1, 'bulk': 2}
+
+
+class PriorityWorkQueue:
+    """Очередь с классами приоритета, старением и лимитами параллелизма (интерфейс queue.Queue)"""
+
+    def __init__(self, maxsize: int = 0, concurrency: Optional[Dict[str, int]] = None,
+                 aging_seconds: float = 5.0):
+        self.maxsize = maxsize
+        self.aging_seconds = aging_seconds
+        self.concurrency = {name: None for name in PRIORITY_CLASSES}
+        if concurrency:
+            self.concurrency.update(concurrency)
+
+        self.pending = {name: deque() for name in PRIORITY_CLASSES}
+        self.running = {name: 0 for name in PRIORITY_CLASSES}
+        self.dispatched = {name: 0 for name in PRIORITY_CLASSES}
+        self.preempted = 0
+        self.cond = threading.Condition()
+
+    @staticmethod
+    def normalize(priority: Optional[str]) -> str:
+        """Приведение имени класса к допустимому"""
+        return priority if priority in BASE_PRIORITY else 'normal'
+
+    def qsize(self) -> int:
+        """Общее число ожидающих задач"""
+        with self.cond:
+            return sum(len(items) for items in self.pending.values())
+
+    def put_nowait(self, item: Any, priority: str = 'normal'):
+        """Постановка задачи; queue.Full при превышении maxsize"""
+        priority = self.normalize(priority)
+        with self.cond:
+            total = sum(len(items) for items in self.pending.values())
+            if self.maxsize > 0 and total >= self.maxsize:
+                raise queue.Full
+            self.pending[priority].append((time.time(), item))
+            self.cond.notify()
+
+    def put(self, item: Any, priority: str = 'normal'):
+        """Алиас put_nowait (очередь не блокирует производителя)"""
+        self.put_nowait(item, priority)
+
+    def _select(self) -> Optional[str]:
+        """Класс для следующей задачи с учётом старения и лимитов (под lock)"""
+        now = time.time()
+        best, best_score = None, None
+        for name in PRIORITY_CLASSES:
+            items = self.pending[name]
+            if not items:
+                continue
+            limit = self.concurrency[name]
+            if limit is not None and self.running[name] >= limit:
+                continue
+            waited = now - items[0][0]
+            score = BASE_PRIORITY[name] - waited / self.aging_seconds
+            if best_score is None or score < best_score:
+                best, best_score = name, score
+        return best
+
+    def get_with_priority(self, timeout: Optional[float] = None):
+        """Следующая задача и её класс; queue.Empty по таймауту"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.cond:
+            while True:
+                name = self._select()
+                if name is not None:
+                    _, item = self.pending[name].popleft()
+                    self.running[name] += 1
+                    self.dispatched[name] += 1
+                    return item, name
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self.cond.wait(remaining)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        """Следующая задача (интерфейс queue.Queue)"""
+        item, _ = self.get_with_priority(timeout if block else 0)
+        return item
+
+    def take_interactive(self) -> Optional[Any]:
+        """Забрать ожидающую interactive задачу для выполнения на границе чанка"""
+        with self.cond:
+            items = self.pending['interactive']
+            if not items:
+                return None
+            _, item = items.popleft()
+            self.running['interactive'] += 1
+            self.dispatched['interactive'] += 1
+            self.preempted += 1
+            return item
+
+    def task_done(self, priority: str = 'normal'):
+        """Освобождение слота класса после выполнения задачи"""
+        priority = self.normalize(priority)
+        with self.cond:
+            if self.running[priority] > 0:
+                self.running[priority] -= 1
+            self.cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Состояние очереди по классам"""
+        with self.cond:
+            now = time.time()
+            stats = {'preempted': self.preempted, 'aging_seconds': self.aging_seconds}
+            for name in PRIORITY_CLASSES:
+                items = self.pending[name]
+                stats[name] = {
+                    'pending': len(items),
+                    'running': self.running[name],
+                    'dispatched': self.dispatched[name],
+                    'concurrency_limit': self.concurrency[name],
+                    'oldest_wait_ms': round((now - items[0][0]) * 1000, 1) if items else None
+                }
+            return stats
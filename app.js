@@ -1,4 +1,10 @@
 // Главный файл приложения Raven AI Karasu
+
+// Опрос метрик: обычный интервал и нижняя граница, когда сэмплер бэкенда
+// в частом режиме (всплеск нагрузки); в скрытом окне опрос приостановлен
+const METRICS_POLL_MS = 5000;
+const METRICS_POLL_FAST_MS = 1000;
+
 class RavenApp {
     constructor() {
         this.currentPage = 'dashboard';
@@ -55,7 +61,7 @@ class RavenApp {
 
     async checkPythonBackend() {
         try {
-            const response = await fetch('http://localhost:5000/api/health');
+            const response = await window.pythonAPI.request('/api/health');
             if (response.ok) {
                 const data = await response.json();
                 this.pythonStatus = 'connected';
@@ -378,7 +384,7 @@ class RavenApp {
 
     async cleanRAM() {
         try {
-            const response = await fetch('http://localhost:5000/api/system/actions', {
+            const response = await window.pythonAPI.request('/api/system/actions', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ action: 'clean_ram' })
@@ -386,9 +392,9 @@ class RavenApp {
             
             if (response.ok) {
                 const data = await response.json();
-                this.showNotification(`✅ ${data.result.message}`, 'success');
+                this.showNotification(`✅ ${data.result.message}. ${data.result.details}`, 'success');
             } else {
-                this.showNotification('❌ Не удалось очистить RAM', 'error');
+                this.showNotification('❌ Не удалось освободить память', 'error');
             }
         } catch (error) {
             this.showNotification('❌ Ошибка подключения к API', 'error');
@@ -435,15 +441,24 @@ class RavenApp {
     }
 
     setupPeriodicUpdates() {
-        // Обновление метрик каждые 5 секунд
-        setInterval(() => {
-            if (this.currentPage === 'dashboard') {
-                this.updateDashboardMetrics();
+        // Обновление метрик с интервалом по режиму сэмплера (cadence в ответе)
+        this.metricsPollTimer = null;
+        this.scheduleMetricsPoll(METRICS_POLL_MS);
+        
+        // Свёрнутое или скрытое окно не опрашивает бэкенд, и сэмплер без клиентов
+        // переходит на редкие замеры; при показе метрики обновляются сразу
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) {
+                clearTimeout(this.metricsPollTimer);
+                this.metricsPollTimer = null;
+            } else {
+                this.scheduleMetricsPoll(0);
             }
-        }, 5000);
+        });
         
         // Проверка состояния Python каждые 10 секунд
         setInterval(async () => {
+            if (document.hidden) return;
             const connected = await this.checkPythonBackend();
             const statusEl = document.getElementById('backendStatusText');
             const indicator = document.querySelector('.status-indicator');
@@ -460,6 +475,27 @@ class RavenApp {
         }, 10000);
     }
 
+    metricsPollInterval(metrics) {
+        const cadence = metrics && metrics.cadence;
+        if (cadence && cadence.mode === 'fast' && cadence.interval) {
+            return Math.max(cadence.interval * 1000, METRICS_POLL_FAST_MS);
+        }
+        return METRICS_POLL_MS;
+    }
+
+    scheduleMetricsPoll(delay) {
+        clearTimeout(this.metricsPollTimer);
+        this.metricsPollTimer = setTimeout(async () => {
+            let metrics = null;
+            if (this.currentPage === 'dashboard') {
+                metrics = await this.updateDashboardMetrics();
+            }
+            if (!document.hidden) {
+                this.scheduleMetricsPoll(this.metricsPollInterval(metrics));
+            }
+        }, delay);
+    }
+
     startApplication() {
         const loadingScreen = document.getElementById('loadingScreen');
         const appContainer = document.getElementById('appContainer');
@@ -0,0 +1,493 @@
+"""
+Асинхронный режим сервера: ASGI-обёртка над Flask приложением и HTTP/1.1 сервер на asyncio
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+DEFAULT_WORKERS = int(os.environ.get('RAVEN_ASGI_WORKERS', 32))
+# Потоковые ответы (SSE, long-poll) большую часть времени ждут данных: у них свой пул,
+# чтобы открытые потоки не занимали потоки обычных обработчиков
+DEFAULT_STREAM_WORKERS = int(os.environ.get('RAVEN_ASGI_STREAM_WORKERS', 256))
+KEEPALIVE_TIMEOUT = 30.0
+MAX_HEADER_BYTES = 64 * 1024
+BODY_CHUNK_BYTES = 64 * 1024
+BODY_BUFFER_BYTES = 1024 * 1024
+
+_END = object()
+
+
+class RequestBody:
+    """wsgi.input: тело запроса поступает из цикла событий, читается потоком WSGI"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, limit: int = BODY_BUFFER_BYTES):
+        self.loop = loop
+        self.limit = limit
+        self.chunks = deque()
+        self.buffered = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.space = asyncio.Event()
+        self.space.set()
+
+    async def feed(self, data: bytes):
+        """Добавление данных; ждёт, пока потребитель не освободит буфер"""
+        await self.space.wait()
+        with self.cond:
+            if data:
+                self.chunks.append(data)
+                self.buffered += len(data)
+                if self.buffered >= self.limit:
+                    self.space.clear()
+            self.cond.notify_all()
+
+    def close(self):
+        """Конец тела запроса"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _take(self, size: int) -> bytes:
+        """Забрать до size байт из буфера (под cond)"""
+        parts = []
+        while self.chunks and size > 0:
+            chunk = self.chunks.popleft()
+            if len(chunk) > size:
+                self.chunks.appendleft(chunk[size:])
+                chunk = chunk[:size]
+            parts.append(chunk)
+            size -= len(chunk)
+        data = b''.join(parts)
+        self.buffered -= len(data)
+        if self.buffered < self.limit:
+            self.loop.call_soon_threadsafe(self.space.set)
+        return data
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        with self.cond:
+            if size is None or size < 0:
+                while not self.closed:
+                    self.cond.wait()
+                return self._take(self.buffered)
+            while not self.chunks and not self.closed:
+                self.cond.wait()
+            return self._take(size)
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        line = []
+        remaining = size if size is not None and size >= 0 else None
+        while remaining is None or remaining > 0:
+            with self.cond:
+                while not self.chunks and not self.closed:
+                    self.cond.wait()
+                if not self.chunks:
+                    break
+                head = self.chunks[0]
+                newline = head.find(b'\n')
+                take = len(head) if newline < 0 else newline + 1
+                if remaining is not None:
+                    take = min(take, remaining)
+                data = self._take(take)
+            line.append(data)
+            if remaining is not None:
+                remaining -= len(data)
+            if data.endswith(b'\n'):
+                break
+        return b''.join(line)
+
+    def readlines(self, hint: int = -1) -> List[bytes]:
+        return list(iter(self.readline, b''))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
+def build_environ(scope: Dict[str, Any], body: RequestBody) -> Dict[str, Any]:
+    """WSGI environ из ASGI scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            key = name
+        else:
+            key = 'HTTP_' + name
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class ASGIAdapter:
+    """ASGI приложение поверх WSGI: обработчики Flask выполняются в пуле потоков,
+    тела потоковых ответов - по одной части в отдельном пуле"""
+
+    def __init__(self, wsgi_app, workers: int = DEFAULT_WORKERS,
+                 stream_workers: int = DEFAULT_STREAM_WORKERS):
+        self.wsgi_app = wsgi_app
+        self.workers = workers
+        self.stream_workers = stream_workers
+        self.executor = None
+        self.stream_executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Пул для блокирующей работы (создаётся при первом запросе)"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                   thread_name_prefix='asgi-worker')
+            return self.executor
+
+    def get_stream_executor(self) -> ThreadPoolExecutor:
+        """Пул для итерации потоковых ответов (создаётся при первом потоковом ответе)"""
+        with self.lock:
+            if self.stream_executor is None:
+                self.stream_executor = ThreadPoolExecutor(max_workers=self.stream_workers,
+                                                          thread_name_prefix='asgi-stream')
+            return self.stream_executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        body = RequestBody(loop)
+        pump = loop.create_task(self._pump_body(receive, body))
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                                  for name, value in headers]
+            return lambda data: None
+
+        environ = build_environ(scope, body)
+        # Время ожидания свободного потока учитывает контроль допуска (admission.py)
+        environ['raven.queued_at'] = time.perf_counter()
+        # Свой контекст на запрос: контекст Flask (stream_with_context) и этапы
+        # RequestMetrics живут в contextvars и доступны из любого потока, где он запущен
+        context = contextvars.Context()
+        result = None
+        pending = None
+        try:
+            result, content = await loop.run_in_executor(
+                executor, context.run, self._start, environ, start_response, started)
+            if content is not None:
+                await send({'type': 'http.response.start', 'status': started['status'],
+                            'headers': started['headers']})
+                await send({'type': 'http.response.body', 'body': content})
+                return
+            # Потоковое тело: каждая часть запрашивается в пуле потоков ответов; пока
+            # предыдущая не отправлена, следующая не читается (backpressure).
+            # Заголовки уходят после первой части: исключение до неё - ответ 500
+            stream_executor = self.get_stream_executor()
+            iterator = iter(result)
+            headers_sent = False
+            while True:
+                pending = stream_executor.submit(context.run, next, iterator, _END)
+                chunk = await asyncio.wrap_future(pending)
+                pending = None
+                if not headers_sent:
+                    await send({'type': 'http.response.start', 'status': started['status'],
+                                'headers': started['headers']})
+                    headers_sent = True
+                if chunk is _END:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk,
+                                'more_body': True})
+            # Исключение в close() - обрыв соединения, а не успешный конец ответа
+            closing, result = result, None
+            if hasattr(closing, 'close'):
+                await loop.run_in_executor(stream_executor, context.run, closing.close)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if result is not None and hasattr(result, 'close'):
+                # Клиент ушёл или ответ прерван: итерация прекращается
+                self._close_result(context, result, pending)
+            body.close()
+            pump.cancel()
+
+    def _start(self, environ, start_response, started: Dict[str, Any]):
+        """Поток пула: вызов приложения. Ответ с Content-Length собирается здесь же
+        целиком (одна передача в цикл событий), иначе возвращается итератор тела"""
+        result = self.wsgi_app(environ, start_response)
+        if not any(name == b'content-length' for name, _ in started.get('headers', [])):
+            return result, None
+        try:
+            return None, b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    def _close_result(self, context: contextvars.Context, result, pending):
+        """close() прерванного ответа в его контексте; если часть ещё читается (отмена
+        задачи), то после её завершения - генератор нельзя закрывать во время выполнения"""
+        stream_executor = self.get_stream_executor()
+
+        def close(_=None):
+            try:
+                stream_executor.submit(context.run, result.close)
+            except RuntimeError:
+                # Пул остановлен вместе с сервером
+                pass
+
+        if pending is not None:
+            pending.add_done_callback(close)
+        else:
+            close()
+
+    @staticmethod
+    async def _pump_body(receive, body: RequestBody):
+        """Передача тела запроса из ASGI receive в wsgi.input"""
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.request':
+                    await body.feed(message.get('body', b''))
+                    if not message.get('more_body', False):
+                        break
+                else:
+                    break
+        finally:
+            body.close()
+
+    @staticmethod
+    async def _lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+class HTTPConnection:
+    """Одно соединение HTTP/1.1 с keep-alive: разбор запросов и вызов ASGI приложения"""
+
+    def __init__(self, app, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.app = app
+        self.reader = reader
+        self.writer = writer
+        self.server = writer.get_extra_info('sockname')
+        self.client = writer.get_extra_info('peername')
+
+    async def serve(self):
+        try:
+            while await self._handle_request():
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writer.close()
+
+    async def _read_head(self) -> Optional[Tuple[str, str, str, List[Tuple[bytes, bytes]]]]:
+        """Строка запроса и заголовки; None при закрытии или таймауте keep-alive"""
+        try:
+            head = await asyncio.wait_for(self.reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        except asyncio.LimitOverrunError:
+            await self._simple_response(431)
+            return None
+
+        lines = head[:-4].split(b'\r\n')
+        try:
+            method, target, version = lines[0].decode('latin-1').split(' ', 2)
+        except ValueError:
+            await self._simple_response(400)
+            return None
+        headers = []
+        for line in lines[1:]:
+            name, _, value = line.partition(b':')
+            headers.append((name.strip().lower(), value.strip()))
+        return method, target, version, headers
+
+    async def _simple_response(self, status: int):
+        phrase = HTTPStatus(status).phrase
+        self.writer.write(f"HTTP/1.1 {status} {phrase}\r\ncontent-length: 0\r\n"
+                          f"connection: close\r\n\r\n".encode('latin-1'))
+        await self.writer.drain()
+
+    async def _handle_request(self) -> bool:
+        """Обработка одного запроса; True - соединение остаётся открытым"""
+        parsed = await self._read_head()
+        if parsed is None:
+            return False
+        method, target, version, headers = parsed
+        header_map = {}
+        for name, value in headers:
+            header_map[name] = value.decode('latin-1')
+
+        connection = header_map.get(b'connection', '').lower()
+        keep_alive = ('close' not in connection if version == 'HTTP/1.1'
+                      else 'keep-alive' in connection)
+        chunked_request = 'chunked' in header_map.get(b'transfer-encoding', '').lower()
+        try:
+            remaining = int(header_map.get(b'content-length', 0) or 0)
+        except ValueError:
+            await self._simple_response(400)
+            return False
+        if header_map.get(b'expect', '').lower() == '100-continue':
+            self.writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0', 'spec_version': '2.3'},
+            'http_version': version.split('/', 1)[-1],
+            'method': method.upper(),
+            'scheme': 'http',
+            'path': unquote(path),
+            'raw_path': path.encode('latin-1'),
+            'query_string': query.encode('latin-1'),
+            'root_path': '',
+            'headers': headers,
+            'client': self.client,
+            'server': self.server
+        }
+
+        body_state = {'done': not chunked_request and remaining == 0, 'remaining': remaining}
+        response = {'started': False, 'chunked': False, 'finished': False}
+        disconnected = asyncio.Event()
+
+        async def receive():
+            if body_state['done']:
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+            if chunked_request:
+                size_line = await self.reader.readline()
+                size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    await self.reader.readuntil(b'\r\n')  # завершающая пустая строка
+                    body_state['done'] = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                data = await self.reader.readexactly(size + 2)
+                return {'type': 'http.request', 'body': data[:-2], 'more_body': True}
+            data = await self.reader.read(min(BODY_CHUNK_BYTES, body_state['remaining']))
+            if not data:
+                raise ConnectionError('Клиент закрыл соединение')
+            body_state['remaining'] -= len(data)
+            body_state['done'] = body_state['remaining'] <= 0
+            return {'type': 'http.request', 'body': data, 'more_body': not body_state['done']}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = list(message.get('headers', []))
+                return
+            if message['type'] != 'http.response.body':
+                return
+            data = message.get('body', b'')
+            more = message.get('more_body', False)
+            if not response['started']:
+                self._write_head(response, keep_alive, None if more else len(data))
+            if response['chunked']:
+                if data:
+                    self.writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                if not more:
+                    self.writer.write(b'0\r\n\r\n')
+            elif data and method.upper() != 'HEAD':
+                self.writer.write(data)
+            await self.writer.drain()
+            if not more:
+                response['finished'] = True
+
+        try:
+            await self.app(scope, receive, send)
+        except ConnectionError:
+            return False
+        except Exception as e:
+            print(f"❌ Ошибка ASGI приложения: {e}")
+            if not response['started']:
+                await self._simple_response(500)
+            return False
+        finally:
+            disconnected.set()
+
+        if not response['finished']:
+            return False
+        # Непрочитанный остаток тела мешает разбору следующего запроса
+        if not body_state['done']:
+            if chunked_request or body_state['remaining'] > BODY_BUFFER_BYTES:
+                return False
+            await self.reader.readexactly(body_state['remaining'])
+        return keep_alive
+
+    def _write_head(self, response: Dict[str, Any], keep_alive: bool,
+                    body_length: Optional[int]):
+        """Статусная строка и заголовки; без Content-Length ответ идёт чанками"""
+        status = response.get('status', 500)
+        headers = response.get('headers', [])
+        has_length = any(name == b'content-length' for name, _ in headers)
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}".encode('latin-1')]
+        for name, value in headers:
+            lines.append(name + b': ' + value)
+        if not has_length:
+            if body_length is not None:
+                lines.append(b'content-length: %d' % body_length)
+            else:
+                lines.append(b'transfer-encoding: chunked')
+                response['chunked'] = True
+        lines.append(b'connection: keep-alive' if keep_alive else b'connection: close')
+        self.writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+        response['started'] = True
+
+
+async def serve_async(app, host: str = '127.0.0.1', port: int = 5000,
+                      ready: Optional[threading.Event] = None, sock=None):
+    """Запуск HTTP сервера для ASGI приложения в текущем цикле событий
+    (sock - уже открытый слушающий сокет, например общий для обработчиков prefork)"""
+    async def on_connection(reader, writer):
+        await HTTPConnection(app, reader, writer).serve()
+
+    if sock is not None:
+        server = await asyncio.start_server(on_connection, sock=sock, limit=MAX_HEADER_BYTES)
+    else:
+        server = await asyncio.start_server(on_connection, host, port, limit=MAX_HEADER_BYTES)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def serve(wsgi_app, host: str = '127.0.0.1', port: int = 5000,
+          workers: int = DEFAULT_WORKERS, sock=None):
+    """Запуск Flask приложения в асинхронном режиме (блокирует вызывающий поток)"""
+    print(f"⚡ Асинхронный сервер: {host}:{port}, потоков для обработчиков: {workers}")
+    try:
+        asyncio.run(serve_async(ASGIAdapter(wsgi_app, workers), host, port, sock=sock))
+    except KeyboardInterrupt:
+        pass
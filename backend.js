@@ -1,14 +1,74 @@
 // API взаимодействие с Python backend
+
+// Разбор одного события Server-Sent Events
+function parseSSEEvent(raw) {
+    let event = 'message';
+    let data = '';
+    for (const line of raw.split('\n')) {
+        if (line.startsWith('event: ')) {
+            event = line.slice(7);
+        } else if (line.startsWith('data: ')) {
+            data += line.slice(6);
+        }
+    }
+    if (!data) return null;
+    try {
+        return { event, data: JSON.parse(data) };
+    } catch (error) {
+        return null;
+    }
+}
+
+// Ответ IPC транспорта в форме, совместимой с fetch Response
+function ipcResponse(message) {
+    return {
+        ok: message.status >= 200 && message.status < 300,
+        status: message.status,
+        headers: message.headers || {},
+        json: async () => JSON.parse(message.body)
+    };
+}
+
 class PythonBackendAPI {
     constructor() {
         this.baseURL = 'http://localhost:5000';
         this.isConnected = false;
+        // Ключ клиента для лимитов бэкенда (admission.py): все локальные клиенты
+        // приходят с одного адреса
+        this.clientId = `electron-${crypto.randomUUID()}`;
+        // http - fetch; stdio/unix - кадры IPC через preload.js и главный процесс
+        this.transport = 'http';
+        this.transportReady = this.detectTransport();
         this.checkConnection();
     }
 
+    async detectTransport() {
+        if (window.electronAPI && window.electronAPI.backendTransport) {
+            try {
+                this.transport = await window.electronAPI.backendTransport();
+            } catch (error) {
+                this.transport = 'http';
+            }
+        }
+        return this.transport;
+    }
+
+    // fetch-подобный запрос через выбранный транспорт
+    async request(path, options = {}) {
+        await this.transportReady;
+        if (this.transport === 'http') {
+            const headers = { ...(options.headers || {}), 'X-Client-Id': this.clientId };
+            return fetch(`${this.baseURL}${path}`, { ...options, headers });
+        }
+        const message = await window.electronAPI.backendRequest(
+            options.method || 'GET', path, options.body || null
+        );
+        return ipcResponse(message);
+    }
+
     async checkConnection() {
         try {
-            const response = await fetch(`${this.baseURL}/api/health`);
+            const response = await this.request('/api/health');
             if (response.ok) {
                 this.isConnected = true;
                 console.log('✅ Python backend подключен');
@@ -23,7 +83,7 @@ class PythonBackendAPI {
 
     async getSystemMetrics() {
         try {
-            const response = await fetch(`${this.baseURL}/api/system/metrics`);
+            const response = await this.request('/api/system/metrics');
             if (response.ok) {
                 return await response.json();
             }
@@ -35,8 +95,8 @@ class PythonBackendAPI {
 
     async getProcesses(limit = 20, sortBy = 'cpu') {
         try {
-            const response = await fetch(
-                `${this.baseURL}/api/system/processes?limit=${limit}&sort_by=${sortBy}`
+            const response = await this.request(
+                `/api/system/processes?limit=${limit}&sort_by=${sortBy}`
             );
             if (response.ok) {
                 return await response.json();
@@ -49,7 +109,7 @@ class PythonBackendAPI {
 
     async sendCommand(command) {
         try {
-            const response = await fetch(`${this.baseURL}/api/command`, {
+            const response = await this.request('/api/command', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ command: command })
@@ -66,7 +126,7 @@ class PythonBackendAPI {
 
     async chatWithAI(message, context = []) {
         try {
-            const response = await fetch(`${this.baseURL}/api/ai/chat`, {
+            const response = await this.request('/api/ai/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message: message, context: context })
@@ -81,9 +141,64 @@ class PythonBackendAPI {
         return null;
     }
 
+    // Потоковый чат: onEvent(event, data) вызывается для accepted/intent/skill/chunk/done
+    async streamChat(message, onEvent, context = []) {
+        const body = JSON.stringify({ message: message, context: context });
+        let buffer = '';
+        let result = null;
+        
+        const feed = (text) => {
+            buffer += text;
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const parsed = parseSSEEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!parsed) continue;
+                
+                if (parsed.event === 'done') {
+                    result = parsed.data;
+                }
+                onEvent(parsed.event, parsed.data);
+            }
+        };
+        
+        try {
+            await this.transportReady;
+            if (this.transport !== 'http') {
+                const head = await window.electronAPI.backendStream(
+                    'POST', '/api/ai/chat/stream', body, feed
+                );
+                return head && head.status === 200 ? result : null;
+            }
+            
+            const response = await fetch(`${this.baseURL}/api/ai/chat/stream`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'X-Client-Id': this.clientId },
+                body: body
+            });
+            
+            if (!response.ok || !response.body) {
+                return null;
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                feed(decoder.decode(value, { stream: true }));
+            }
+            return result;
+        } catch (error) {
+            console.error('Ошибка потокового чата с ИИ:', error);
+        }
+        return null;
+    }
+
     async systemAction(action, params = {}) {
         try {
-            const response = await fetch(`${this.baseURL}/api/system/actions`, {
+            const response = await this.request('/api/system/actions', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ action: action, params: params })
@@ -100,7 +215,7 @@ class PythonBackendAPI {
 
     async getSystemInfo() {
         try {
-            const response = await fetch(`${this.baseURL}/api/health`);
+            const response = await this.request('/api/health');
             if (response.ok) {
                 return await response.json();
             }
@@ -0,0 +1,448 @@
+"""
+Детерминированные заменители psutil, speech_recognition и pyttsx3 для endpoint_benchmark.py:
+синтетическая таблица процессов заданного размера и распознавание по записанным WAV
+"""
+import array
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+import wave
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+GB = 1024 ** 3
+SAMPLE_RATE = 16000
+LEAD_SECONDS = 0.3  # тишина в начале синтетической записи
+SELF_CPU_PERCENT = 12.5  # CPU своего процесса: ниже порогов сброса нагрузки (admission.py)
+PROCESS_NAMES = ('chrome.exe', 'svchost.exe', 'python.exe', 'node.exe', 'explorer.exe',
+                 'Code.exe', 'electron', 'systemd', 'postgres', 'nginx', 'java', 'bash',
+                 'Discord.exe', 'steam.exe', 'kworker/0:1', 'dbus-daemon', 'sshd', 'firefox')
+STATUSES = ('running', 'sleeping', 'sleeping', 'sleeping', 'idle', 'disk-sleep', 'stopped')
+
+# Фразы синтетических записей: команды, которые Raven AI разбирает без побочных эффектов
+DEFAULT_PHRASES = ('привет', 'который час', 'состояние системы', 'какая сегодня дата',
+                   'спасибо', 'что ты умеешь')
+
+svmem = namedtuple('svmem', 'total available percent used free')
+sdiskusage = namedtuple('sdiskusage', 'total used free percent')
+snetio = namedtuple('snetio', 'bytes_sent bytes_recv packets_sent packets_recv')
+scpufreq = namedtuple('scpufreq', 'current min max')
+pmem = namedtuple('pmem', 'rss vms')
+
+
+class Error(Exception):
+    """Базовое исключение psutil"""
+
+
+class NoSuchProcess(Error):
+    def __init__(self, pid=None, name=None, msg=None):
+        super().__init__(msg or f'process no longer exists (pid={pid})')
+        self.pid = pid
+        self.name = name
+
+
+class ZombieProcess(NoSuchProcess):
+    pass
+
+
+class AccessDenied(Error):
+    def __init__(self, pid=None, name=None, msg=None):
+        super().__init__(msg or f'access denied (pid={pid})')
+        self.pid = pid
+        self.name = name
+
+
+class TimeoutExpired(Error):
+    pass
+
+
+class SyntheticSystem:
+    """Состояние машины: таблица процессов и счётчики, одинаковые при одном seed"""
+
+    def __init__(self, processes: int = 5000, seed: int = 1, cores: int = 8,
+                 total_ram: int = 32 * GB, total_disk: int = 512 * GB):
+        rng = random.Random(seed)
+        self.cores = cores
+        self.total_ram = total_ram
+        self.total_disk = total_disk
+        self.boot_time = 1700000000.0
+        self.table: Dict[int, Dict] = {}
+        pid = 1
+        for index in range(processes):
+            pid += rng.randint(1, 7)
+            # Большинство процессов спят, немногие заметно нагружают CPU и память
+            busy = rng.random() < 0.05
+            rss = int(rng.lognormvariate(17, 1.3))
+            self.table[pid] = {
+                'pid': pid,
+                'name': rng.choice(PROCESS_NAMES) if index % 3 else f'proc-{index}',
+                'cpu_percent': round(rng.uniform(5, 95), 1) if busy else round(rng.random(), 1),
+                'memory_percent': round(rss / total_ram * 100, 3),
+                'status': rng.choice(STATUSES),
+                'rss': rss,
+                'vms': rss * rng.randint(2, 6),
+                'num_threads': rng.randint(1, 64),
+                'create_time': self.boot_time + rng.randint(0, 86400),
+                # Процессы, к которым нет доступа, как у чужих служб в Windows
+                'denied': rng.random() < 0.02
+            }
+        self.pid_list = sorted(self.table)
+        self.own = {
+            'pid': os.getpid(), 'name': 'python', 'cpu_percent': SELF_CPU_PERCENT,
+            'memory_percent': 0.5, 'status': 'running', 'rss': 180 * 1024 ** 2,
+            'vms': 900 * 1024 ** 2, 'num_threads': 24, 'create_time': self.boot_time,
+            'denied': False
+        }
+        self.cpu_series = [round(rng.uniform(5, 60), 1) for _ in range(997)]
+        self.counter = itertools.count()
+        self.net_counter = itertools.count()
+
+    def entry(self, pid: Optional[int]) -> Dict:
+        if pid is None or pid == self.own['pid']:
+            return self.own
+        entry = self.table.get(pid)
+        if entry is None:
+            raise NoSuchProcess(pid)
+        return entry
+
+    def next_cpu(self) -> float:
+        return self.cpu_series[next(self.counter) % len(self.cpu_series)]
+
+
+class FakeProcess:
+    """psutil.Process поверх записи синтетической таблицы"""
+
+    def __init__(self, system: SyntheticSystem, pid: Optional[int] = None):
+        self._system = system
+        self._entry = system.entry(pid)
+        self.pid = self._entry['pid']
+        self.info = None
+
+    def _get(self, key: str):
+        if self._entry.get('terminated'):
+            raise NoSuchProcess(self.pid)
+        if self._entry['denied'] and key in ('rss', 'vms', 'num_threads'):
+            raise AccessDenied(self.pid)
+        return self._entry[key]
+
+    def name(self) -> str:
+        return self._get('name')
+
+    def status(self) -> str:
+        return self._get('status')
+
+    def cpu_percent(self, interval=None) -> float:
+        return self._get('cpu_percent')
+
+    def memory_percent(self) -> float:
+        return self._get('memory_percent')
+
+    def memory_info(self):
+        return pmem(self._get('rss'), self._get('vms'))
+
+    def num_threads(self) -> int:
+        return self._get('num_threads')
+
+    def create_time(self) -> float:
+        return self._get('create_time')
+
+    def is_running(self) -> bool:
+        return not self._entry.get('terminated')
+
+    def terminate(self):
+        self._get('pid')
+        self._entry['terminated'] = True
+
+    kill = terminate
+
+    def __eq__(self, other):
+        return isinstance(other, FakeProcess) and other.pid == self.pid
+
+    def __hash__(self):
+        return hash(self.pid)
+
+
+def make_psutil(system: SyntheticSystem) -> types.ModuleType:
+    """Модуль с тем подмножеством API psutil, которое использует бэкенд"""
+    module = types.ModuleType('psutil')
+    module.__version__ = '0.0-benchmark'
+    module.version_info = (0, 0)
+    module.Error = Error
+    module.NoSuchProcess = NoSuchProcess
+    module.ZombieProcess = ZombieProcess
+    module.AccessDenied = AccessDenied
+    module.TimeoutExpired = TimeoutExpired
+    # Как у psutil: объекты Process между вызовами process_iter (memory_diagnostics.py)
+    module._pmap = {}
+
+    def process(pid=None):
+        return FakeProcess(system, pid)
+
+    def process_iter(attrs=None, ad_value=None):
+        for pid in system.pid_list:
+            entry = system.table[pid]
+            if entry.get('terminated'):
+                continue
+            proc = module._pmap.get(pid)
+            if proc is None:
+                proc = module._pmap[pid] = FakeProcess(system, pid)
+            if attrs is not None:
+                proc.info = {name: (ad_value if entry['denied'] and name not in ('pid', 'name')
+                                    else entry.get(name, ad_value)) for name in attrs}
+            yield proc
+
+    process_iter.cache_clear = module._pmap.clear
+
+    def cpu_percent(interval=None, percpu=False):
+        if percpu:
+            return [system.next_cpu() for _ in range(system.cores)]
+        return system.next_cpu()
+
+    def virtual_memory():
+        used = int(system.total_ram * 0.42)
+        return svmem(system.total_ram, system.total_ram - used, 42.0, used,
+                     system.total_ram - used)
+
+    def disk_usage(path):
+        used = int(system.total_disk * 0.61)
+        return sdiskusage(system.total_disk, used, system.total_disk - used, 61.0)
+
+    def net_io_counters(pernic=False):
+        step = next(system.net_counter)
+        return snetio(1000000 + step * 4096, 5000000 + step * 16384, 1000 + step, 4000 + step)
+
+    module.Process = process
+    module.process_iter = process_iter
+    module.pids = lambda: list(system.pid_list)
+    module.pid_exists = lambda pid: pid in system.table
+    module.cpu_percent = cpu_percent
+    module.cpu_count = lambda logical=True: system.cores if logical else system.cores // 2
+    module.cpu_freq = lambda percpu=False: scpufreq(2900.0, 800.0, 4200.0)
+    module.virtual_memory = virtual_memory
+    module.disk_usage = disk_usage
+    module.net_io_counters = net_io_counters
+    module.boot_time = lambda: system.boot_time
+    return module
+
+
+def synthesize_phrase(text: str, rng: random.Random) -> array.array:
+    """Тональные слоги на фоне шума: по слогу на каждые три буквы фразы"""
+    samples = array.array('h')
+    for _ in range(int(SAMPLE_RATE * LEAD_SECONDS)):  # тишина до речи
+        samples.append(int(rng.gauss(0, 60)))
+    for index in range(max(1, len(text) // 3)):
+        frequency = 180 + (ord(text[index * 3 % len(text)]) % 40) * 8
+        length = int(SAMPLE_RATE * rng.uniform(0.12, 0.22))
+        for n in range(length):
+            envelope = math.sin(math.pi * n / length)
+            value = 9000 * envelope * math.sin(2 * math.pi * frequency * n / SAMPLE_RATE)
+            samples.append(int(max(-32767, min(32767, value + rng.gauss(0, 60)))))
+    for _ in range(int(SAMPLE_RATE * 0.2)):
+        samples.append(int(rng.gauss(0, 60)))
+    return samples
+
+
+def write_recordings(directory: str, phrases=DEFAULT_PHRASES, seed: int = 1) -> List[Tuple[str, str]]:
+    """Синтетические записи (16 кГц, моно, 16 бит) и transcripts.json с их текстом"""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    transcripts = {}
+    for index, text in enumerate(phrases):
+        filename = f'phrase_{index:02d}.wav'
+        with wave.open(os.path.join(directory, filename), 'wb') as output:
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(SAMPLE_RATE)
+            output.writeframes(synthesize_phrase(text, rng).tobytes())
+        transcripts[filename] = text
+    with open(os.path.join(directory, 'transcripts.json'), 'w', encoding='utf-8') as f:
+        json.dump(transcripts, f, ensure_ascii=False, indent=2)
+    return load_recordings(directory)
+
+
+def load_recordings(directory: str) -> List[Tuple[str, str]]:
+    """Пары (путь к WAV, текст) из transcripts.json каталога записей"""
+    with open(os.path.join(directory, 'transcripts.json'), encoding='utf-8') as f:
+        transcripts = json.load(f)
+    return [(os.path.join(directory, name), text) for name, text in sorted(transcripts.items())]
+
+
+def rms(frames: bytes) -> float:
+    samples = array.array('h', frames)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class AudioData:
+    """Фраза из записи: PCM и текст, который вернёт распознавание"""
+
+    def __init__(self, frame_data: bytes, sample_rate: int, sample_width: int, transcript: str):
+        self.frame_data = frame_data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.transcript = transcript
+
+    def get_wav_data(self) -> bytes:
+        return self.frame_data
+
+
+class Recordings:
+    """Записи по кругу; чтение WAV с диска при каждом прослушивании, как с устройства"""
+
+    def __init__(self, recordings: List[Tuple[str, str]]):
+        self.recordings = recordings
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def read(self, advance: bool) -> AudioData:
+        """Следующая запись; advance=False - без перехода (шум перед фразой)"""
+        with self.lock:
+            path, text = self.recordings[self.position % len(self.recordings)]
+            if advance:
+                self.position += 1
+        with wave.open(path, 'rb') as source:
+            frames = source.readframes(source.getnframes())
+            return AudioData(frames, source.getframerate(), source.getsampwidth(), text)
+
+
+def make_speech_recognition(recordings: Recordings) -> types.ModuleType:
+    """speech_recognition: микрофон отдаёт записи, распознавание - их текст"""
+    module = types.ModuleType('speech_recognition')
+    module.__version__ = '0.0-benchmark'
+    module.AudioData = AudioData
+
+    class UnknownValueError(Exception):
+        pass
+
+    class RequestError(Exception):
+        pass
+
+    class WaitTimeoutError(Exception):
+        pass
+
+    class Microphone:
+        SAMPLE_RATE = SAMPLE_RATE
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    class Recognizer:
+        def __init__(self):
+            self.energy_threshold = 300.0
+
+        def adjust_for_ambient_noise(self, source, duration=1.0):
+            # Порог по тишине перед фразой, как у настоящего распознавателя
+            audio = recordings.read(advance=False)
+            duration = min(duration, LEAD_SECONDS)
+            head = audio.frame_data[:int(audio.sample_rate * duration) * audio.sample_width]
+            self.energy_threshold = max(rms(head) * 3, 50.0)
+
+        def listen(self, source, timeout=None, phrase_time_limit=None):
+            audio = recordings.read(advance=True)
+            if rms(audio.frame_data) < self.energy_threshold:
+                raise WaitTimeoutError('listening timed out while waiting for phrase to start')
+            return audio
+
+        def recognize_google(self, audio_data, language='en-US', **kwargs):
+            if not audio_data.transcript:
+                raise UnknownValueError()
+            return audio_data.transcript
+
+        recognize_sphinx = recognize_google
+
+    module.UnknownValueError = UnknownValueError
+    module.RequestError = RequestError
+    module.WaitTimeoutError = WaitTimeoutError
+    module.Microphone = Microphone
+    module.Recognizer = Recognizer
+    return module
+
+
+class FakeEngine:
+    """Движок pyttsx3 без звука: runAndWait занимает speech_rate секунд на символ"""
+
+    Voice = namedtuple('Voice', 'id name languages')
+
+    def __init__(self, speech_rate: float = 0.0):
+        self.speech_rate = speech_rate
+        self.properties = {'rate': 200, 'volume': 1.0, 'voice': 'en'}
+        self.queue = []
+        self.spoken_chars = 0
+        self.lock = threading.Lock()
+
+    def getProperty(self, name):
+        if name == 'voices':
+            return [self.Voice('en', 'English', ['en_US']), self.Voice('ru', 'Russian', ['ru_RU'])]
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def say(self, text, name=None):
+        with self.lock:
+            self.queue.append(text)
+
+    def runAndWait(self):
+        with self.lock:
+            chars = sum(len(text) for text in self.queue)
+            self.queue = []
+            self.spoken_chars += chars
+        if self.speech_rate:
+            time.sleep(chars * self.speech_rate)
+
+    def stop(self):
+        with self.lock:
+            self.queue = []
+
+
+def make_pyttsx3(engine: FakeEngine) -> types.ModuleType:
+    module = types.ModuleType('pyttsx3')
+    module.init = lambda driverName=None, debug=False: engine
+    return module
+
+
+class FakeBackends:
+    """Установленные заменители и их состояние для отчёта бенчмарка"""
+
+    def __init__(self, system: SyntheticSystem, engine: FakeEngine, recordings: List[Tuple[str, str]]):
+        self.system = system
+        self.engine = engine
+        self.recordings = recordings
+
+    def describe(self) -> Dict:
+        return {
+            'processes': len(self.system.pid_list),
+            'cores': self.system.cores,
+            'recordings': [os.path.basename(path) for path, _ in self.recordings],
+            'tts_speech_rate': self.engine.speech_rate
+        }
+
+
+def install(processes: int = 5000, seed: int = 1, recordings_dir: Optional[str] = None,
+            speech_rate: float = 0.0) -> FakeBackends:
+    """Подмена модулей в sys.modules; вызывать до импорта бэкенда"""
+    for name in ('psutil', 'speech_recognition', 'pyttsx3'):
+        if name in sys.modules:
+            raise RuntimeError(f'{name} уже импортирован, заменитель не подействует')
+    system = SyntheticSystem(processes, seed)
+    if recordings_dir and os.path.exists(os.path.join(recordings_dir, 'transcripts.json')):
+        recordings = load_recordings(recordings_dir)
+    else:
+        recordings = write_recordings(recordings_dir or tempfile.mkdtemp(prefix='raven-wav-'),
+                                      seed=seed)
+    engine = FakeEngine(speech_rate)
+    sys.modules['psutil'] = make_psutil(system)
+    sys.modules['speech_recognition'] = make_speech_recognition(Recordings(recordings))
+    sys.modules['pyttsx3'] = make_pyttsx3(engine)
+    return FakeBackends(system, engine, recordings)
@@ -0,0 +1,154 @@
+"""
+Адаптивный интервал опроса: реже, когда данные никто не смотрит (нет клиентов, окно свёрнуто
+или скрыто), чаще на всплесках нагрузки. Используется сэмплером бэкенда и таймерами Qt
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+IDLE_INTERVAL = float(os.environ.get('RAVEN_SAMPLER_IDLE_INTERVAL', 10.0))
+FAST_INTERVAL = float(os.environ.get('RAVEN_SAMPLER_FAST_INTERVAL', 0.5))
+IDLE_AFTER = float(os.environ.get('RAVEN_SAMPLER_IDLE_AFTER', 30.0))
+
+# Всплеск: загрузка CPU или памяти выше порога либо резкий скачок CPU между замерами;
+# частый опрос держится SPIKE_HOLD секунд после последнего всплеска
+SPIKE_CPU = float(os.environ.get('RAVEN_SPIKE_CPU', 80))
+SPIKE_RAM = float(os.environ.get('RAVEN_SPIKE_RAM', 90))
+SPIKE_JUMP = 30.0
+SPIKE_HOLD = 15.0
+
+# Режимы в порядке кодов (раскладка общей памяти shared_metrics.py)
+MODES = ('normal', 'fast', 'idle', 'hidden')
+
+
+class Cadence:
+    """Текущий интервал по спросу, видимости и нагрузке (секунды)"""
+
+    def __init__(self, interval: float, idle_interval: Optional[float] = IDLE_INTERVAL,
+                 fast_interval: Optional[float] = FAST_INTERVAL,
+                 idle_after: Optional[float] = IDLE_AFTER):
+        self.interval = interval
+        # None - режим выключен: idle_interval=None в скрытом окне останавливает опрос
+        self.idle_interval = idle_interval
+        self.fast_interval = fast_interval
+        self.idle_after = idle_after
+        self.last_demand = time.time()
+        self.demand_sources: List[Callable[[], float]] = []
+        self.hidden = False
+        self.spike_until = 0.0
+        self.spikes = 0
+        self.previous_cpu = None
+        self.mode = 'normal'
+        self.reason = 'старт'
+        self.changed_at = time.time()
+        self.changes = 0
+        self.lock = threading.Lock()
+
+    def touch(self, now: Optional[float] = None) -> bool:
+        """Клиент прочитал данные; True, если опрос был замедлен из-за отсутствия спроса"""
+        now = now or time.time()
+        with self.lock:
+            idle = self._idle(now)
+            self.last_demand = now
+        return idle
+
+    def add_demand_source(self, source: Callable[[], float]):
+        """Внешний спрос: source() -> время последнего чтения (обработчики prefork)"""
+        with self.lock:
+            self.demand_sources.append(source)
+
+    def set_hidden(self, hidden: bool) -> bool:
+        """Видимость окна; True, если режим изменился"""
+        with self.lock:
+            self.hidden = hidden
+        return self.update()
+
+    def observe(self, cpu: Optional[float], ram: Optional[float] = None,
+                now: Optional[float] = None) -> bool:
+        """Учёт замера нагрузки; True, если режим изменился"""
+        now = now or time.time()
+        with self.lock:
+            spike = ((cpu is not None and cpu >= SPIKE_CPU) or
+                     (ram is not None and ram >= SPIKE_RAM) or
+                     (cpu is not None and self.previous_cpu is not None
+                      and cpu - self.previous_cpu >= SPIKE_JUMP))
+            if cpu is not None:
+                self.previous_cpu = cpu
+            if spike:
+                if now >= self.spike_until:
+                    self.spikes += 1
+                self.spike_until = now + SPIKE_HOLD
+        return self.update(now)
+
+    def _last_demand(self) -> float:
+        """Последнее чтение с учётом внешних источников (вызывать под lock)"""
+        last = self.last_demand
+        for source in self.demand_sources:
+            try:
+                last = max(last, source() or 0.0)
+            except Exception:
+                pass
+        return last
+
+    def _idle(self, now: float) -> bool:
+        """Давно ли были чтения (вызывать под lock)"""
+        if self.idle_after is None or self.idle_interval is None:
+            return False
+        return now - self._last_demand() >= self.idle_after
+
+    def _evaluate(self, now: float) -> Tuple[str, str]:
+        """Режим и причина: невидимость и отсутствие спроса важнее всплесков"""
+        if self.hidden:
+            return 'hidden', 'окно свёрнуто или скрыто'
+        if self._idle(now):
+            return 'idle', f'нет чтений {int(self.idle_after)} с'
+        if self.fast_interval is not None and now < self.spike_until:
+            return 'fast', 'всплеск нагрузки'
+        return 'normal', 'обычный режим'
+
+    def update(self, now: Optional[float] = None) -> bool:
+        """Пересчёт режима; True, если он изменился"""
+        now = now or time.time()
+        with self.lock:
+            mode, reason = self._evaluate(now)
+            self.reason = reason
+            if mode == self.mode:
+                return False
+            self.mode = mode
+            self.changed_at = now
+            self.changes += 1
+            return True
+
+    def current(self, now: Optional[float] = None) -> Tuple[str, Optional[float]]:
+        """Режим и интервал (None - опрос остановлен)"""
+        self.update(now)
+        with self.lock:
+            return self.mode, self.interval_for(self.mode)
+
+    def interval_for(self, mode: str) -> Optional[float]:
+        if mode in ('idle', 'hidden'):
+            return self.idle_interval
+        if mode == 'fast':
+            return self.fast_interval
+        return self.interval
+
+    def get_stats(self) -> Dict[str, Any]:
+        mode, interval = self.current()
+        now = time.time()
+        with self.lock:
+            return {
+                'mode': mode,
+                'reason': self.reason,
+                'interval_seconds': interval,
+                'intervals': {
+                    'normal': self.interval,
+                    'fast': self.fast_interval,
+                    'idle': self.idle_interval
+                },
+                'mode_since': round(now - self.changed_at, 1),
+                'mode_changes': self.changes,
+                'spikes': self.spikes,
+                'last_demand_seconds': round(now - self._last_demand(), 1),
+                'hidden': self.hidden
+            }
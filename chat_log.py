@@ -0,0 +1,200 @@
+"""
+Постоянная история чата: журнал SQLite (WAL) с индексами по времени и сессии
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DB_PATH = os.environ.get('RAVEN_HISTORY_DB', 'data/chat_history.db')
+DEFAULT_RETENTION_DAYS = float(os.environ.get('RAVEN_HISTORY_RETENTION_DAYS', 30))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('RAVEN_HISTORY_MAX_ENTRIES', 100000))
+RETENTION_EVERY = 500  # политика хранения применяется раз в N добавлений
+MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    session_id TEXT,
+    model TEXT,
+    user TEXT,
+    ai TEXT,
+    settings TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_chat_history_ts ON chat_history (ts);
+CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history (session_id, id);
+"""
+
+
+def parse_time(value: Any) -> Optional[float]:
+    """Время из параметра запроса: unix-время или ISO 8601"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+class ChatHistoryStore:
+    """Журнал сообщений только на добавление с постраничным чтением и ретенцией"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 retention_days: Optional[float] = DEFAULT_RETENTION_DAYS,
+                 max_entries: Optional[int] = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.retention_days = retention_days or None
+        self.max_entries = max_entries or None
+        self.local = threading.local()
+        self.connections = 0
+        self.appends = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        self.apply_retention()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (sqlite3 не разделяет соединения между потоками)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+            with self.lock:
+                self.connections += 1
+        return conn
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        settings = row['settings']
+        return {
+            'id': row['id'],
+            'user': row['user'],
+            'ai': row['ai'],
+            'model': row['model'],
+            'settings': json.loads(settings) if settings else {},
+            'session_id': row['session_id'],
+            'timestamp': datetime.fromtimestamp(row['ts']).isoformat()
+        }
+
+    def append(self, entry: Dict[str, Any]) -> int:
+        """Добавление записи, возвращает её ID"""
+        ts = parse_time(entry.get('timestamp')) or time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO chat_history (ts, session_id, model, user, ai, settings) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (ts, entry.get('session_id'), entry.get('model'), entry.get('user'),
+             entry.get('ai'), json.dumps(entry.get('settings') or {}, ensure_ascii=False))
+        )
+        with self.lock:
+            self.appends += 1
+            run_retention = self.appends % RETENTION_EVERY == 0
+        if run_retention:
+            self.apply_retention()
+        return cursor.lastrowid
+
+    def page(self, before: Optional[int] = None, limit: int = 50,
+             session_id: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None) -> Dict[str, Any]:
+        """Страница записей до курсора before (по убыванию ID), в хронологическом порядке"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        conditions, params = [], []
+        if before is not None:
+            conditions.append('id < ?')
+            params.append(before)
+        if session_id:
+            conditions.append('session_id = ?')
+            params.append(session_id)
+        if since is not None:
+            conditions.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('ts < ?')
+            params.append(until)
+
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        rows = self._connection().execute(
+            f'SELECT * FROM chat_history {where} ORDER BY id DESC LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        entries = [self._row_to_entry(row) for row in reversed(rows)]
+        return {
+            'history': entries,
+            'next_before': entries[0]['id'] if has_more and entries else None
+        }
+
+    def count(self, session_id: Optional[str] = None) -> int:
+        """Количество записей (всего или в сессии)"""
+        if session_id:
+            row = self._connection().execute(
+                'SELECT COUNT(*) FROM chat_history WHERE session_id = ?', (session_id,)
+            ).fetchone()
+        else:
+            row = self._connection().execute('SELECT COUNT(*) FROM chat_history').fetchone()
+        return row[0]
+
+    def clear(self, session_id: Optional[str] = None) -> int:
+        """Удаление записей (всех или одной сессии)"""
+        if session_id:
+            cursor = self._connection().execute(
+                'DELETE FROM chat_history WHERE session_id = ?', (session_id,))
+        else:
+            cursor = self._connection().execute('DELETE FROM chat_history')
+        return cursor.rowcount
+
+    def apply_retention(self) -> int:
+        """Удаление записей старше retention_days и сверх max_entries"""
+        conn = self._connection()
+        removed = 0
+        if self.retention_days:
+            cutoff = time.time() - self.retention_days * 86400
+            removed += conn.execute('DELETE FROM chat_history WHERE ts < ?', (cutoff,)).rowcount
+        if self.max_entries:
+            removed += conn.execute(
+                'DELETE FROM chat_history WHERE id <= ('
+                'SELECT id FROM chat_history ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Размер журнала и политика хранения"""
+        return {
+            'path': self.db_path,
+            'entries': self.count(),
+            'retention_days': self.retention_days,
+            'max_entries': self.max_entries
+        }
+
+
+class HistoryConnectionCache:
+    """Соединения журнала в диагностике памяти: урезание сбрасывает кэш страниц SQLite,
+    записи журнала не удаляются (их объём задаёт только политика хранения)"""
+
+    def __init__(self, store: ChatHistoryStore):
+        self.store = store
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        path = self.store.db_path
+        size = sum(os.path.getsize(path + suffix) for suffix in ('', '-wal')
+                   if os.path.exists(path + suffix))
+        return {'entries': self.store.connections, 'file_bytes': size}
+
+    def trim(self, budget: Optional[int]) -> int:
+        """Сброс кэшей соединения текущего потока (соединения других потоков недоступны)"""
+        conn = getattr(self.store.local, 'conn', None)
+        if conn is None:
+            return 0
+        conn.execute('PRAGMA shrink_memory')
+        return 0
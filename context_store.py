@@ -0,0 +1,168 @@
+"""
+Контекстная память по сессиям клиентов с ограничением памяти
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SESSION = 'default'
+
+
+def estimate_entry_size(entry: Dict[str, Any]) -> int:
+    """Приблизительный размер записи контекста в байтах"""
+    size = 64
+    for key, value in entry.items():
+        size += len(key) + len(str(value)) * 2 + 16
+    return size
+
+
+class SessionContext:
+    """Контекст одной сессии: deque фиксированной ёмкости"""
+
+    def __init__(self, capacity: int):
+        self.entries = deque(maxlen=capacity)
+        self.bytes = 0
+        self.last_access = time.time()
+
+    def append(self, entry: Dict[str, Any]):
+        """Добавление записи с учётом вытесняемой"""
+        size = estimate_entry_size(entry)
+        if len(self.entries) == self.entries.maxlen:
+            self.bytes -= self.entries[0][1]
+        self.entries.append((entry, size))
+        self.bytes += size
+        self.last_access = time.time()
+
+    def pop_oldest(self) -> int:
+        """Удаление самой старой записи, возвращает освобождённый размер"""
+        if not self.entries:
+            return 0
+        _, size = self.entries.popleft()
+        self.bytes -= size
+        return size
+
+    def items(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Записи сессии (последние limit)"""
+        self.last_access = time.time()
+        entries = [entry for entry, _ in self.entries]
+        if limit is not None and limit > 0:
+            return entries[-limit:]
+        return entries
+
+
+class SessionContextStore:
+    """Хранилище контекстов по ID сессии с LRU-вытеснением и общим бюджетом памяти"""
+
+    def __init__(self, capacity: int = 10, max_sessions: int = 256,
+                 idle_timeout: float = 1800, memory_budget: int = 8 * 1024 * 1024):
+        self.capacity = capacity
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_budget = memory_budget
+
+        self.sessions = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _get_session(self, session_id: str, create: bool) -> Optional[SessionContext]:
+        """Получение сессии с переносом в конец LRU (вызывать под lock)"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        elif create:
+            session = SessionContext(self.capacity)
+            self.sessions[session_id] = session
+        return session
+
+    def _drop_session(self, session_id: str):
+        """Удаление сессии целиком (вызывать под lock)"""
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.total_bytes -= session.bytes
+            self.evictions += 1
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        """Вытеснение простаивающих и давно не используемых сессий (вызывать под lock)"""
+        now = time.time()
+        for session_id in list(self.sessions):
+            session = self.sessions[session_id]
+            if session_id != keep and now - session.last_access > self.idle_timeout:
+                self._drop_session(session_id)
+
+        while len(self.sessions) > self.max_sessions:
+            oldest = next(iter(self.sessions))
+            if oldest == keep:
+                break
+            self._drop_session(oldest)
+
+        while self.total_bytes > self.memory_budget and self.sessions:
+            oldest = next(iter(self.sessions))
+            if oldest == keep:
+                # Остаётся только активная сессия: урезаем её историю
+                session = self.sessions[oldest]
+                if len(session.entries) <= 1:
+                    break
+                self.total_bytes -= session.pop_oldest()
+                continue
+            self._drop_session(oldest)
+
+    def append(self, session_id: Optional[str], entry: Dict[str, Any]):
+        """Добавление записи в контекст сессии"""
+        session_id = session_id or DEFAULT_SESSION
+        with self.lock:
+            session = self._get_session(session_id, create=True)
+            before = session.bytes
+            session.append(entry)
+            self.total_bytes += session.bytes - before
+            self._enforce_limits(keep=session_id)
+
+    def get(self, session_id: Optional[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Контекст сессии (пустой список для неизвестной сессии)"""
+        with self.lock:
+            session = self._get_session(session_id or DEFAULT_SESSION, create=False)
+            return session.items(limit) if session else []
+
+    def count(self, session_id: Optional[str]) -> int:
+        """Количество записей в сессии"""
+        with self.lock:
+            session = self.sessions.get(session_id or DEFAULT_SESSION)
+            return len(session.entries) if session else 0
+
+    def clear(self, session_id: Optional[str] = None):
+        """Очистка одной сессии или всех"""
+        with self.lock:
+            if session_id is None:
+                self.sessions.clear()
+                self.total_bytes = 0
+            else:
+                session = self.sessions.pop(session_id, None)
+                if session is not None:
+                    self.total_bytes -= session.bytes
+
+    def trim(self, budget: Optional[int]) -> int:
+        """Вытеснение простаивающих сессий и давно не используемых сверх budget"""
+        with self.lock:
+            before = len(self.sessions)
+            self._enforce_limits()
+            while budget is not None and len(self.sessions) > budget:
+                self._drop_session(next(iter(self.sessions)))
+            return before - len(self.sessions)
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Размер для диагностики памяти: сессии и оценка байт"""
+        with self.lock:
+            return {'entries': len(self.sessions), 'bytes': self.total_bytes}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика хранилища"""
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'capacity_per_session': self.capacity,
+                'max_sessions': self.max_sessions,
+                'memory_bytes': self.total_bytes,
+                'memory_budget': self.memory_budget,
+                'evictions': self.evictions
+            }
@@ -210,6 +210,7 @@ RavenApp.prototype.updateDashboardMetrics = async function() {
         // Обновляем статистику
         this.updateStats(metrics);
     }
+    return metrics;
 };
 
 RavenApp.prototype.updateStats = function(metrics) {
@@ -14,6 +14,7 @@ from PyQt6.QtGui import QFont
 
 from ui.components.metric_card import MetricCard
 from ui.components.chat_message import ChatMessage
+from ui.components.adaptive_timer import AdaptiveTimer
 
 class DashboardPage(QWidget):
     """Страница дашборда"""
@@ -285,9 +286,9 @@ class DashboardPage(QWidget):
     
     def setup_timers(self):
         """Настройка таймеров"""
-        self.metrics_timer = QTimer()
-        self.metrics_timer.timeout.connect(self.update_metrics)
-        self.metrics_timer.start(3000)
+        # Пока страница скрыта или окно свёрнуто, метрики не опрашиваются
+        self.metrics_timer = AdaptiveTimer(self, self.update_metrics, 3000, fast_ms=1000)
+        self.metrics_timer.start()
         
         self.update_metrics()
         self.update_processes_list()
@@ -300,6 +301,7 @@ class DashboardPage(QWidget):
             
             ram = psutil.virtual_memory()
             self.ram_card.set_value(f"{ram.percent:.1f}%")
+            self.metrics_timer.observe(cpu_percent, ram.percent)
             
             disk = psutil.disk_usage('C:/' if os.name == 'nt' else '/')
             self.disk_card.set_value(f"{disk.percent:.1f}%")
@@ -406,11 +408,19 @@ class DashboardPage(QWidget):
         self.raven.speak(f"CPU {cpu} percent, RAM {ram} percent, Disk {disk} percent")
     
     def clean_ram(self):
-        """Очистка RAM"""
-        import gc
-        gc.collect()
-        self.add_chat_message("RAM cleaned up", False)
-        self.raven.speak("RAM cleaned")
+        """Урезание кэшей бэкенда до бюджетов и сборка мусора (запрос к процессу Flask)"""
+        from core.memory_diagnostics import trim_backend
+        try:
+            result = trim_backend()
+        except Exception as e:
+            self.add_chat_message(f"Backend memory trim failed: {e}", False)
+            return
+        freed_mb = result['freed_bytes'] / (1024 ** 2)
+        self.add_chat_message(
+            f"Backend memory trimmed: {freed_mb:.1f} MB freed, "
+            f"{result['gc_collected']} objects collected",
+            False)
+        self.raven.speak(f"Freed {freed_mb:.0f} megabytes")
     
     def take_screenshot(self):
         """Сделать скриншот"""
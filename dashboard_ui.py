@@ -19,6 +19,8 @@ import threading
 import json
 import math
 
+from ui.components.adaptive_timer import AdaptiveTimer
+
 class RoundedCard(QFrame):
     """Карточка с закруглёнными углами в стиле дашборда"""
     def __init__(self, parent=None, radius=12, bg_color="#ffffff"):
@@ -711,9 +713,9 @@ class DashboardUIWindow(QMainWindow):
     
     def setup_timers(self):
         """Настройка таймеров"""
-        self.system_timer = QTimer()
-        self.system_timer.timeout.connect(self.update_dashboard)
-        self.system_timer.start(2000)
+        # Свёрнутое окно не опрашивает систему, на всплесках нагрузки - раз в секунду
+        self.system_timer = AdaptiveTimer(self, self.update_dashboard, 2000, fast_ms=1000)
+        self.system_timer.start()
     
     def update_dashboard(self):
         """Обновление данных на дашборде"""
@@ -725,6 +727,7 @@ class DashboardUIWindow(QMainWindow):
             # RAM
             ram = psutil.virtual_memory()
             self.ram_card.value_label.setText(f"{ram.percent:.1f}%")
+            self.system_timer.observe(cpu_percent, ram.percent)
             
             # Disk
             disk = psutil.disk_usage('C:/' if os.name == 'nt' else '/')
@@ -905,10 +908,20 @@ Disk Space: {psutil.disk_usage('C:/' if os.name == 'nt' else '/').total / (1024*
             self.add_chat_message("System", f"Error getting system info: {e}", False)
     
     def clean_ram(self):
-        """Очистка RAM (имитация)"""
-        import gc
-        gc.collect()
-        self.add_chat_message("System", "RAM cleanup initiated", False)
+        """Урезание кэшей бэкенда до бюджетов и сборка мусора (запрос к процессу Flask)"""
+        from core.memory_diagnostics import trim_backend
+        try:
+            result = trim_backend()
+        except Exception as e:
+            self.add_chat_message("System", f"Backend memory trim failed: {e}", False)
+            return
+        caches = ', '.join(f"{name}: {count}" for name, count in result['removed'].items() if count)
+        self.add_chat_message(
+            "System",
+            f"Backend memory trimmed: {result['freed_bytes'] / (1024 ** 2):.1f} MB freed, "
+            f"{result['gc_collected']} objects collected"
+            + (f" (removed {caches})" if caches else ""),
+            False)
     
     def take_screenshot(self):
         """Сделать скриншот"""
@@ -0,0 +1,342 @@
+"""
+Бенчмарк маршрутов API в одном процессе: python_api.app через тестовый клиент Flask,
+psutil и аудио заменены детерминированными заменителями (benchmark_fakes.py)
+
+Использование:
+    python endpoint_benchmark.py                                  # все сценарии, сводная таблица
+    python endpoint_benchmark.py --concurrency 1,16 --json new.json
+    python endpoint_benchmark.py --json new.json --compare base.json --threshold 10
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import benchmark_fakes
+from server_loadtest import summarize
+
+# Заголовки, которые отправляет панель Electron (app.js)
+CLIENT_HEADERS = {'Accept-Encoding': 'gzip, deflate, br', 'Accept': 'application/json'}
+CHAT_MESSAGES = ('привет', 'который час', 'система память cpu', 'что такое python',
+                 'расскажи шутку', 'спасибо')
+COMMANDS = ('привет', 'время', 'состояние системы', 'что ты умеешь', 'спасибо')
+UNLIMITED_POLICY = {'concurrency': None, 'client_rate': None, 'route_rate': None, 'shed_level': None}
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+
+
+class Scenario:
+    """Маршрут под нагрузкой: request(client, index) -> код ответа;
+    requires - компоненты бэкенда (warmup.py), без которых путь не выполняется"""
+
+    def __init__(self, name: str, request: Callable[[Any, int], int], concurrent: bool = True,
+                 description: str = '', requires: Tuple[str, ...] = ()):
+        self.name = name
+        self.request = request
+        self.concurrent = concurrent
+        self.description = description
+        self.requires = requires
+
+
+def http_scenario(name: str, method: str, path: Union[str, Callable[[int], str]],
+                  body: Optional[Callable[[int], Dict[str, Any]]] = None,
+                  description: str = '', requires: Tuple[str, ...] = ()) -> Scenario:
+    """Запрос к маршруту; path и body могут зависеть от номера запроса"""
+    def request(client, index: int) -> int:
+        url = path(index) if callable(path) else path
+        response = client.open(url, method=method, headers=CLIENT_HEADERS,
+                               json=body(index) if body else None)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    return Scenario(name, request, description=description, requires=requires)
+
+
+def build_scenarios(api, processes: int) -> List[Scenario]:
+    """Сценарии: опрос панели, полный список процессов, чат, команды и голосовой цикл"""
+
+    def voice_request(client, index: int) -> int:
+        # Микрофон один на процесс, как в RavenAI: цикл только последовательный
+        raven = api.get_raven_ai()
+        text = raven.listen(timeout=5)
+        if text is None:
+            return 500
+        raven.process_command(text)
+        return 200
+
+    return [
+        http_scenario('system_metrics', 'GET', '/api/system/metrics',
+                      description='опрос метрик панелью'),
+        http_scenario('system_processes', 'GET', '/api/system/processes?limit=20&sort_by=cpu',
+                      description='первые 20 процессов'),
+        http_scenario('system_processes_full', 'GET',
+                      f'/api/system/processes?limit={processes}&sort_by=memory',
+                      description='вся таблица процессов по памяти'),
+        # Ключ снимка меняется чаще, чем помещается в кэш: каждый запрос - новый обход
+        http_scenario('system_processes_cold', 'GET',
+                      lambda index: f'/api/system/processes?limit={processes - index % 97}'
+                                    f'&sort_by=memory',
+                      description='обход без кэша снимков'),
+        http_scenario('ai_chat', 'POST', '/api/ai/chat',
+                      lambda index: {'message': CHAT_MESSAGES[index % len(CHAT_MESSAGES)],
+                                     'session_id': f'bench-{index % 8}'},
+                      description='Neural Core, сессии по кругу', requires=('neural_core',)),
+        http_scenario('command', 'POST', '/api/command',
+                      lambda index: {'command': COMMANDS[index % len(COMMANDS)]},
+                      description='Raven AI и синтез речи', requires=('raven_ai',)),
+        Scenario('voice', voice_request, concurrent=False,
+                 description='запись -> распознавание -> команда -> синтез',
+                 requires=('raven_ai',))
+    ]
+
+
+def run_scenario(app, scenario: Scenario, concurrency: int, requests: int,
+                 warmup: int) -> Dict[str, Any]:
+    """requests запросов в concurrency потоках, у каждого потока свой тестовый клиент"""
+    for index in range(warmup):
+        scenario.request(app.test_client(), index)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(offset: int):
+        nonlocal errors
+        client = app.test_client()
+        local, local_statuses, local_errors = [], {}, 0
+        barrier.wait()
+        for index in range(offset, requests, concurrency):
+            start = time.perf_counter()
+            try:
+                status = scenario.request(client, index)
+            except Exception:
+                status = 'exception'
+            local.append(time.perf_counter() - start)
+            local_statuses[str(status)] = local_statuses.get(str(status), 0) + 1
+            if status not in (200, 304):
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(offset,), name=f'bench-{offset}')
+               for offset in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = summarize(latencies, errors, elapsed)
+    result['p90_ms'] = round(sorted(latencies)[int(len(latencies) * 0.9)] * 1000, 2) \
+        if latencies else None
+    result['mean_ms'] = round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None
+    result['statuses'] = statuses
+    result['concurrency'] = concurrency
+    return result
+
+
+def missing_components(api, scenario: Scenario) -> Dict[str, str]:
+    """Компоненты сценария, которые не загрузились: имя -> состояние и ошибка"""
+    components = api.warmup.report()['components']
+    missing = {}
+    for name in scenario.requires:
+        info = components.get(name, {'state': 'unknown', 'error': None})
+        if info['state'] != 'ready':
+            missing[name] = f"{info['state']}: {info['error']}" if info['error'] else info['state']
+    return missing
+
+
+def counters_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, int]:
+    """Прирост числовых счётчиков слоя ответов за сценарий"""
+    return {key: value - before.get(key, 0) for key, value in after.items()
+            if type(value) is int and value != before.get(key, 0)}
+
+
+def git_revision() -> Dict[str, Any]:
+    """Коммит дерева, на котором сняты результаты"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit or None, 'dirty': bool(dirty)}
+
+
+def load_backend(args) -> Any:
+    """Импорт python_api после заменителей; AI модули и сэмплер - до замеров"""
+    import logging
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    import python_api
+
+    from admission import get_admission_controller
+    if not args.admission:
+        # Лимиты допуска рассчитаны на одного клиента-панель и исказили бы замеры
+        controller = get_admission_controller()
+        controller.policies = {name: dict(UNLIMITED_POLICY) for name in controller.policies}
+
+    from system_sampler import get_system_sampler
+    sampler = get_system_sampler()
+    sampler.interval = args.sampler_interval
+    sampler.start()
+    python_api.warmup.warm_up(['neural_core', 'raven_ai'])
+    return python_api
+
+
+def print_table(results: Dict[str, Dict[str, Any]]):
+    columns = ('requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+    print(f"\n{'сценарий':<30}" + ''.join(f"{name:>16}" for name in columns))
+    for name, stats in results.items():
+        print(f"{name:<30}" + ''.join(f"{str(stats.get(col)):>16}" for col in columns))
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any], threshold: float,
+            min_delta_ms: float) -> List[str]:
+    """Таблица изменений относительно base; возвращает сценарии с регрессией больше threshold %
+    (для задержек - ещё и больше min_delta_ms: доли миллисекунды меняются от запуска к запуску)"""
+    base_commit = (base.get('meta', {}).get('git') or {}).get('commit') or '?'
+    print(f"\n📊 Сравнение с {base_commit[:12]} (регрессия - больше {threshold}%)")
+    print(f"{'сценарий':<30}" + ''.join(f"{name:>24}" for name in COMPARED))
+    regressions = []
+    for name, stats in current['results'].items():
+        old = base['results'].get(name)
+        if old is None:
+            print(f"{name:<30}  нет в базовых результатах")
+            continue
+        cells, regressed = [], False
+        for column in COMPARED:
+            before, after = old.get(column), stats.get(column)
+            if not before or after is None:
+                cells.append(f"{str(after):>24}")
+                continue
+            change = (after - before) / before * 100
+            # Для задержки рост - хуже, для пропускной способности - лучше
+            worse = -change if column == 'throughput_rps' else change
+            significant = worse > threshold and (column == 'throughput_rps'
+                                                 or after - before > min_delta_ms)
+            regressed = regressed or significant
+            mark = '⚠️' if significant else '  '
+            cells.append(f"{f'{before} -> {after} ({change:+.1f}%)':>22}{mark}")
+        print(f"{name:<30}" + ''.join(cells))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк маршрутов Raven AI в одном процессе')
+    parser.add_argument('--scenarios', help='через запятую (по умолчанию все)')
+    parser.add_argument('--concurrency', default='1,8,32', help='уровни параллельности через запятую')
+    parser.add_argument('--requests', type=int, default=400, help='запросов на сценарий и уровень')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--processes', type=int, default=5000, help='размер таблицы процессов')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--recordings', help='каталог WAV с transcripts.json (по умолчанию синтез)')
+    parser.add_argument('--speech-rate', type=float, default=0.0,
+                        help='секунд синтеза речи на символ (0 - мгновенно)')
+    parser.add_argument('--sampler-interval', type=float, default=1.0)
+    parser.add_argument('--admission', action='store_true',
+                        help='оставить лимиты контроля допуска')
+    parser.add_argument('--json', dest='json_path')
+    parser.add_argument('--compare', help='JSON прошлого запуска для сравнения')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='допустимое ухудшение в процентах при --compare')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='меньший рост задержки не считается регрессией')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    fakes = benchmark_fakes.install(args.processes, args.seed, args.recordings, args.speech_rate)
+    api = load_backend(args)
+    from response_layer import get_response_layer
+
+    scenarios = build_scenarios(api, args.processes)
+    if args.scenarios:
+        selected = args.scenarios.split(',')
+        unknown = set(selected) - {scenario.name for scenario in scenarios}
+        if unknown:
+            parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario.name in selected]
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    results, skipped, failed = {}, {}, {}
+    for scenario in scenarios:
+        missing = missing_components(api, scenario)
+        if missing:
+            # Без компонента маршрут отвечает заглушкой или 503 - замер был бы бессмысленным
+            skipped[scenario.name] = missing
+            print(f"⏭️ {scenario.name}: пропущен, компонент не готов "
+                  f"({', '.join(f'{name} - {state}' for name, state in missing.items())})")
+            continue
+        for concurrency in (levels if scenario.concurrent else [1]):
+            name = f'{scenario.name}@{concurrency}'
+            print(f"⏱️ {name}: {scenario.description}")
+            before = get_response_layer().get_stats()
+            result = run_scenario(api.app, scenario, concurrency, args.requests, args.warmup)
+            if result['errors'] == result['requests']:
+                failed[name] = result['statuses']
+                print(f"❌ {name}: все запросы завершились ошибкой {result['statuses']}")
+                continue
+            result['response_layer'] = counters_delta(before, get_response_layer().get_stats())
+            results[name] = result
+
+    report = {
+        'meta': {
+            'git': git_revision(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'config': {key: value for key, value in vars(args).items()
+                       if key not in ('json_path', 'compare', 'threshold', 'min_delta_ms')},
+            'fakes': fakes.describe(),
+            'components': {name: info['state']
+                           for name, info in api.warmup.report()['components'].items()}
+        },
+        'results': results,
+        'skipped': skipped,
+        'failed': failed
+    }
+
+    print_table(results)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты: {args.json_path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = json.load(f)
+        regressions = compare(base, report, args.threshold, args.min_delta_ms)
+        # Сценарий, который был в базовом запуске, а сейчас не выполнился, - тоже регрессия
+        lost = [name for name in base['results'] if name not in results
+                and (name in failed or name.split('@')[0] in skipped)]
+        for name in lost:
+            print(f"{name:<30}  не выполнен в этом запуске")
+        regressions += lost
+        if regressions:
+            print(f"\n❌ Регрессия: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Регрессий нет")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
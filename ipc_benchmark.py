@@ -0,0 +1,167 @@
+"""
+Накладные расходы на вызов: HTTP (новое соединение / keep-alive) против IPC кадров (stdio, unix)
+
+Использование:
+    python ipc_benchmark.py                          # все транспорты, сводная таблица
+    python ipc_benchmark.py --calls 5000 --json ipc.json
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from server_loadtest import summarize
+
+HOST = '127.0.0.1'
+PORT = 5150
+ROUTES = (
+    ('GET', '/api/health', None),
+    ('POST', '/api/command', {'command': 'время'}),
+    ('GET', '/api/system/metrics', None)
+)
+
+
+def run_server(transport: str, port: int, socket_path: str):
+    """Дочерний процесс: python_api на выбранном транспорте"""
+    frames = None
+    if transport == 'stdio':
+        from ipc_transport import claim_stdout
+        frames = claim_stdout()
+
+    import logging
+
+    os.environ.setdefault('RAVEN_STARTUP', 'lazy')
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    import python_api
+
+    if transport == 'stdio':
+        from ipc_transport import serve_stdio
+        serve_stdio(python_api.app, frames)
+    elif transport == 'unix':
+        from ipc_transport import serve_unix
+        serve_unix(python_api.app, socket_path)
+    else:
+        from werkzeug.serving import make_server
+        make_server(HOST, port, python_api.app, threaded=True).serve_forever()
+
+
+def http_caller(keep_alive: bool) -> Callable[[str, str, Any], int]:
+    """Вызов по HTTP; без keep-alive каждый вызов открывает TCP соединение"""
+    state = {'conn': None}
+
+    def call(method, path, body):
+        conn = state['conn'] or http.client.HTTPConnection(HOST, PORT)
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        if not keep_alive:
+            headers['Connection'] = 'close'
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if keep_alive:
+            state['conn'] = conn
+        else:
+            conn.close()
+        return response.status
+
+    return call
+
+
+def ipc_caller(client) -> Callable[[str, str, Any], int]:
+    def call(method, path, body):
+        return client.request(method, path, body)['status']
+    return call
+
+
+def measure(call: Callable[[str, str, Any], int], calls: int) -> Dict[str, Any]:
+    """Задержки вызовов по кругу маршрутов ROUTES"""
+    for method, path, body in ROUTES:  # прогрев
+        call(method, path, body)
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    for index in range(calls):
+        method, path, body = ROUTES[index % len(ROUTES)]
+        began = time.perf_counter()
+        try:
+            if call(method, path, body) != 200:
+                errors += 1
+        except OSError:
+            errors += 1
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def spawn(transport: str, socket_path: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', transport,
+         '--port', str(PORT), '--socket', socket_path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE if transport == 'stdio' else subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+def wait_for(check: Callable[[], Any], timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return check()
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение транспортов Electron <-> Python')
+    parser.add_argument('--transports', default='http,http-keepalive,stdio,unix')
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--json', dest='json_path')
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=PORT, help=argparse.SUPPRESS)
+    parser.add_argument('--socket', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.serve, args.port, args.socket)
+        return
+
+    from ipc_transport import IPCClient
+
+    socket_path = os.path.join(tempfile.gettempdir(), f'raven-bench-{os.getpid()}.sock')
+    results = {}
+    for transport in args.transports.split(','):
+        if transport == 'unix' and sys.platform == 'win32':
+            continue
+        server = spawn('http' if transport.startswith('http') else transport, socket_path)
+        try:
+            print(f"⏱️ Транспорт {transport}...")
+            if transport == 'stdio':
+                call = ipc_caller(IPCClient(server.stdout, server.stdin))
+            elif transport == 'unix':
+                call = ipc_caller(wait_for(lambda: IPCClient.connect_unix(socket_path)))
+            else:
+                call = http_caller(keep_alive=transport == 'http-keepalive')
+                wait_for(lambda: call('GET', '/api/health', None))
+            results[transport] = measure(call, args.calls)
+        finally:
+            server.terminate()
+            server.wait()
+
+    columns = ('requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+    print(f"\n{'транспорт':<16}" + ''.join(f"{name:>16}" for name in columns))
+    for transport, stats in results.items():
+        print(f"{transport:<16}" + ''.join(f"{str(stats.get(col)):>16}" for col in columns))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты: {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
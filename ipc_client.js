@@ -0,0 +1,114 @@
+// Клиент IPC транспорта Python backend: кадры 4 байта длины (big-endian) + JSON
+// поверх stdio дочернего процесса или Unix сокета (см. ipc_transport.py)
+const net = require('net');
+
+class FrameClient {
+    constructor(readable, writable) {
+        this.readable = readable;
+        this.writable = writable;
+        this.chunks = [];
+        this.buffered = 0;
+        this.nextId = 0;
+        this.pending = new Map();
+        this.closed = false;
+
+        readable.on('data', (chunk) => this.onData(chunk));
+        readable.on('close', () => this.close(new Error('IPC канал закрыт')));
+        readable.on('error', (error) => this.close(error));
+    }
+
+    // Подключение к Unix сокету; backend может ещё запускаться - повторяем
+    static connect(socketPath, retries = 50, delay = 200) {
+        return new Promise((resolve, reject) => {
+            const attempt = (left) => {
+                const socket = net.createConnection(socketPath);
+                socket.once('connect', () => {
+                    socket.removeAllListeners('error');
+                    resolve(new FrameClient(socket, socket));
+                });
+                socket.once('error', (error) => {
+                    socket.destroy();
+                    if (left <= 0) {
+                        reject(error);
+                    } else {
+                        setTimeout(() => attempt(left - 1), delay);
+                    }
+                });
+            };
+            attempt(retries);
+        });
+    }
+
+    onData(chunk) {
+        this.chunks.push(chunk);
+        this.buffered += chunk.length;
+
+        while (this.buffered >= 4) {
+            let buffer = this.chunks.length === 1 ? this.chunks[0] : Buffer.concat(this.chunks);
+            const size = buffer.readUInt32BE(0);
+            if (buffer.length < 4 + size) {
+                this.chunks = [buffer];
+                return;
+            }
+            const payload = buffer.subarray(4, 4 + size);
+            buffer = buffer.subarray(4 + size);
+            this.chunks = buffer.length ? [buffer] : [];
+            this.buffered = buffer.length;
+
+            try {
+                this.dispatch(JSON.parse(payload.toString('utf8')));
+            } catch (error) {
+                console.error('IPC: некорректный кадр:', error.message);
+            }
+        }
+    }
+
+    dispatch(message) {
+        const pending = this.pending.get(message.id);
+        if (!pending) return;
+
+        if (message.chunk !== undefined) {
+            if (pending.onChunk) pending.onChunk(message.chunk);
+        } else if (message.stream) {
+            pending.head = message;
+        } else {
+            this.pending.delete(message.id);
+            pending.resolve(message.end ? pending.head : message);
+        }
+    }
+
+    send(message) {
+        const payload = Buffer.from(JSON.stringify(message), 'utf8');
+        const header = Buffer.alloc(4);
+        header.writeUInt32BE(payload.length, 0);
+        this.writable.write(Buffer.concat([header, payload]));
+    }
+
+    // Ответ { status, headers, body }; для потоковых ответов части уходят в onChunk,
+    // а промис разрешается заголовком ответа после конца потока
+    request(method, path, body = null, onChunk = null) {
+        if (this.closed) {
+            return Promise.reject(new Error('IPC канал закрыт'));
+        }
+        const id = ++this.nextId;
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject, onChunk, head: null });
+            const message = { id, method, path };
+            if (body !== null && body !== undefined) {
+                message.body = body;
+            }
+            this.send(message);
+        });
+    }
+
+    close(error) {
+        if (this.closed) return;
+        this.closed = true;
+        for (const pending of this.pending.values()) {
+            pending.reject(error || new Error('IPC канал закрыт'));
+        }
+        this.pending.clear();
+    }
+}
+
+module.exports = { FrameClient };
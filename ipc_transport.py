@@ -0,0 +1,220 @@
+"""
+IPC транспорт для Electron: тот же API кадрами с префиксом длины через stdio или Unix сокет
+
+Кадр: 4 байта длины (big-endian) + JSON.
+Запрос:  {"id", "method", "path", "headers", "body"}
+Ответ:   {"id", "status", "headers", "body"}
+Поток:   {"id", "status", "headers", "stream": true}, затем {"id", "chunk"}..., {"id", "end": true}
+"""
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Optional
+
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+DEFAULT_WORKERS = int(os.environ.get('RAVEN_IPC_WORKERS', 16))
+DEFAULT_SOCKET = os.environ.get('RAVEN_SOCKET', '/tmp/raven-ai.sock')
+
+
+def read_frame(stream: BinaryIO) -> Optional[bytes]:
+    """Следующий кадр или None, если поток закрыт"""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f'Кадр {size} байт превышает лимит {MAX_FRAME_BYTES}')
+    payload = stream.read(size)
+    if len(payload) < size:
+        return None
+    return payload
+
+
+def write_frame(stream: BinaryIO, payload: bytes):
+    """Запись кадра (вызывающий держит блокировку потока)"""
+    stream.write(FRAME_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def claim_stdout() -> BinaryIO:
+    """stdout процесса отдаётся под кадры, print и логи уходят в stderr"""
+    sys.stdout.flush()
+    frames = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    return frames
+
+
+class IPCDispatcher:
+    """Выполнение запросов из кадров через WSGI приложение Flask"""
+
+    def __init__(self, app, workers: int = DEFAULT_WORKERS):
+        import response_layer
+
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ipc-worker')
+        self.dumps = response_layer.dumps_bytes
+        self.loads = response_layer.orjson.loads if response_layer.import_orjson() else json.loads
+
+    def serve_stream(self, reader: BinaryIO, writer: BinaryIO):
+        """Чтение кадров до закрытия потока; запросы выполняются параллельно"""
+        lock = threading.Lock()
+
+        def send(message: Dict[str, Any]):
+            payload = self.dumps(message, sort_keys=False)
+            with lock:
+                write_frame(writer, payload)
+
+        while True:
+            try:
+                payload = read_frame(reader)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ IPC: поток закрыт: {e}")
+                return
+            if payload is None:
+                return
+            try:
+                message = self.loads(payload)
+            except ValueError:
+                print("⚠️ IPC: некорректный кадр пропущен")
+                continue
+            self.executor.submit(self.handle, message, send, time.perf_counter())
+
+    def handle(self, message: Dict[str, Any], send: Callable[[Dict[str, Any]], None],
+               queued_at: Optional[float] = None):
+        """Один запрос: environ как у HTTP, ответ целиком или потоком кадров"""
+        from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+        request_id = message.get('id')
+        try:
+            path, _, query = str(message.get('path', '/')).partition('?')
+            body = message.get('body')
+            headers = dict(message.get('headers') or {})
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body)
+            if body:
+                headers.setdefault('Content-Type', 'application/json')
+            builder = EnvironBuilder(path=path, query_string=query,
+                                     method=str(message.get('method', 'GET')).upper(),
+                                     headers=headers, data=body or None,
+                                     environ_base={'REMOTE_ADDR': 'ipc',
+                                                   'raven.queued_at': queued_at})
+            try:
+                environ = builder.get_environ()
+            finally:
+                builder.close()
+
+            app_iter, status, response_headers = run_wsgi_app(self.app, environ, buffered=False)
+            head = {
+                'id': request_id,
+                'status': int(status.split(' ', 1)[0]),
+                'headers': dict(response_headers)
+            }
+            try:
+                if 'Content-Length' in response_headers:
+                    head['body'] = b''.join(app_iter).decode('utf-8', 'replace')
+                    send(head)
+                    return
+                head['stream'] = True
+                send(head)
+                for chunk in app_iter:
+                    if chunk:
+                        send({'id': request_id, 'chunk': chunk.decode('utf-8', 'replace')})
+                send({'id': request_id, 'end': True})
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        except (BrokenPipeError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"❌ IPC: ошибка запроса {message.get('path')}: {e}")
+            try:
+                send({'id': request_id, 'status': 500, 'headers': {},
+                      'body': json.dumps({'error': str(e)})})
+            except (OSError, ValueError):
+                pass  # канал уже закрыт
+
+
+def serve_stdio(app, frames: BinaryIO, workers: int = DEFAULT_WORKERS):
+    """Обслуживание кадров из stdin; frames - stdout, полученный через claim_stdout()"""
+    print("🔌 IPC транспорт: stdio")
+    IPCDispatcher(app, workers).serve_stream(sys.stdin.buffer, frames)
+
+
+def serve_unix(app, path: str = DEFAULT_SOCKET, workers: int = DEFAULT_WORKERS,
+               ready: Optional[threading.Event] = None):
+    """Обслуживание кадров на Unix сокете (поток на соединение)"""
+    if not hasattr(socket, 'AF_UNIX'):
+        raise RuntimeError('Unix сокеты недоступны на этой платформе, используйте stdio')
+    dispatcher = IPCDispatcher(app, workers)
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(16)
+    print(f"🔌 IPC транспорт: unix {path}")
+    if ready is not None:
+        ready.set()
+
+    def serve_connection(conn: socket.socket):
+        with conn, conn.makefile('rb') as reader, conn.makefile('wb') as writer:
+            dispatcher.serve_stream(reader, writer)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=serve_connection, args=(conn,), name='ipc-connection',
+                             daemon=True).start()
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+class IPCClient:
+    """Синхронный клиент (бенчмарк, отладка): один запрос за раз"""
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    @classmethod
+    def connect_unix(cls, path: str = DEFAULT_SOCKET) -> 'IPCClient':
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(path)
+        return cls(conn.makefile('rb'), conn.makefile('wb'))
+
+    def request(self, method: str, path: str, body: Any = None,
+                on_chunk: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Ответ {'status', 'headers', 'body'}; части потока передаются в on_chunk"""
+        self.next_id += 1
+        message = {'id': self.next_id, 'method': method, 'path': path}
+        if body is not None:
+            message['body'] = body
+        write_frame(self.writer, json.dumps(message).encode('utf-8'))
+
+        head = None
+        while True:
+            payload = read_frame(self.reader)
+            if payload is None:
+                raise ConnectionError('IPC канал закрыт')
+            frame = json.loads(payload)
+            if frame.get('id') != self.next_id:
+                continue
+            if 'chunk' in frame:
+                if on_chunk is not None:
+                    on_chunk(frame['chunk'])
+            elif frame.get('end'):
+                return head
+            elif frame.get('stream'):
+                head = frame
+            else:
+                return frame
@@ -6,12 +6,14 @@ import os
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QTextEdit, QLineEdit, QSlider, QProgressBar)
-from PyQt6.QtCore import (Qt, QTimer, QPropertyAnimation, QEasingCurve, 
+from PyQt6.QtCore import (Qt, QPropertyAnimation, QEasingCurve, 
                          QParallelAnimationGroup, pyqtProperty, QPoint, QRect)
 from PyQt6.QtGui import (QFont, QColor, QPalette, QLinearGradient, QPainter,
                         QPainterPath, QBrush, QPen, QPixmap, QRadialGradient)
 import qdarkstyle
 
+from ui.components.adaptive_timer import AdaptiveTimer
+
 class HolographicLabel(QLabel):
     """Голографический текст с эффектом свечения"""
     def __init__(self, text="", parent=None):
@@ -54,6 +56,17 @@ class HolographicLabel(QLabel):
     
     def startAnimation(self):
         self.glow_animation.start()
+    
+    def hideEvent(self, event):
+        # Свечение не анимируется, пока его не видно
+        if self.glow_animation.state() == QPropertyAnimation.State.Running:
+            self.glow_animation.pause()
+        super().hideEvent(event)
+    
+    def showEvent(self, event):
+        if self.glow_animation.state() == QPropertyAnimation.State.Paused:
+            self.glow_animation.resume()
+        super().showEvent(event)
 
 class NeuralNetworkVisualizer(QWidget):
     """Визуализатор нейросетевой активности"""
@@ -61,9 +74,9 @@ class NeuralNetworkVisualizer(QWidget):
         super().__init__(parent)
         self.nodes = []
         self.connections = []
-        self.animation_timer = QTimer()
-        self.animation_timer.timeout.connect(self.update_nodes)
-        self.animation_timer.start(100)
+        # Анимация останавливается, пока визуализатор скрыт или окно свёрнуто
+        self.animation_timer = AdaptiveTimer(self, self.update_nodes, 100)
+        self.animation_timer.start()
         
     def update_nodes(self):
         import random
@@ -548,15 +561,13 @@ class JarvisMainWindow(QMainWindow):
     def setup_timers(self):
         """Настройка таймеров обновления"""
         # Таймер времени
-        self.time_timer = QTimer()
-        self.time_timer.timeout.connect(self.update_time)
-        self.time_timer.start(1000)
+        self.time_timer = AdaptiveTimer(self, self.update_time, 1000)
+        self.time_timer.start()
         self.update_time()
         
-        # Таймер системной информации
-        self.sys_timer = QTimer()
-        self.sys_timer.timeout.connect(self.update_system_info)
-        self.sys_timer.start(2000)
+        # Таймер системной информации (в свёрнутом окне стоит, на всплесках - чаще)
+        self.sys_timer = AdaptiveTimer(self, self.update_system_info, 2000, fast_ms=1000)
+        self.sys_timer.start()
     
     def update_time(self):
         """Обновление времени"""
@@ -575,6 +586,7 @@ class JarvisMainWindow(QMainWindow):
             # RAM
             ram = psutil.virtual_memory()
             ram_percent = ram.percent
+            self.sys_timer.observe(cpu_percent, ram_percent)
             
             # Обновляем метрики
             # Здесь будет код обновления виджетов
@@ -0,0 +1,539 @@
+"""
+База знаний с инвертированным индексом и ранжированием BM25
+"""
+import heapq
+import json
+import math
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from text_analytics import STOP_WORDS, tokenize
+
+MAGIC = b'RVKI'
+INDEX_VERSION = 2
+HEADER = struct.Struct('<4sHHI')  # magic, version, flags, длина метаданных JSON
+
+# Термины чаще чем в MAX_DF_RATIO фрагментов (и не меньше MIN_CAPPED_DF) почти не
+# различают документы: они только дополняют кандидатов по более редким терминам
+MAX_DF_RATIO = 0.05
+MIN_CAPPED_DF = 1000
+
+# Проверка кандидата двоичным поиском дешевле прохода по списку, пока кандидатов
+# примерно в BISECT_RATIO раз меньше, чем документов в списке термина
+BISECT_RATIO = 16
+
+PASSAGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS passages (
+    doc_id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+"""
+
+
+def parse_json_corpus(path: str) -> List[Tuple[str, str]]:
+    """Разбор JSON файла: список {question, answer} или словарь вопрос -> ответ"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    passages = []
+    if isinstance(data, dict):
+        for question, answer in data.items():
+            passages.append((str(question), str(answer)))
+    elif isinstance(data, list):
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            question = item.get('question') or item.get('title') or ''
+            answer = item.get('answer') or item.get('text') or ''
+            if answer:
+                passages.append((str(question), str(answer)))
+    return passages
+
+
+def parse_markdown_corpus(path: str) -> List[Tuple[str, str]]:
+    """Разбор Markdown файла: каждый заголовок - отдельный фрагмент"""
+    passages = []
+    title = os.path.splitext(os.path.basename(path))[0]
+    body = []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                if ''.join(body).strip():
+                    passages.append((title, ''.join(body).strip()))
+                title = line.lstrip('#').strip()
+                body = []
+            else:
+                body.append(line)
+
+    if ''.join(body).strip():
+        passages.append((title, ''.join(body).strip()))
+    return passages
+
+
+CORPUS_PARSERS = {
+    '.json': parse_json_corpus,
+    '.md': parse_markdown_corpus,
+    '.markdown': parse_markdown_corpus
+}
+
+
+def index_terms(title: str, text: str) -> Dict[str, int]:
+    """Частоты терминов фрагмента без служебных слов"""
+    term_freqs = {}
+    for token in tokenize(title + ' ' + text):
+        if token not in STOP_WORDS:
+            term_freqs[token] = term_freqs.get(token, 0) + 1
+    return term_freqs
+
+
+class PassageStore:
+    """Тексты фрагментов в SQLite: индекс хранит только числа, текст читается для топа"""
+
+    def __init__(self, db_path: str = 'data/knowledge_passages.db'):
+        self.db_path = db_path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._connection().executescript(PASSAGES_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (sqlite3 не разделяет соединения между потоками)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def add_many(self, rows: Iterable[Tuple[int, str, str, str]]):
+        """Добавление фрагментов (doc_id, source, title, text) одной транзакцией"""
+        conn = self._connection()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany('INSERT OR REPLACE INTO passages (doc_id, source, title, text) '
+                             'VALUES (?, ?, ?, ?)', rows)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def get_many(self, doc_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """Фрагменты по ID"""
+        found = {}
+        conn = self._connection()
+        # Ограничение SQLite на число параметров запроса
+        for start in range(0, len(doc_ids), 500):
+            part = doc_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT doc_id, source, title, text FROM passages "
+                f"WHERE doc_id IN ({','.join('?' * len(part))})", part
+            )
+            for doc_id, source, title, text in rows:
+                found[doc_id] = {'source': source, 'title': title, 'text': text}
+        return found
+
+    def delete_many(self, doc_ids: List[int]):
+        """Удаление фрагментов по ID"""
+        self._connection().executemany('DELETE FROM passages WHERE doc_id = ?',
+                                       [(doc_id,) for doc_id in doc_ids])
+
+    def prune(self, next_doc_id: int) -> int:
+        """Удаление фрагментов, добавленных после последнего сохранения индекса"""
+        return self._connection().execute('DELETE FROM passages WHERE doc_id >= ?',
+                                          (next_doc_id,)).rowcount
+
+    def count(self) -> int:
+        """Число фрагментов"""
+        return self._connection().execute('SELECT COUNT(*) FROM passages').fetchone()[0]
+
+    def clear(self):
+        """Удаление всех фрагментов"""
+        self._connection().execute('DELETE FROM passages')
+
+
+class IndexSnapshot:
+    """Неизменяемый срез индекса: поиск читает его без блокировки, пока запись
+    готовит следующий (списки терминов копируются при первом изменении)"""
+
+    def __init__(self, postings: Dict[str, Tuple[array, array]], max_tf: Dict[str, int],
+                 norms: List[float], doc_count: int, min_norm: float, k1: float):
+        self.postings = postings  # term -> (ID документов по возрастанию, tf)
+        self.max_tf = max_tf
+        self.norms = norms        # doc_id -> нормировка длины BM25
+        self.doc_count = doc_count
+        self.min_norm = min_norm
+        self.k1 = k1
+
+    def top(self, terms: Iterable[str], top_k: int) -> List[Tuple[int, float]]:
+        """Лучшие top_k документов по BM25 с отсечением MaxScore: списки идут от самых
+        весомых; когда остаток верхних границ не дотягивает до k-го результата, новые
+        документы не заводятся, а уже набранные дополняются только если ещё могут пройти.
+        Слишком частые термины всегда только дополняют кандидатов"""
+        k1, norms = self.k1, self.norms
+        df_cap = max(MIN_CAPPED_DF, MAX_DF_RATIO * self.doc_count)
+        lists = []
+        for term in set(terms):
+            entry = self.postings.get(term)
+            if not entry:
+                continue
+            ids, tfs = entry
+            df = len(ids)
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            max_tf = self.max_tf[term]
+            bound = idf * max_tf * (k1 + 1) / (max_tf + self.min_norm)
+            lists.append((df > df_cap, -bound, bound, idf * (k1 + 1), ids, tfs))
+        if not lists or top_k <= 0:
+            return []
+
+        lists.sort(key=itemgetter(0, 1))
+        # remaining[i] - больше этого документ не наберёт в списках i и дальше
+        remaining = [0.0] * (len(lists) + 1)
+        for i in range(len(lists) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + lists[i][2]
+
+        scores = {}
+        threshold = 0.0
+        for i, (capped, _, _, weight, ids, tfs) in enumerate(lists):
+            if not capped and (len(scores) < top_k or remaining[i] > threshold):
+                for doc_id, tf in zip(ids, tfs):
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+            elif scores:
+                rest = remaining[i]
+                scores = {doc_id: score for doc_id, score in scores.items()
+                          if score + rest >= threshold}
+                if len(scores) * BISECT_RATIO < len(ids):
+                    size = len(ids)
+                    for doc_id in scores:
+                        position = bisect_left(ids, doc_id)
+                        if position < size and ids[position] == doc_id:
+                            tf = tfs[position]
+                            scores[doc_id] += weight * tf / (tf + norms[doc_id])
+                else:
+                    for doc_id, tf in zip(ids, tfs):
+                        if doc_id in scores:
+                            scores[doc_id] += weight * tf / (tf + norms[doc_id])
+            if len(scores) >= top_k:
+                threshold = heapq.nlargest(top_k, scores.values())[-1]
+
+        return heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+
+
+class KnowledgeBase:
+    """Локальная база знаний (JSON/Markdown) с BM25 поиском"""
+
+    def __init__(self, corpus_dir: str = 'data/knowledge',
+                 index_path: str = 'data/knowledge_index.bin',
+                 passages_path: str = 'data/knowledge_passages.db',
+                 k1: float = 1.5, b: float = 0.75):
+        self.corpus_dir = corpus_dir
+        self.index_path = index_path
+        self.k1 = k1
+        self.b = b
+
+        self.passages = PassageStore(passages_path)
+        self.lengths = {}     # doc_id -> длина в токенах
+        self.postings = {}    # term -> (array ID, array tf)
+        self.max_tf = {}      # term -> наибольший tf (верхняя граница MaxScore)
+        self.files = {}       # path -> {'mtime', 'size', 'docs': [doc_id]}
+        self.next_doc_id = 0
+        self.total_length = 0
+
+        # Термины, списки которых уже скопированы после последней публикации среза
+        self._owned = set()
+        self.snapshot = IndexSnapshot({}, {}, [], 0, 0.0, k1)
+        self.lock = threading.RLock()
+
+    def load(self) -> Dict[str, int]:
+        """Загрузка индекса с диска и переиндексация изменённых файлов"""
+        if not self.load_index():
+            self.reset()
+        stats = self.refresh()
+        if stats['added'] or stats['removed']:
+            self.save_index()
+        return stats
+
+    def reset(self):
+        """Пустой индекс и хранилище фрагментов (индекс на диске не найден или устарел)"""
+        with self.lock:
+            self.passages.clear()
+            self.lengths = {}
+            self.postings = {}
+            self.max_tf = {}
+            self.files = {}
+            self.next_doc_id = 0
+            self.total_length = 0
+            self._publish()
+
+    def load_index(self) -> bool:
+        """Загрузка сохранённого индекса: метаданные JSON и массивы чисел"""
+        try:
+            if not os.path.exists(self.index_path):
+                return False
+            with open(self.index_path, 'rb') as f:
+                data = memoryview(f.read())
+            magic, version, _, meta_length = HEADER.unpack_from(data)
+            if magic != MAGIC or version != INDEX_VERSION:
+                return False
+            position = HEADER.size + meta_length
+            meta = json.loads(bytes(data[HEADER.size:position]).decode('utf-8'))
+
+            def take(typecode: str, count: int) -> array:
+                nonlocal position
+                values = array(typecode)
+                size = values.itemsize * count
+                values.frombytes(data[position:position + size])
+                position += size
+                if meta['byteorder'] != sys.byteorder:
+                    values.byteswap()
+                return values
+
+            terms = meta['terms']
+            doc_ids = take('I', meta['documents'])
+            doc_lengths = take('I', meta['documents'])
+            offsets = take('Q', len(terms) + 1)
+            all_ids = take('I', offsets[-1])
+            all_tfs = take('I', offsets[-1])
+        except Exception as e:
+            print(f"⚠️ Не удалось загрузить индекс базы знаний: {e}")
+            return False
+
+        postings, max_tf = {}, {}
+        for i, term in enumerate(terms):
+            start, end = offsets[i], offsets[i + 1]
+            tfs = all_tfs[start:end]
+            postings[term] = (all_ids[start:end], tfs)
+            max_tf[term] = max(tfs)
+
+        with self.lock:
+            self.lengths = dict(zip(doc_ids, doc_lengths))
+            self.postings = postings
+            self.max_tf = max_tf
+            self.files = meta['files']
+            self.next_doc_id = meta['next_doc_id']
+            self.total_length = sum(doc_lengths)
+            # Фрагменты, записанные после сохранения индекса, ему неизвестны
+            self.passages.prune(self.next_doc_id)
+            if self.passages.count() != len(self.lengths):
+                return False
+            self._publish()
+        return True
+
+    def save_index(self):
+        """Сохранение индекса на диск (тексты фрагментов - в хранилище фрагментов)"""
+        with self.lock:
+            terms = sorted(self.postings)
+            offsets = array('Q', [0])
+            all_ids, all_tfs = array('I'), array('I')
+            for term in terms:
+                ids, tfs = self.postings[term]
+                all_ids.extend(ids)
+                all_tfs.extend(tfs)
+                offsets.append(len(all_ids))
+            meta = json.dumps({
+                'files': self.files,
+                'next_doc_id': self.next_doc_id,
+                'documents': len(self.lengths),
+                'terms': terms,
+                'byteorder': sys.byteorder
+            }, ensure_ascii=False).encode('utf-8')
+
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, INDEX_VERSION, 0, len(meta)))
+                f.write(meta)
+                for values in (array('I', self.lengths.keys()), array('I', self.lengths.values()),
+                               offsets, all_ids, all_tfs):
+                    values.tofile(f)
+            os.replace(tmp_path, self.index_path)
+
+    def scan_corpus(self) -> Dict[str, os.stat_result]:
+        """Список файлов корпуса с их метаданными"""
+        found = {}
+        if not os.path.isdir(self.corpus_dir):
+            return found
+        for root, _, names in os.walk(self.corpus_dir):
+            for name in names:
+                if os.path.splitext(name)[1].lower() in CORPUS_PARSERS:
+                    path = os.path.join(root, name)
+                    found[path] = os.stat(path)
+        return found
+
+    def refresh(self) -> Dict[str, int]:
+        """Инкрементальная переиндексация: только новые, изменённые и удалённые файлы"""
+        stats = {'added': 0, 'removed': 0, 'files_changed': 0}
+        found = self.scan_corpus()
+
+        with self.lock:
+            for path in list(self.files):
+                if path not in found:
+                    stats['removed'] += self._remove_file(path)
+                    stats['files_changed'] += 1
+
+            for path, stat in found.items():
+                meta = self.files.get(path)
+                if meta and meta['mtime'] == stat.st_mtime and meta['size'] == stat.st_size:
+                    continue
+                if meta:
+                    stats['removed'] += self._remove_file(path)
+                stats['added'] += self._index_file(path, stat)
+                stats['files_changed'] += 1
+
+            if stats['files_changed']:
+                self._publish()
+        return stats
+
+    def index_file(self, path: str, stat: Optional[os.stat_result] = None) -> int:
+        """Индексация одного файла корпуса"""
+        with self.lock:
+            added = self._index_file(path, stat)
+            self._publish()
+        return added
+
+    def _index_file(self, path: str, stat: Optional[os.stat_result] = None) -> int:
+        """Индексация файла без публикации среза"""
+        parser = CORPUS_PARSERS[os.path.splitext(path)[1].lower()]
+        try:
+            passages = parser(path)
+        except Exception as e:
+            print(f"⚠️ Ошибка разбора {path}: {e}")
+            passages = []
+
+        stat = stat or os.stat(path)
+        with self.lock:
+            doc_ids = self._add_passages(path, passages)
+            self.files[path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'docs': doc_ids}
+        return len(doc_ids)
+
+    def add_passage(self, source: str, title: str, text: str) -> int:
+        """Добавление фрагмента в индекс"""
+        with self.lock:
+            doc_id = self._add_passages(source, [(title, text)])[0]
+            self._publish()
+        return doc_id
+
+    def _add_passages(self, source: str, passages: List[Tuple[str, str]]) -> List[int]:
+        """Фрагменты в хранилище и списки терминов (ID растут - списки остаются упорядоченными)"""
+        doc_ids, rows = [], []
+        with self.lock:
+            for title, text in passages:
+                doc_id = self.next_doc_id
+                self.next_doc_id += 1
+                term_freqs = index_terms(title, text)
+                length = sum(term_freqs.values())
+                for term, tf in term_freqs.items():
+                    ids, tfs = self._writable(term)
+                    ids.append(doc_id)
+                    tfs.append(tf)
+                    if tf > self.max_tf.get(term, 0):
+                        self.max_tf[term] = tf
+                self.lengths[doc_id] = length
+                self.total_length += length
+                doc_ids.append(doc_id)
+                rows.append((doc_id, source, title, text))
+            self.passages.add_many(rows)
+        return doc_ids
+
+    def remove_file(self, path: str) -> int:
+        """Удаление всех фрагментов файла из индекса"""
+        with self.lock:
+            removed = self._remove_file(path)
+            self._publish()
+        return removed
+
+    def _remove_file(self, path: str) -> int:
+        """Удаление фрагментов файла без публикации среза"""
+        with self.lock:
+            meta = self.files.pop(path, None)
+            if not meta:
+                return 0
+            doc_ids = meta['docs']
+            removed = set(doc_ids)
+            terms = set()
+            # Термины фрагментов восстанавливаются по их текстам из хранилища
+            for passage in self.passages.get_many(doc_ids).values():
+                terms.update(index_terms(passage['title'], passage['text']))
+            for term in terms:
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                kept = [(doc_id, tf) for doc_id, tf in zip(*entry) if doc_id not in removed]
+                if not kept:
+                    del self.postings[term]
+                    del self.max_tf[term]
+                    continue
+                ids, tfs = zip(*kept)
+                self.postings[term] = (array('I', ids), array('I', tfs))
+                self.max_tf[term] = max(tfs)
+                self._owned.add(term)
+            for doc_id in doc_ids:
+                self.total_length -= self.lengths.pop(doc_id, 0)
+            self.passages.delete_many(doc_ids)
+            return len(doc_ids)
+
+    def _writable(self, term: str) -> Tuple[array, array]:
+        """Списки термина, которые можно менять: опубликованные срезом копируются"""
+        entry = self.postings.get(term)
+        if entry is None:
+            entry = (array('I'), array('I'))
+        elif term not in self._owned:
+            entry = (array('I', entry[0]), array('I', entry[1]))
+        else:
+            return entry
+        self.postings[term] = entry
+        self._owned.add(term)
+        return entry
+
+    def _publish(self):
+        """Новый срез для поиска: нормировка длины BM25 и неизменяемые списки терминов"""
+        with self.lock:
+            norms = [0.0] * self.next_doc_id
+            count = len(self.lengths)
+            avgdl = (self.total_length / count if count else 0.0) or 1.0
+            k1, b = self.k1, self.b
+            for doc_id, length in self.lengths.items():
+                norms[doc_id] = k1 * (1 - b + b * length / avgdl)
+            min_norm = min(norms[doc_id] for doc_id in self.lengths) if count else 0.0
+            self.snapshot = IndexSnapshot(dict(self.postings), dict(self.max_tf), norms,
+                                          count, min_norm, k1)
+            self._owned = set()
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Поиск фрагментов по запросу с ранжированием BM25 (без блокировки индекса)"""
+        terms = [token for token in tokenize(query) if token not in STOP_WORDS]
+        if not terms:
+            return []
+
+        best = self.snapshot.top(terms, top_k)
+        if not best:
+            return []
+        passages = self.passages.get_many([doc_id for doc_id, _ in best])
+        return [{
+            'id': doc_id,
+            'score': round(score, 4),
+            'title': passages[doc_id]['title'],
+            'text': passages[doc_id]['text'],
+            'source': passages[doc_id]['source']
+        } for doc_id, score in best if doc_id in passages]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика базы знаний"""
+        with self.lock:
+            return {
+                'passages': len(self.lengths),
+                'terms': len(self.postings),
+                'files': len(self.files),
+                'corpus_dir': self.corpus_dir
+            }
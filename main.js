@@ -1,10 +1,21 @@
 const { app, BrowserWindow, ipcMain } = require('electron');
 const path = require('path');
+const os = require('os');
 const { spawn } = require('child_process');
+const { FrameClient } = require('./ipc_client');
 
 let mainWindow;
 let pythonProcess = null;
 
+// Транспорт к Python: http - fetch на localhost:5000; stdio - кадры на stdin/stdout
+// дочернего процесса; unix - кадры на Unix сокете (на Windows заменяется на stdio)
+const REQUESTED_TRANSPORT = process.env.RAVEN_TRANSPORT || 'http';
+const BACKEND_TRANSPORT = REQUESTED_TRANSPORT === 'unix' && process.platform === 'win32'
+    ? 'stdio' : REQUESTED_TRANSPORT;
+const BACKEND_SOCKET = process.env.RAVEN_SOCKET
+    || path.join(os.tmpdir(), `raven-ai-${process.pid}.sock`);
+let backendClient = null;
+
 function createWindow() {
     mainWindow = new BrowserWindow({
         width: 1400,
@@ -17,7 +28,8 @@ function createWindow() {
         webPreferences: {
             nodeIntegration: true,
             contextIsolation: false,
-            enableRemoteModule: true
+            enableRemoteModule: true,
+            preload: path.join(__dirname, 'preload.js')
         }
     });
 
@@ -47,16 +59,32 @@ function startPythonBackend() {
             cwd: __dirname,
             stdio: ['pipe', 'pipe', 'pipe'],
             shell: true,
-            env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
-        });
-
-        pythonProcess.stdout.on('data', (data) => {
-            const output = data.toString().trim();
-            if (output) {
-                console.log(`Python: ${output}`);
+            env: {
+                ...process.env,
+                PYTHONIOENCODING: 'utf-8',
+                RAVEN_TRANSPORT: BACKEND_TRANSPORT,
+                RAVEN_SOCKET: BACKEND_SOCKET
             }
         });
 
+        if (BACKEND_TRANSPORT === 'stdio') {
+            // stdout занят кадрами IPC, журнал Python приходит через stderr
+            backendClient = new FrameClient(pythonProcess.stdout, pythonProcess.stdin);
+        } else {
+            pythonProcess.stdout.on('data', (data) => {
+                const output = data.toString().trim();
+                if (output) {
+                    console.log(`Python: ${output}`);
+                }
+            });
+        }
+
+        if (BACKEND_TRANSPORT === 'unix') {
+            FrameClient.connect(BACKEND_SOCKET)
+                .then((client) => { backendClient = client; })
+                .catch((error) => console.error('Не удалось подключиться к IPC сокету:', error.message));
+        }
+
         pythonProcess.stderr.on('data', (data) => {
             const error = data.toString().trim();
             if (error) {
@@ -66,6 +94,10 @@ function startPythonBackend() {
 
         pythonProcess.on('close', (code) => {
             console.log(`Python процесс завершен с кодом: ${code}`);
+            if (backendClient) {
+                backendClient.close();
+                backendClient = null;
+            }
             if (code !== 0 && code !== null) {
                 console.log('Перезапуск Python через 5 секунд...');
                 setTimeout(startPythonBackend, 5000);
@@ -134,12 +166,49 @@ ipcMain.on('restart-python-backend', () => {
     startPythonBackend();
 });
 
+// Запрос к Python backend через IPC транспорт (stdio / unix)
+async function backendRequest(method, apiPath, body = null, onChunk = null) {
+    if (!backendClient) {
+        throw new Error('IPC канал к Python backend не готов');
+    }
+    return backendClient.request(method, apiPath, body, onChunk);
+}
+
+ipcMain.handle('backend:transport', () => BACKEND_TRANSPORT);
+
+ipcMain.handle('backend:request', async (event, { method, path: apiPath, body }) => {
+    try {
+        return await backendRequest(method, apiPath, body);
+    } catch (error) {
+        return { status: 503, headers: {}, body: JSON.stringify({ error: error.message }) };
+    }
+});
+
+// Потоковый ответ: части отправляются окну событиями backend:stream-chunk
+ipcMain.handle('backend:stream', async (event, { streamId, method, path: apiPath, body }) => {
+    try {
+        return await backendRequest(method, apiPath, body, (chunk) => {
+            event.sender.send('backend:stream-chunk', { streamId, chunk });
+        });
+    } catch (error) {
+        return { status: 503, headers: {}, error: error.message };
+    }
+});
+
 // Обработчик для проверки Python
 ipcMain.handle('check-python-backend', async () => {
     try {
-        const response = await fetch('http://localhost:5000/api/health');
-        if (response.ok) {
-            const data = await response.json();
+        let ok, data;
+        if (BACKEND_TRANSPORT === 'http') {
+            const response = await fetch('http://localhost:5000/api/health');
+            ok = response.ok;
+            data = ok ? await response.json() : null;
+        } else {
+            const response = await backendRequest('GET', '/api/health');
+            ok = response.status === 200;
+            data = ok ? JSON.parse(response.body) : null;
+        }
+        if (ok) {
             return {
                 success: true,
                 status: data.status,
@@ -9,12 +9,26 @@ import threading
 # Добавляем пути для импорта
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Профиль запуска (RAVEN_PROFILE=headless - без аудио, GUI и torch)
+from runtime_profile import apply_profile, format_profile_report, subsystem_enabled
+
+apply_profile()
+VOICE_ENABLED = subsystem_enabled('voice_input') and subsystem_enabled('voice_output')
+
 try:
     from core.raven_ai import RavenAI
-    from core.neural_tts import HumanVoiceTTS
-    from core.stt_enhanced import EnhancedSTT
+    if VOICE_ENABLED:
+        from core.neural_tts import HumanVoiceTTS
+        from core.stt_enhanced import EnhancedSTT
     from core.neural_core import NeuralCore
     from ai_api import AIAPI
+    from admission import get_admission_controller
+    from memory_diagnostics import get_memory_diagnostics
+    from openmetrics import get_metrics_exporter
+    from request_metrics import get_request_metrics, phase
+    from response_layer import get_response_layer
+    from sampling_profiler import get_sampling_profiler
+    from system_sampler import get_system_sampler
     
     # Импортируем Flask для API
     from flask import Flask, jsonify, request
@@ -30,15 +44,22 @@ def create_backend_api():
     """Создание Flask API для Electron"""
     app = Flask(__name__)
     CORS(app)  # Разрешаем CORS для Electron
+    get_request_metrics().install(app)
+    get_admission_controller().install(app)
+    get_response_layer().install(app)
+    get_metrics_exporter().install(app)
+    get_sampling_profiler().install(app)
+    get_memory_diagnostics().install(app)
     
     # Инициализация компонентов Raven AI
-    raven = RavenAI()
+    raven = RavenAI(lazy=not VOICE_ENABLED, voice=VOICE_ENABLED)
     tts = HumanVoiceTTS() if 'HumanVoiceTTS' in globals() else None
     stt = EnhancedSTT() if 'EnhancedSTT' in globals() else None
-    neural_core = NeuralCore() if 'NeuralCore' in globals() else None
+    neural_core = NeuralCore(lazy=not subsystem_enabled('neural_model')) \
+        if 'NeuralCore' in globals() else None
     
     # Инициализация AI API
-    ai_api = AIAPI(raven)
+    ai_api = AIAPI(raven, neural_core)
     
     @app.route('/api/health', methods=['GET'])
     def health_check():
@@ -53,36 +74,24 @@ def create_backend_api():
     
     @app.route('/api/metrics', methods=['GET'])
     def get_metrics():
-        """Получение метрик системы"""
-        import psutil
-        from datetime import datetime
+        """Получение метрик системы (снимок фонового сэмплера, ETag на снимок)"""
+        with phase('sampler'):
+            snapshot = get_system_sampler().get_snapshot()
         
-        cpu_percent = psutil.cpu_percent(interval=0.5)
-        ram = psutil.virtual_memory()
-        disk = psutil.disk_usage('C:/' if os.name == 'nt' else '/')
+        def build():
+            return {
+                'cpu': {
+                    'percent': snapshot['cpu']['percent'],
+                    'cores': snapshot['cpu']['cores']
+                },
+                'ram': snapshot['ram'],
+                'disk': snapshot['disk'],
+                'processes': snapshot['processes'],
+                'cadence': snapshot.get('cadence'),
+                'timestamp': snapshot['timestamp']
+            }
         
-        metrics = {
-            'cpu': {
-                'percent': cpu_percent,
-                'cores': psutil.cpu_count()
-            },
-            'ram': {
-                'percent': ram.percent,
-                'total': ram.total,
-                'used': ram.used,
-                'free': ram.free
-            },
-            'disk': {
-                'percent': disk.percent,
-                'total': disk.total,
-                'used': disk.used,
-                'free': disk.free
-            },
-            'processes': len(psutil.pids()),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        return jsonify(metrics)
+        return get_response_layer().snapshot('metrics', snapshot['sampled_at'], build)
     
     @app.route('/api/command', methods=['POST'])
     def process_command():
@@ -94,11 +103,13 @@ def create_backend_api():
             return jsonify({'error': 'No command provided'}), 400
         
         try:
-            response = raven.process_command(command)
+            with phase('skill'):
+                response = raven.process_command(command)
             return jsonify({
                 'success': True,
                 'response': response,
-                'command': command
+                'command': command,
+                'job_id': raven.get_last_job_id()
             })
         except Exception as e:
             return jsonify({
@@ -115,12 +126,17 @@ def create_backend_api():
 def main():
     """Точка входа в приложение"""
     print("🚀 Запуск Raven AI Backend API v2.2...")
+    print(format_profile_report())
     
     # Создаем Flask приложение
     app = create_backend_api()
     
-    # Запускаем Flask в отдельном потоке
+    # Запускаем сервер в отдельном потоке (RAVEN_SERVER=async - asyncio режим)
     def run_flask():
+        if os.environ.get('RAVEN_SERVER', 'threaded') == 'async':
+            from asgi_server import serve
+            serve(app, host='127.0.0.1', port=5000)
+            return
         app.run(
             host='127.0.0.1',
             port=5000,
@@ -140,6 +156,11 @@ def main():
     print("   POST /api/ai/analyze     - Анализ текста")
     print("   POST /api/ai/summarize   - Суммаризация")
     print("   POST /api/ai/translate   - Перевод")
+    print("   GET  /api/debug/stats    - Задержки и ошибки по маршрутам")
+    print("   GET  /api/debug/admission - Нагрузка и отказы в допуске")
+    print("   GET  /api/debug/profile  - Профиль потоков (?seconds=30&format=speedscope)")
+    print("   GET  /api/debug/memory   - Память процесса и размеры кэшей")
+    print("   GET  /metrics            - Метрики OpenMetrics (Prometheus)")
     print("=" * 50)
     
     # Держим основной поток активным
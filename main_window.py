@@ -9,6 +9,8 @@ from PyQt6.QtGui import QFont, QIcon, QPalette, QColor
 import threading
 import time
 
+from ui.components.adaptive_timer import AdaptiveTimer
+
 class RavenMainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -221,10 +223,10 @@ class RavenMainWindow(QMainWindow):
         
         main_layout.addWidget(footer_frame)
         
-        # Таймер обновления системной информации
-        self.sys_info_timer = QTimer()
-        self.sys_info_timer.timeout.connect(self.update_system_indicators)
-        self.sys_info_timer.start(2000)
+        # Таймер обновления системной информации (стоит, пока окно свёрнуто)
+        self.sys_info_timer = AdaptiveTimer(self, self.update_system_indicators, 2000,
+                                            fast_ms=1000)
+        self.sys_info_timer.start()
         
         # Инициализация компонентов
         QTimer.singleShot(100, self.initialize_components)
@@ -354,6 +356,8 @@ RAM: {ram}%
             
             self.cpu_label.setText(f"CPU: {cpu:.1f}%")
             self.ram_label.setText(f"RAM: {ram:.1f}%")
+            self.sys_info_timer.observe(cpu, ram)
+            self.cpu_label.setToolTip(self.sys_info_timer.describe())
             
         except:
             pass
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+Диагностика памяти бэкенда: снимки tracemalloc с разницей по местам выделения,
+размеры внутренних кэшей и их урезание до заданного бюджета
+"""
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import psutil
+
+# Бюджеты кэшей по умолчанию (в единицах кэша: сессии, записи, процессы);
+# переопределение: RAVEN_CACHE_BUDGETS="ai_contexts=32,process_registry=2048"
+DEFAULT_CACHE_BUDGETS = {
+    'ai_contexts': 64,
+    'neural_contexts': 64,
+    'chat_history': None,  # только кэш страниц SQLite, объём журнала - RAVEN_HISTORY_*
+    # Объекты Process хранят базу для cpu_percent: сброс обнуляет загрузку CPU процессов,
+    # поэтому реестр очищается, только если вырос сверх обычного числа процессов
+    'process_registry': 2048,
+    'response_snapshots': 8,
+    'phrase_cache': 256
+}
+
+TRACEMALLOC_FRAMES = int(os.environ.get('RAVEN_TRACEMALLOC_FRAMES', 1))
+# Бэкенд для урезания из GUI: окна Qt работают в другом процессе, чем Flask
+BACKEND_URL = os.environ.get('RAVEN_BACKEND_URL', 'http://127.0.0.1:5000')
+BACKEND_TIMEOUT = 5.0
+DEFAULT_TOP = 20
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+
+def parse_budgets(value: str) -> Dict[str, Optional[int]]:
+    """Строка "имя=число,..." -> бюджеты (пустое значение - без ограничения)"""
+    budgets = {}
+    for item in value.split(','):
+        name, _, budget = item.partition('=')
+        if name.strip():
+            budgets[name.strip()] = int(budget) if budget.strip() else None
+    return budgets
+
+
+def configured_budgets() -> Dict[str, Optional[int]]:
+    budgets = dict(DEFAULT_CACHE_BUDGETS)
+    budgets.update(parse_budgets(os.environ.get('RAVEN_CACHE_BUDGETS', '')))
+    return budgets
+
+
+def process_memory() -> Dict[str, Any]:
+    """Память процесса по данным ОС"""
+    info = psutil.Process().memory_info()
+    return {'rss': info.rss, 'vms': info.vms}
+
+
+class ProcessRegistryCache:
+    """Кэш объектов Process, который psutil.process_iter держит между вызовами"""
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        registry = getattr(psutil, '_pmap', None)
+        return {'entries': len(registry) if registry is not None else None}
+
+    def trim(self, budget: Optional[int]) -> int:
+        registry = getattr(psutil, '_pmap', None)
+        if registry is None or budget is None or len(registry) <= budget:
+            return 0
+        removed = len(registry)
+        cache_clear = getattr(psutil.process_iter, 'cache_clear', None)
+        if cache_clear is not None:
+            cache_clear()
+        else:
+            registry.clear()
+        return removed
+
+
+class MemoryDiagnostics:
+    """Реестр кэшей (get_memory_stats/trim) и снимки tracemalloc"""
+
+    def __init__(self):
+        self.caches = {}
+        self.budgets = configured_budgets()
+        self.baseline = None
+        self.previous = None
+        self.snapshots_taken = 0
+        self.last_trim = None
+        self.lock = threading.Lock()
+        self.register('process_registry', ProcessRegistryCache())
+
+    def register(self, name: str, cache: Any, budget: Optional[int] = None):
+        """Учёт кэша: объект с get_memory_stats() и trim(budget) -> число удалённых записей"""
+        with self.lock:
+            self.caches[name] = cache
+            if budget is not None and name not in self.budgets:
+                self.budgets[name] = budget
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            caches = dict(self.caches)
+        stats = {}
+        for name, cache in sorted(caches.items()):
+            try:
+                stats[name] = dict(cache.get_memory_stats(), budget=self.budgets.get(name))
+            except Exception as e:
+                stats[name] = {'error': str(e)}
+        return stats
+
+    def trim(self, budgets: Optional[Dict[str, Optional[int]]] = None) -> Dict[str, Any]:
+        """Урезание кэшей до бюджетов и сборка мусора; RSS до и после"""
+        with self.lock:
+            caches = dict(self.caches)
+            limits = dict(self.budgets)
+        if budgets:
+            limits.update(budgets)
+
+        rss_before = process_memory()['rss']
+        removed = {}
+        for name, cache in sorted(caches.items()):
+            try:
+                removed[name] = cache.trim(limits.get(name))
+            except Exception as e:
+                removed[name] = f'ошибка: {e}'
+        collected = gc.collect()
+        rss_after = process_memory()['rss']
+
+        result = {
+            'removed': removed,
+            'gc_collected': collected,
+            'rss_before': rss_before,
+            'rss_after': rss_after,
+            'freed_bytes': max(rss_before - rss_after, 0),
+            'caches': self.get_cache_stats(),
+            'timestamp': datetime.now().isoformat()
+        }
+        self.last_trim = result
+        return result
+
+    def snapshot(self, top: int = DEFAULT_TOP, key_type: str = 'lineno',
+                 since: str = 'previous') -> Dict[str, Any]:
+        """Снимок tracemalloc и места выделения с наибольшим ростом с прошлого снимка
+        (since=baseline - с первого); первый вызов только включает трассировку"""
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"key_type: {', '.join(KEY_TYPES)}")
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self.baseline = self.previous = self._take()
+                return {
+                    'started': True,
+                    'frames': TRACEMALLOC_FRAMES,
+                    'message': 'Трассировка включена, следующий снимок покажет рост',
+                    'tracing': self.get_tracing_stats()
+                }
+            current = self._take()
+            reference = self.baseline if since == 'baseline' else self.previous
+            self.previous = current
+        elapsed = current.taken_at - reference.taken_at
+
+        differences = current.snapshot.compare_to(reference.snapshot, key_type)
+        growing = [diff for diff in differences if diff.size_diff > 0][:top]
+        return {
+            'started': False,
+            'since': since,
+            'interval_seconds': round(elapsed, 1),
+            'total_growth_bytes': sum(diff.size_diff for diff in differences),
+            'top_growth': [self._format_diff(diff) for diff in growing],
+            'tracing': self.get_tracing_stats()
+        }
+
+    def _take(self):
+        """Снимок без кадров самого tracemalloc и импорта (вызывать под lock)"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>')
+        ))
+        self.snapshots_taken += 1
+        return TakenSnapshot(snapshot)
+
+    @staticmethod
+    def _format_diff(diff) -> Dict[str, Any]:
+        frames = [f"{frame.filename}:{frame.lineno}" for frame in diff.traceback]
+        return {
+            'site': frames[0] if frames else '?',
+            'traceback': frames if len(frames) > 1 else None,
+            'size_diff_bytes': diff.size_diff,
+            'size_bytes': diff.size,
+            'count_diff': diff.count_diff,
+            'count': diff.count
+        }
+
+    def stop(self) -> Dict[str, Any]:
+        """Выключение трассировки и освобождение снимков"""
+        with self.lock:
+            was_tracing = tracemalloc.is_tracing()
+            tracemalloc.stop()
+            self.baseline = self.previous = None
+        return {'stopped': was_tracing}
+
+    def get_tracing_stats(self) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            return {'tracing': False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'tracing': True,
+            'frames': tracemalloc.get_traceback_limit(),
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'overhead_bytes': tracemalloc.get_tracemalloc_memory(),
+            'snapshots_taken': self.snapshots_taken
+        }
+
+    def get_report(self) -> Dict[str, Any]:
+        """Память процесса, сборщик мусора, кэши и состояние трассировки"""
+        return {
+            'process': process_memory(),
+            'gc': {
+                'counts': gc.get_count(),
+                'thresholds': gc.get_threshold(),
+                'objects': len(gc.get_objects()),
+                'collections': [stats['collections'] for stats in gc.get_stats()]
+            },
+            'caches': self.get_cache_stats(),
+            'tracemalloc': self.get_tracing_stats(),
+            'last_trim': self.last_trim and {
+                key: self.last_trim[key] for key in ('freed_bytes', 'gc_collected', 'timestamp')
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def install(self, app):
+        """Маршруты /api/debug/memory"""
+        from flask import jsonify, request
+
+        @app.route('/api/debug/memory', methods=['GET'])
+        def debug_memory():
+            """Память процесса и размеры кэшей"""
+            return jsonify(self.get_report())
+
+        @app.route('/api/debug/memory/snapshot', methods=['POST', 'DELETE'])
+        def debug_memory_snapshot():
+            """POST - снимок и рост по местам выделения (?top=20&key_type=lineno&since=previous),
+            DELETE - выключение трассировки"""
+            if request.method == 'DELETE':
+                return jsonify(self.stop())
+            try:
+                top = int(request.args.get('top', DEFAULT_TOP))
+                return jsonify(self.snapshot(top, request.args.get('key_type', 'lineno'),
+                                             request.args.get('since', 'previous')))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+
+        @app.route('/api/debug/memory/trim', methods=['POST'])
+        def debug_memory_trim():
+            """Урезание кэшей: бюджеты по умолчанию или {"budgets": {"имя": число}}"""
+            data = request.get_json(silent=True) or {}
+            return jsonify(self.trim(data.get('budgets')))
+
+
+class TakenSnapshot:
+    """Снимок tracemalloc со временем снятия"""
+
+    def __init__(self, snapshot: tracemalloc.Snapshot):
+        self.snapshot = snapshot
+        self.taken_at = time.time()
+
+
+_default_diagnostics = None
+_default_lock = threading.Lock()
+
+
+def get_memory_diagnostics() -> MemoryDiagnostics:
+    """Общая диагностика памяти процесса"""
+    global _default_diagnostics
+    with _default_lock:
+        if _default_diagnostics is None:
+            _default_diagnostics = MemoryDiagnostics()
+        return _default_diagnostics
+
+
+def trim_backend(budgets: Optional[Dict[str, Optional[int]]] = None,
+                 base_url: str = BACKEND_URL) -> Dict[str, Any]:
+    """Урезание кэшей процесса бэкенда через /api/debug/memory/trim; результат его trim().
+    Ошибки соединения (бэкенд не запущен или слушает IPC) - исключения requests"""
+    import requests
+
+    response = requests.post(f"{base_url}/api/debug/memory/trim",
+                             json={'budgets': budgets} if budgets else {},
+                             timeout=BACKEND_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,155 @@
+"""
+Реестр версий моделей с фоновой загрузкой и статистикой задержек
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+CHECKPOINT_EXTENSIONS = ('.pt', '.pth')
+
+
+class LatencyStats:
+    """Измеренные задержки обработки запросов одной версии модели"""
+
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, ms: float, ok: bool = True):
+        """Добавление замера"""
+        with self.lock:
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+            self.recent.append(ms)
+            if not ok:
+                self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сводка: среднее и перцентили по последнему окну"""
+        with self.lock:
+            if not self.count:
+                return {'count': 0, 'errors': 0, 'avg_ms': None,
+                        'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+            ordered = sorted(self.recent)
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'avg_ms': round(self.total_ms / self.count, 2),
+                'p50_ms': round(ordered[len(ordered) // 2], 2),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                'max_ms': round(self.max_ms, 2)
+            }
+
+
+class ModelRegistry:
+    """Чекпоинты моделей на диске, активная версия и горячая замена"""
+
+    def __init__(self, models_dir: str = 'models', active_version: Optional[str] = None):
+        self.models_dir = models_dir
+        self.active_version = active_version
+        self.stats = {}
+        self.swap_state = {'state': 'idle', 'target': None, 'error': None}
+        self.lock = threading.Lock()
+
+    def scan(self) -> List[Dict[str, Any]]:
+        """Список чекпоинтов с метаданными (из файла и <имя>.json рядом)"""
+        models = []
+        if not os.path.isdir(self.models_dir):
+            return models
+
+        for name in sorted(os.listdir(self.models_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in CHECKPOINT_EXTENSIONS:
+                continue
+            path = os.path.join(self.models_dir, name)
+            stat = os.stat(path)
+            info = {
+                'id': stem,
+                'path': path,
+                'size_mb': round(stat.st_size / (1024 * 1024), 2),
+                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+            }
+
+            meta_path = os.path.join(self.models_dir, stem + '.json')
+            if os.path.exists(meta_path):
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    info.update({k: v for k, v in meta.items() if k not in ('id', 'path')})
+                except Exception as e:
+                    info['metadata_error'] = str(e)
+            models.append(info)
+        return models
+
+    def get(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Метаданные чекпоинта по ID"""
+        for info in self.scan():
+            if info['id'] == model_id:
+                return info
+        return None
+
+    def get_stats(self, version: str) -> LatencyStats:
+        """Статистика версии (создаётся при первом обращении)"""
+        with self.lock:
+            stats = self.stats.get(version)
+            if stats is None:
+                stats = self.stats[version] = LatencyStats()
+            return stats
+
+    def record_latency(self, version: Optional[str], ms: float, ok: bool = True):
+        """Запись задержки обработки запроса версией модели"""
+        self.get_stats(version or 'default').record(ms, ok)
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        """Чекпоинты с измеренной статистикой и признаком активности"""
+        models = self.scan()
+        for info in models:
+            info['active'] = info['id'] == self.active_version
+            info['latency'] = self.get_stats(info['id']).to_dict()
+        return models
+
+    def load_async(self, model_id: str, loader: Callable[[str], Any],
+                   on_ready: Callable[[str, str, Any], None]) -> Dict[str, Any]:
+        """Фоновая загрузка версии; on_ready вызывается для атомарной замены"""
+        info = self.get(model_id)
+        if not info:
+            raise ValueError(f'Модель {model_id} не найдена в {self.models_dir}')
+
+        with self.lock:
+            if self.swap_state['state'] == 'loading':
+                raise RuntimeError(f"Уже загружается {self.swap_state['target']}")
+            self.swap_state = {'state': 'loading', 'target': model_id, 'error': None}
+
+        def run():
+            start = time.perf_counter()
+            try:
+                bundle = loader(info['path'])
+                on_ready(model_id, info['path'], bundle)
+                state = {'state': 'idle', 'target': None, 'error': None,
+                         'last_swap': model_id,
+                         'load_ms': round((time.perf_counter() - start) * 1000, 1)}
+                with self.lock:
+                    self.active_version = model_id
+                    self.swap_state = state
+                print(f"✅ Активна модель {model_id}")
+            except Exception as e:
+                with self.lock:
+                    self.swap_state = {'state': 'failed', 'target': model_id, 'error': str(e)}
+                print(f"⚠️ Не удалось загрузить модель {model_id}: {e}")
+
+        threading.Thread(target=run, daemon=True, name='raven-model-load').start()
+        return dict(self.swap_state)
+
+    def get_swap_state(self) -> Dict[str, Any]:
+        """Состояние горячей замены"""
+        with self.lock:
+            return dict(self.swap_state)
@@ -1,37 +1,81 @@
 """
 Ядро искусственного интеллекта Raven AI (исправленная версия)
 """
-import numpy as np
 from typing import List, Dict, Any, Optional
 import json
 import os
 from datetime import datetime
 import hashlib
+import threading
+import time
 
-# ИСПРАВЛЕНО: Убираем зависимость от torch если не установлен
-try:
-    import torch
-    import torch.nn as nn
-    TORCH_AVAILABLE = True
-except ImportError:
-    TORCH_AVAILABLE = False
-    print("⚠️ PyTorch не установлен. Используется упрощенный режим.")
+from shared_state import create_context_store
+from knowledge_base import KnowledgeBase
+from memory_diagnostics import get_memory_diagnostics
+from model_registry import ModelRegistry
+from request_metrics import phase
+from skill_executor import get_skill_executor, terminate_process
+
+# torch импортируется лениво: импорт занимает секунды и не нужен для старта
+torch = None
+nn = None
+TORCH_AVAILABLE = None  # None - импорт ещё не выполнялся
+
+
+def import_torch() -> bool:
+    """Ленивый импорт torch, возвращает доступность"""
+    global torch, nn, TORCH_AVAILABLE
+    if TORCH_AVAILABLE is None:
+        try:
+            import torch as torch_module
+            import torch.nn as nn_module
+            torch, nn = torch_module, nn_module
+            TORCH_AVAILABLE = True
+        except ImportError:
+            TORCH_AVAILABLE = False
+            print("⚠️ PyTorch не установлен. Используется упрощенный режим.")
+    return TORCH_AVAILABLE
 
 class NeuralCore:
     """Нейросетевое ядро для понимания и генерации ответов"""
     
-    def __init__(self, model_path: str = "models/neural_core.pt"):
+    def __init__(self, model_path: str = "models/neural_core.pt", lazy: bool = False):
         self.model_path = model_path
+        self.model = None
+        self.network_class = None
+        self.model_lock = threading.Lock()
+        
+        # Реестр версий модели: активная версия - имя файла чекпоинта
+        self.model_version = os.path.splitext(os.path.basename(model_path))[0]
+        self.registry = ModelRegistry(os.path.dirname(model_path) or '.', self.model_version)
         
-        # Контекстная память
-        self.context_memory = []
+        # Контекстная память по сессиям клиентов
         self.max_context = 10
+        self.context_store = create_context_store('neural_contexts', capacity=self.max_context)
+        get_memory_diagnostics().register('neural_contexts', self.context_store)
         
         # Навыки
         self.skills = self.load_skills()
         
-        # Загрузка модели если torch доступен
-        if TORCH_AVAILABLE:
+        # Исполнитель навыков с побочными эффектами; ID задачи навыка - в потоке запроса,
+        # а не в сущностях, которые уходят клиенту
+        self.executor = get_skill_executor()
+        self._local = threading.local()
+        
+        # База знаний (индекс загружается в фоне)
+        self.knowledge_base = KnowledgeBase()
+        self.knowledge_min_score = 1.0
+        threading.Thread(target=self.knowledge_base.load, daemon=True).start()
+        
+        # Загрузка модели сразу или при фоновом прогреве
+        if not lazy:
+            self.warm_up()
+    
+    def warm_up(self):
+        """Импорт torch и загрузка модели если torch доступен"""
+        if self.model is not None:
+            return
+        if import_torch():
             self.setup_neural_network()
             self.load_model()
         else:
@@ -41,7 +85,14 @@ class NeuralCore:
         """Настройка нейросети (только если torch доступен)"""
         if not TORCH_AVAILABLE:
             return
-            
+        
+        self.network_class = self.define_network()
+        self.model = self.network_class()
+        self.vocab = {}
+        self.inv_vocab = {}
+    
+    def define_network(self):
+        """Класс нейросети (требует torch)"""
         class SimpleNeuralNetwork(nn.Module):
             def __init__(self):
                 super().__init__()
@@ -61,42 +112,90 @@ class NeuralCore:
                 x = self.fc3(x)
                 return x
         
-        self.model = SimpleNeuralNetwork()
-        self.vocab = {}
-        self.inv_vocab = {}
+        return SimpleNeuralNetwork
     
-    def process_query(self, query: str, context: Optional[List[str]] = None) -> Dict[str, Any]:
+    def process_query(self, query: str, context: Optional[List[str]] = None,
+                      session_id: Optional[str] = None) -> Dict[str, Any]:
         """Обработка запроса пользователя"""
+        # Версия фиксируется на старте: замена модели не влияет на текущий запрос
+        version = self.model_version
+        start = time.perf_counter()
+        try:
+            result = self._process_query(query, context, session_id)
+        except Exception:
+            self.registry.record_latency(version, (time.perf_counter() - start) * 1000, ok=False)
+            raise
+        self.registry.record_latency(version, (time.perf_counter() - start) * 1000)
+        result['model_version'] = version
+        return result
+    
+    def process_query_stream(self, query: str, context: Optional[List[str]] = None,
+                             session_id: Optional[str] = None):
+        """Потоковая обработка: события intent, skill, chunk (по мере готовности текста)
+        и итоговый done"""
+        version = self.model_version
+        start = time.perf_counter()
+        try:
+            for event, data in self._query_stages(query, context, session_id):
+                if event != 'result':
+                    yield event, data
+                    continue
+                data['model_version'] = version
+                result = data
+        except Exception:
+            self.registry.record_latency(version, (time.perf_counter() - start) * 1000, ok=False)
+            raise
+        self.registry.record_latency(version, (time.perf_counter() - start) * 1000)
+        yield 'done', result
+    
+    def _process_query(self, query: str, context: Optional[List[str]],
+                       session_id: Optional[str]) -> Dict[str, Any]:
+        """Конвейер обработки: намерение, сущности, навык, контекст"""
+        for event, data in self._query_stages(query, context, session_id):
+            if event == 'result':
+                return data
+    
+    def _query_stages(self, query: str, context: Optional[List[str]],
+                      session_id: Optional[str]):
+        """Этапы конвейера как генератор событий (промежуточные и итоговое result)"""
         # Анализ намерения
-        intent = self.detect_intent(query)
+        with phase('nlu'):
+            intent = self.detect_intent(query)
+        yield 'intent', {'intent': intent}
         
-        # Извлечение сущностей
-        entities = self.extract_entities(query)
-        
-        # Определение навыка
-        skill = self.select_skill(intent, entities)
+        # Извлечение сущностей и определение навыка
+        with phase('nlu'):
+            entities = self.extract_entities(query)
+            skill = self.select_skill(intent, entities)
+        yield 'skill', {'skill': skill, 'entities': entities}
         
         # Генерация ответа
-        if skill:
-            response = self.execute_skill(skill, query, entities)
-        else:
-            response = self.generate_response(query, context)
-        
-        # Обновление контекста
-        self.update_context(query, response)
+        self._local.job_id = None
+        with phase('skill'):
+            if skill:
+                response = self.execute_skill(skill, query, entities)
+            else:
+                response = self.generate_response(query, context)
+        # Текст отдаётся сразу, до обновления контекста и анализа эмоций
+        yield 'chunk', {'text': response}
+        
+        # Обновление контекста сессии
+        self.update_context(query, response, session_id)
         
         # Анализ эмоций
         emotion = self.analyze_emotion(query)
         
-        return {
+        yield 'result', {
             'query': query,
             'intent': intent,
             'entities': entities,
             'skill': skill,
             'response': response,
             'emotion': emotion,
+            'job_id': self._local.job_id,
             'timestamp': datetime.now().isoformat(),
-            'context_id': self.generate_context_id(query)
+            'context_id': self.generate_context_id(query),
+            'session_id': session_id
         }
     
     def detect_intent(self, query: str) -> str:
@@ -217,48 +316,64 @@ class NeuralCore:
         return random.choice(responses.get(intent, ["Я вас слушаю."]))
     
     def handle_system_control(self, query: str, entities: Dict) -> str:
-        """Управление системой"""
-        import psutil
-        import subprocess
-        
+        """Управление системой (выполняется асинхронно через исполнитель навыков)"""
         query_lower = query.lower()
         
         if 'открой' in query_lower or 'запусти' in query_lower:
             if entities.get('applications'):
                 app = entities['applications'][0]
-                try:
-                    # Маппинг приложений
-                    app_map = {
-                        'браузер': 'chrome.exe',
-                        'chrome': 'chrome.exe',
-                        'блокнот': 'notepad.exe',
-                        'notepad': 'notepad.exe',
-                        'калькулятор': 'calc.exe',
-                        'calc': 'calc.exe'
-                    }
-                    
-                    app_exe = app_map.get(app, app + '.exe')
-                    subprocess.Popen(app_exe, shell=True)
-                    return f"✅ Запускаю {app}"
-                except Exception as e:
-                    return f"❌ Не удалось запустить {app}: {str(e)}"
+                # Маппинг приложений
+                app_map = {
+                    'браузер': 'chrome.exe',
+                    'chrome': 'chrome.exe',
+                    'блокнот': 'notepad.exe',
+                    'notepad': 'notepad.exe',
+                    'калькулятор': 'calc.exe',
+                    'calc': 'calc.exe'
+                }
+                
+                app_exe = app_map.get(app, app + '.exe')
+                job = self.executor.submit('launch_app', self._launch_application, app_exe)
+                self._local.job_id = job.job_id
+                if job.status == 'rejected':
+                    return f"❌ Не удалось запустить {app}: {job.error}"
+                return f"✅ Запускаю {app}"
         
         elif 'закрой' in query_lower:
             # Закрытие приложений
-            for proc in psutil.process_iter(['name']):
-                try:
-                    if any(app in proc.info['name'].lower() for app in entities.get('applications', [])):
-                        proc.terminate()
-                        return f"✅ Закрыл {proc.info['name']}"
-                except:
-                    pass
-            return "⚠️ Не удалось найти указанное приложение"
+            apps = entities.get('applications', [])
+            if not apps:
+                return "⚠️ Не удалось найти указанное приложение"
+            job = self.executor.submit('close_app', self._close_applications, apps)
+            self._local.job_id = job.job_id
+            if job.status == 'rejected':
+                return f"❌ Не удалось закрыть приложение: {job.error}"
+            return f"⏳ Закрываю {', '.join(apps)}"
         
         elif 'выключи' in query_lower and ('компьютер' in query_lower or 'пк' in query_lower):
             return "⚠️ Команда выключения компьютера требует подтверждения"
         
         return "ℹ️ Системная команда обработана"
     
+    def _launch_application(self, app_exe: str) -> str:
+        """Запуск приложения (в потоке исполнителя, процесс привязан к задаче)"""
+        self.executor.launch(app_exe, shell=True)
+        return f"Запущено {app_exe}"
+    
+    def _close_applications(self, apps: List[str]) -> str:
+        """Закрытие приложений по имени (в потоке исполнителя)"""
+        import psutil
+        
+        for proc in psutil.process_iter(['name']):
+            try:
+                if any(app in proc.info['name'].lower() for app in apps):
+                    # Ожидание выхода ограничено, не закрывшийся процесс убивается
+                    killed = terminate_process(proc)
+                    return f"{'Принудительно закрыл' if killed else 'Закрыл'} {proc.info['name']}"
+            except (psutil.Error, AttributeError):
+                pass
+        raise RuntimeError("Не удалось найти указанное приложение")
+    
     def handle_system_monitor(self, query: str, entities: Dict) -> str:
         """Мониторинг системы"""
         import psutil
@@ -300,6 +415,11 @@ class NeuralCore:
             if pattern in query.lower():
                 return answer
         
+        # Поиск по локальной базе знаний (BM25)
+        results = self.knowledge_base.search(query, top_k=1)
+        if results and results[0]['score'] >= self.knowledge_min_score:
+            return results[0]['text']
+        
         # Если вопрос не найден
         return "🤔 Интересный вопрос. Позвольте мне подумать..."
     
@@ -328,16 +448,17 @@ class NeuralCore:
         else:
             return 'neutral'
     
-    def update_context(self, query: str, response: str):
-        """Обновление контекстной памяти"""
-        self.context_memory.append({
+    def update_context(self, query: str, response: str, session_id: Optional[str] = None):
+        """Обновление контекстной памяти сессии"""
+        self.context_store.append(session_id, {
             'query': query,
             'response': response,
             'timestamp': datetime.now().isoformat()
         })
-        
-        if len(self.context_memory) > self.max_context:
-            self.context_memory.pop(0)
+    
+    def get_context(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Контекстная память сессии"""
+        return self.context_store.get(session_id)
     
     def generate_context_id(self, query: str) -> str:
         """Генерация ID контекста"""
@@ -356,16 +477,45 @@ class NeuralCore:
     
     def save_model(self):
         """Сохранение модели"""
-        if TORCH_AVAILABLE:
+        if TORCH_AVAILABLE and self.model is not None:
+            with self.model_lock:
+                model, vocab, inv_vocab, path = self.model, self.vocab, self.inv_vocab, self.model_path
             torch.save({
-                'model_state_dict': self.model.state_dict(),
-                'vocab': self.vocab,
-                'inv_vocab': self.inv_vocab
-            }, self.model_path)
+                'model_state_dict': model.state_dict(),
+                'vocab': vocab,
+                'inv_vocab': inv_vocab
+            }, path)
+    
+    def build_model(self, path: str):
+        """Загрузка чекпоинта в новый экземпляр сети (без замены активной)"""
+        if not import_torch():
+            raise RuntimeError('PyTorch не установлен')
+        if self.network_class is None:
+            self.network_class = self.define_network()
+        
+        checkpoint = torch.load(path)
+        model = self.network_class()
+        model.load_state_dict(checkpoint['model_state_dict'])
+        model.eval()
+        return model, checkpoint.get('vocab', {}), checkpoint.get('inv_vocab', {})
+    
+    def activate_model(self, version: str, path: str, bundle):
+        """Атомарная замена активной модели"""
+        model, vocab, inv_vocab = bundle
+        with self.model_lock:
+            self.model = model
+            self.vocab = vocab
+            self.inv_vocab = inv_vocab
+            self.model_path = path
+            self.model_version = version
+    
+    def swap_model(self, model_id: str) -> Dict[str, Any]:
+        """Фоновая загрузка версии модели с последующей горячей заменой"""
+        return self.registry.load_async(model_id, self.build_model, self.activate_model)
     
     def load_model(self):
         """Загрузка модели"""
-        if not TORCH_AVAILABLE:
+        if not TORCH_AVAILABLE or self.model is None:
             return
             
         try:
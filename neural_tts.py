@@ -8,6 +8,8 @@ import os
 import json
 from typing import Optional
 
+from request_metrics import timed_operation
+
 class HumanVoiceTTS:
     """TTS с человеческим голосом"""
     
@@ -26,7 +28,8 @@ class HumanVoiceTTS:
         self.init_voices()
         
         # Поток воспроизведения
-        self.playback_thread = threading.Thread(target=self._playback_worker, daemon=True)
+        self.playback_thread = threading.Thread(target=self._playback_worker, daemon=True,
+                                                name='raven-tts-playback')
         self.playback_thread.start()
         
         print("🎵 Human Voice TTS инициализирован")
@@ -177,8 +180,9 @@ class HumanVoiceTTS:
             engine.setProperty('volume', self.volume)
             
             # Произнесение
-            engine.say(text)
-            engine.runAndWait()
+            with timed_operation('tts'):
+                engine.say(text)
+                engine.runAndWait()
             engine.stop()
             
         except Exception as e:
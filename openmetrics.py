@@ -0,0 +1,207 @@
+"""
+Экспорт метрик в формате OpenMetrics (Prometheus) для GET /metrics
+"""
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cadence import MODES
+from request_metrics import RequestMetrics, get_request_metrics
+from system_sampler import SystemSampler, get_system_sampler
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Границы корзин гистограмм задержек, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Семейство метрик: (имя, тип, описание, [(суффикс, метки, значение)])
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, Any], float]]]
+
+
+def escape_label(value: Any) -> str:
+    """Экранирование значения метки"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    """Число в текстовом формате OpenMetrics"""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def render_families(families: Iterable[Family]) -> str:
+    """Текст OpenMetrics с завершающим # EOF"""
+    lines = []
+    for name, metric_type, help_text, samples in families:
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'# HELP {name} {help_text}')
+        for suffix, labels, value in samples:
+            if labels:
+                label_text = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+                lines.append(f'{name}{suffix}{{{label_text}}} {format_value(value)}')
+            else:
+                lines.append(f'{name}{suffix} {format_value(value)}')
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def histogram_samples(histogram, labels: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], float]]:
+    """Корзины, count и sum гистограммы задержек (значения в микросекундах)"""
+    bounds_us = [int(bound * 1000000) for bound in LATENCY_BUCKETS]
+    samples = []
+    for bound, count in zip(LATENCY_BUCKETS, histogram.cumulative(bounds_us)):
+        samples.append(('_bucket', dict(labels, le=format_value(bound)), count))
+    samples.append(('_bucket', dict(labels, le='+Inf'), histogram.count))
+    samples.append(('_count', labels, histogram.count))
+    samples.append(('_sum', labels, histogram.total / 1000000.0))
+    return samples
+
+
+def host_families(snapshot: Dict[str, Any], sampler: SystemSampler) -> List[Family]:
+    """Метрики хоста из снимка сэмплера"""
+    cadence = snapshot.get('cadence') or {'mode': 'normal', 'interval': None}
+    return [
+        ('raven_host_cpu_usage_percent', 'gauge', 'CPU utilisation of the host.',
+         [('', {}, snapshot['cpu']['percent'])]),
+        ('raven_host_cpu_cores', 'gauge', 'Logical CPU cores.',
+         [('', {}, snapshot['cpu']['cores'] or 0)]),
+        ('raven_host_memory_bytes', 'gauge', 'Host memory by state.',
+         [('', {'state': 'total'}, snapshot['ram']['total']),
+          ('', {'state': 'used'}, snapshot['ram']['used']),
+          ('', {'state': 'free'}, snapshot['ram']['free'])]),
+        ('raven_host_memory_usage_percent', 'gauge', 'Host memory utilisation.',
+         [('', {}, snapshot['ram']['percent'])]),
+        ('raven_host_disk_bytes', 'gauge', 'System disk space by state.',
+         [('', {'state': 'total'}, snapshot['disk']['total']),
+          ('', {'state': 'used'}, snapshot['disk']['used']),
+          ('', {'state': 'free'}, snapshot['disk']['free'])]),
+        ('raven_host_network_bytes', 'counter', 'Bytes transferred over all interfaces.',
+         [('_total', {'direction': 'sent'}, snapshot['network']['bytes_sent']),
+          ('_total', {'direction': 'received'}, snapshot['network']['bytes_recv'])]),
+        ('raven_host_processes', 'gauge', 'Running processes.',
+         [('', {}, snapshot['processes'])]),
+        ('raven_backend_resident_memory_bytes', 'gauge',
+         'Resident memory of the backend processes.',
+         [('', {}, snapshot['backend']['rss'])]),
+        ('raven_backend_threads', 'gauge', 'Threads of the backend processes.',
+         [('', {}, snapshot['backend']['threads'])]),
+        ('raven_backend_processes', 'gauge', 'Backend processes (master and prefork workers).',
+         [('', {}, snapshot['backend'].get('processes', 1))]),
+        ('raven_sampler_duration_seconds', 'gauge', 'Time spent taking the last host sample.',
+         [('', {}, sampler.sample_ms / 1000.0)]),
+        ('raven_sampler_ticks', 'counter', 'Host samples taken.',
+         [('_total', {}, sampler.tick)]),
+        ('raven_sampler_interval_seconds', 'gauge', 'Current host sampling interval (0 - paused).',
+         [('', {}, cadence['interval'] or 0)]),
+        ('raven_sampler_mode', 'gauge', 'Sampling cadence mode (1 for the active one).',
+         [('', {'mode': mode}, int(mode == cadence['mode'])) for mode in MODES])
+    ]
+
+
+def request_families(metrics: RequestMetrics) -> List[Family]:
+    """Метрики HTTP запросов и операций STT/TTS"""
+    with metrics.lock:
+        routes = sorted(metrics.routes.items())
+        operations = sorted(metrics.operations.items())
+
+    durations, phases, requests, errors, in_flight = [], [], [], [], []
+    for key, stats in routes:
+        method, _, route = key.partition(' ')
+        labels = {'method': method, 'route': route}
+        with stats.lock:
+            durations.extend(histogram_samples(stats.latency_us, labels))
+            for name, histogram in sorted(stats.phase_us.items()):
+                phases.extend(histogram_samples(histogram, dict(labels, phase=name)))
+            for status, count in sorted(stats.status_counts.items()):
+                requests.append(('_total', dict(labels, status=status), count))
+            errors.append(('_total', labels, stats.errors))
+            in_flight.append(('', labels, stats.in_flight))
+
+    operation_durations, operation_errors = [], []
+    for name, stats in operations:
+        labels = {'operation': name}
+        with stats.lock:
+            operation_durations.extend(histogram_samples(stats.latency_us, labels))
+            operation_errors.append(('_total', labels, stats.errors))
+
+    return [
+        ('raven_http_request_duration_seconds', 'histogram', 'HTTP request latency by route.', durations),
+        ('raven_http_request_phase_seconds', 'histogram',
+         'Time spent in request phases (sampler, nlu, skill) by route.', phases),
+        ('raven_http_requests', 'counter', 'HTTP requests by route and status.', requests),
+        ('raven_http_request_errors', 'counter', 'HTTP 5xx responses by route.', errors),
+        ('raven_http_requests_in_flight', 'gauge', 'HTTP requests being served.', in_flight),
+        ('raven_operation_duration_seconds', 'histogram',
+         'Duration of speech recognition and synthesis operations.', operation_durations),
+        ('raven_operation_errors', 'counter', 'Failed speech operations.', operation_errors)
+    ]
+
+
+class OpenMetricsExporter:
+    """Готовый к отдаче текст /metrics, перестраивается не чаще одного раза за тик сэмплера"""
+
+    def __init__(self, sampler: Optional[SystemSampler] = None,
+                 metrics: Optional[RequestMetrics] = None):
+        self.sampler = sampler or get_system_sampler()
+        self.metrics = metrics or get_request_metrics()
+        self.collectors = []
+        self.cached_tick = None
+        self.cached_body = b''
+        self.renders = 0
+        self.lock = threading.Lock()
+
+    def add_collector(self, collector: Callable[[], List[Family]]):
+        """Дополнительный источник метрик (очереди, исполнители)"""
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self) -> bytes:
+        """Полный рендер текста и кодирование в UTF-8"""
+        snapshot = self.sampler.get_snapshot()
+        families = host_families(snapshot, self.sampler)
+        families.extend(request_families(self.metrics))
+        for collector in list(self.collectors):
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"⚠️ Ошибка сборщика метрик: {e}")
+        return render_families(families).encode('utf-8')
+
+    def get_body(self) -> bytes:
+        """Закэшированный текст текущего тика"""
+        self.sampler.start()
+        with self.lock:
+            if self.cached_tick != self.sampler.tick or not self.cached_body:
+                self.cached_body = self.render()
+                self.cached_tick = self.sampler.tick
+                self.renders += 1
+            return self.cached_body
+
+    def install(self, app):
+        """Маршрут GET /metrics"""
+        from response_layer import get_response_layer
+
+        @app.route('/metrics', methods=['GET'])
+        def openmetrics():
+            """Метрики в формате OpenMetrics (ETag на тик сэмплера)"""
+            return get_response_layer().snapshot('openmetrics', self.sampler.tick,
+                                                 self.get_body, CONTENT_TYPE)
+
+
+_default_exporter = None
+_default_lock = threading.Lock()
+
+
+def get_metrics_exporter() -> OpenMetricsExporter:
+    """Общий экспортёр метрик"""
+    global _default_exporter
+    with _default_lock:
+        if _default_exporter is None:
+            _default_exporter = OpenMetricsExporter()
+        return _default_exporter
@@ -0,0 +1,348 @@
+"""
+Словарный переводчик: таблицы фраз в компактном файле, отображаемом в память (mmap)
+"""
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b'RVPT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')  # magic, version, flags, количество записей
+OFFSET = struct.Struct('<Q')
+
+TOKEN_RE = re.compile(r'\w+|[^\w\s]+', re.UNICODE)
+SENTENCE_RE = re.compile(r'[^.!?…]+[.!?…]*\s*')
+NO_SPACE_BEFORE = set('.,!?…:;)]}»"\'')
+NO_SPACE_AFTER = set('([{«')
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_TABLES_DIR = os.path.join('data', 'translations')
+
+# Начальный словарь ru-en, из которого строится таблица при первом запуске
+BUILTIN_PHRASES = {
+    'привет': 'hello',
+    'пока': 'goodbye',
+    'спасибо': 'thank you',
+    'большое спасибо': 'thank you very much',
+    'пожалуйста': 'please',
+    'да': 'yes',
+    'нет': 'no',
+    'доброе утро': 'good morning',
+    'добрый день': 'good afternoon',
+    'добрый вечер': 'good evening',
+    'спокойной ночи': 'good night',
+    'как дела': 'how are you',
+    'я': 'I',
+    'ты': 'you',
+    'мы': 'we',
+    'это': 'this',
+    'компьютер': 'computer',
+    'память': 'memory',
+    'процессор': 'processor',
+    'открыть': 'open',
+    'закрыть': 'close',
+    'браузер': 'browser',
+    'ворон': 'raven'
+}
+
+
+def normalize_phrase(phrase: str) -> str:
+    """Ключ фразы: нижний регистр, слова через один пробел"""
+    return ' '.join(TOKEN_RE.findall(phrase.lower()))
+
+
+def build_phrase_table(pairs: Iterable[Tuple[str, str]], path: str) -> int:
+    """Запись таблицы фраз: заголовок, таблица смещений, отсортированные записи"""
+    entries = {}
+    for source, target in pairs:
+        key = normalize_phrase(source)
+        target = ' '.join(str(target).split())
+        if key and target:
+            entries[key.encode('utf-8')] = target.encode('utf-8')
+
+    # Сортировка по байтам UTF-8 совпадает с порядком сравнения при поиске
+    keys = sorted(entries)
+    offsets = []
+    position = 0
+    for key in keys:
+        offsets.append(position)
+        position += len(key) + 1 + len(entries[key])
+    offsets.append(position)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(keys)))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        for key in keys:
+            f.write(key + b'\t' + entries[key])
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+def read_tsv_pairs(path: str) -> Iterable[Tuple[str, str]]:
+    """Пары фраз из TSV файла: исходная фраза<TAB>перевод"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or '\t' not in line:
+                continue
+            source, target = line.rstrip('\n').split('\t', 1)
+            yield source, target
+
+
+class PhraseTable:
+    """Таблица фраз в mmap: бинарный поиск без загрузки словаря в объекты Python"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Неверный формат таблицы фраз: {path}")
+        self.offsets_start = HEADER.size
+        self.entries_start = self.offsets_start + (self.count + 1) * OFFSET.size
+
+    def close(self):
+        """Освобождение отображения файла"""
+        self.data.close()
+        self.file.close()
+
+    def _entry(self, index: int) -> bytes:
+        """Запись по номеру (ключ<TAB>перевод)"""
+        start, end = struct.unpack_from('<QQ', self.data, self.offsets_start + index * OFFSET.size)
+        return self.data[self.entries_start + start:self.entries_start + end]
+
+    def _key(self, index: int) -> bytes:
+        entry = self._entry(index)
+        return entry[:entry.index(b'\t')]
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Первая запись с ключом >= key"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Перевод фразы или None"""
+        encoded = key.encode('utf-8')
+        index = self._lower_bound(encoded)
+        if index < self.count:
+            entry = self._entry(index)
+            separator = entry.index(b'\t')
+            if entry[:separator] == encoded:
+                return entry[separator + 1:].decode('utf-8')
+        return None
+
+    def match_prefix(self, words: List[str]) -> Tuple[int, Optional[str]]:
+        """Самое длинное совпадение фразы с началом последовательности слов.
+
+        Отсортированные ключи работают как trie по словам: продолжение фразы
+        ищется, только пока существует ключ с таким префиксом.
+        """
+        best_length, best_translation = 0, None
+        prefix = b''
+        for length, word in enumerate(words, 1):
+            prefix = prefix + b' ' + word.encode('utf-8') if prefix else word.encode('utf-8')
+            index = self._lower_bound(prefix)
+            if index >= self.count:
+                break
+            entry = self._entry(index)
+            separator = entry.index(b'\t')
+            key = entry[:separator]
+            if key == prefix:
+                best_length = length
+                best_translation = entry[separator + 1:].decode('utf-8')
+                # Более длинная фраза будет следующей записью, если она есть
+                if index + 1 >= self.count or not self._key(index + 1).startswith(prefix + b' '):
+                    break
+            elif not key.startswith(prefix + b' '):
+                break
+        return best_length, best_translation
+
+
+def join_tokens(tokens: List[str]) -> str:
+    """Склейка токенов с пробелами, без пробела перед знаками препинания"""
+    parts = []
+    for token in tokens:
+        if parts and token[0] not in NO_SPACE_BEFORE and parts[-1][-1] not in NO_SPACE_AFTER:
+            parts.append(' ')
+        parts.append(token)
+    return ''.join(parts)
+
+
+class Translator:
+    """Перевод по таблицам фраз с LRU кэшем переведённых предложений"""
+
+    def __init__(self, tables_dir: str = DEFAULT_TABLES_DIR,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.tables_dir = tables_dir
+        self.cache_size = cache_size
+        self.tables = {}
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def table_path(self, source_lang: str, target_lang: str) -> str:
+        """Путь к файлу таблицы для пары языков"""
+        return os.path.join(self.tables_dir, f"{source_lang}-{target_lang}.rpt")
+
+    def get_table(self, source_lang: str, target_lang: str) -> Optional[PhraseTable]:
+        """Открытая таблица пары языков (переоткрывается при изменении файла)"""
+        path = self.table_path(source_lang, target_lang)
+        with self.lock:
+            if not os.path.exists(path) and (source_lang, target_lang) == ('ru', 'en'):
+                build_phrase_table(BUILTIN_PHRASES.items(), path)
+                print(f"📖 Создана таблица фраз {path}")
+            if not os.path.exists(path):
+                return None
+
+            table = self.tables.get(path)
+            if table is not None and table.mtime != os.path.getmtime(path):
+                # Старое отображение закроется сборщиком, когда его отпустят запросы
+                self._drop_cached_pair(source_lang, target_lang)
+                table = None
+            if table is None:
+                table = self.tables[path] = PhraseTable(path)
+            return table
+
+    def _drop_cached_pair(self, source_lang: str, target_lang: str):
+        """Сброс кэша предложений пары языков (вызывать под lock)"""
+        for key in [key for key in self.cache if key[0] == source_lang and key[1] == target_lang]:
+            del self.cache[key]
+
+    def _cache_get(self, key) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            value = self.cache.get(key)
+            if value is None:
+                self.cache_misses += 1
+                return None
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return value
+
+    def _cache_put(self, key, value: Dict[str, Any]):
+        with self.lock:
+            self.cache[key] = value
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def translate_sentence(self, table: PhraseTable, sentence: str) -> Dict[str, Any]:
+        """Перевод предложения жадным поиском самой длинной фразы"""
+        tokens = TOKEN_RE.findall(sentence)
+        words = [token.lower() for token in tokens]
+        output = []
+        matched = 0
+        unknown = []
+        position = 0
+        while position < len(tokens):
+            if not words[position][0].isalnum() and words[position][0] != '_':
+                output.append(tokens[position])
+                position += 1
+                continue
+            length, translation = table.match_prefix(words[position:])
+            if length:
+                output.append(translation)
+                matched += 1
+                position += length
+            else:
+                output.append(tokens[position])
+                unknown.append(tokens[position])
+                position += 1
+        return {'translation': join_tokens(output), 'matched_phrases': matched,
+                'unknown_words': unknown}
+
+    def translate(self, text: str, target_lang: str = 'en',
+                  source_lang: str = 'ru') -> Dict[str, Any]:
+        """Перевод текста по предложениям с использованием кэша"""
+        table = self.get_table(source_lang, target_lang)
+        if table is None:
+            raise ValueError(f"Нет таблицы фраз для {source_lang}-{target_lang}")
+
+        sentences = []
+        matched = 0
+        unknown = []
+        cached = 0
+        for sentence in SENTENCE_RE.findall(text):
+            key = (source_lang, target_lang, sentence.strip())
+            if not key[2]:
+                continue
+            result = self._cache_get(key)
+            if result is None:
+                result = self.translate_sentence(table, key[2])
+                self._cache_put(key, result)
+            else:
+                cached += 1
+            sentences.append(result['translation'])
+            matched += result['matched_phrases']
+            unknown.extend(result['unknown_words'])
+
+        return {
+            'translation': ' '.join(sentences),
+            'matched_phrases': matched,
+            'unknown_words': unknown,
+            'cached_sentences': cached,
+            'sentence_count': len(sentences)
+        }
+
+    def trim(self, budget: Optional[int]) -> int:
+        """Вытеснение давно не использованных предложений сверх budget"""
+        with self.lock:
+            removed = 0
+            while budget is not None and len(self.cache) > budget:
+                self.cache.popitem(last=False)
+                removed += 1
+            return removed
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'entries': len(self.cache), 'capacity': self.cache_size}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика таблиц и кэша"""
+        with self.lock:
+            return {
+                'tables': {os.path.basename(path): table.count for path, table in self.tables.items()},
+                'cache_size': len(self.cache),
+                'cache_capacity': self.cache_size,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses
+            }
+
+
+_default_translator = None
+_default_lock = threading.Lock()
+
+
+def get_translator() -> Translator:
+    """Общий переводчик для всех API модулей"""
+    global _default_translator
+    with _default_lock:
+        if _default_translator is None:
+            _default_translator = Translator()
+        return _default_translator
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Использование: python phrase_table.py <словарь.tsv> <таблица.rpt>")
+        sys.exit(1)
+    count = build_phrase_table(read_tsv_pairs(sys.argv[1]), sys.argv[2])
+    print(f"✅ Записано фраз: {count} -> {sys.argv[2]}")
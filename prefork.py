@@ -0,0 +1,160 @@
+"""
+Несколько процессов-обработчиков на одном порту: главный процесс держит слушающий сокет
+и сэмплер, обработчики читают метрики из общей памяти (shared_metrics.py), контексты
+и задачи навыков - из общего SQLite (shared_state.py)
+"""
+import importlib
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from shared_metrics import SharedSnapshotWriter
+from shared_state import SHARED_STATE_ENV
+from system_sampler import SystemSampler
+
+DEFAULT_WORKERS = int(os.environ.get('RAVEN_WORKERS', 1))
+SHARED_METRICS_ENV = 'RAVEN_SHARED_METRICS'
+WORKER_ID_ENV = 'RAVEN_WORKER_ID'
+MONITOR_INTERVAL = 1.0
+RESTART_BACKOFF = 5.0  # обработчик, упавший быстрее, перезапускается с паузой
+
+
+def load_app_module(module_name: str):
+    """Модуль приложения в обработчике: при spawn главный скрипт уже загружен как __mp_main__"""
+    main = sys.modules.get('__mp_main__')
+    main_file = getattr(main, '__file__', None) or ''
+    if os.path.splitext(os.path.basename(main_file))[0] == module_name:
+        return main
+    return importlib.import_module(module_name)
+
+
+def worker_main(listener: socket.socket, module_name: str, index: int, server_mode: str):
+    """Процесс-обработчик: запуск сервисов приложения и приём соединений с общего сокета"""
+    os.environ[WORKER_ID_ENV] = str(index)
+    module = load_app_module(module_name)
+    start_services = getattr(module, 'start_services', None)
+    if start_services is not None:
+        start_services()
+    host, port = listener.getsockname()[:2]
+    print(f"👷 Обработчик {index} (PID {os.getpid()}) принимает соединения {host}:{port}")
+    try:
+        if server_mode == 'async':
+            from asgi_server import serve
+            serve(module.app, host=host, port=port, sock=listener)
+        else:
+            from werkzeug.serving import make_server
+            server = make_server(host, port, module.app, threaded=True, fd=listener.fileno())
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+class PreforkMaster:
+    """Главный процесс: сокет, сэмплер с публикацией в общую память, надзор за обработчиками"""
+
+    def __init__(self, module_name: str, host: str, port: int, workers: int, server_mode: str):
+        self.module_name = module_name
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.server_mode = server_mode
+        self.context = multiprocessing.get_context('spawn')
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.started_at: Dict[int, float] = {}
+        self.restarts = 0
+        self.listener = None
+        self.writer = None
+        self.sampler = None
+        self.state_path = None
+
+    def setup(self):
+        """Сокет, сегмент общей памяти и файл состояния - до запуска обработчиков"""
+        self.listener = socket.create_server((self.host, self.port), backlog=1024)
+        self.listener.set_inheritable(True)
+
+        self.writer = SharedSnapshotWriter()
+        self.state_path = os.path.join(tempfile.gettempdir(),
+                                       f'raven-shared-{os.getpid()}.db')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.state_path + suffix):
+                os.remove(self.state_path + suffix)
+        # Обработчики наследуют окружение при запуске
+        os.environ[SHARED_METRICS_ENV] = self.writer.name
+        os.environ[SHARED_STATE_ENV] = self.state_path
+
+        self.sampler = SystemSampler()
+        # Клиенты читают снимок в обработчиках: их чтения - спрос для интервала сэмплера
+        self.sampler.cadence.add_demand_source(self.writer.last_demand)
+        self.sampler.subscribe(
+            lambda snapshot: self.writer.publish(snapshot, self.sampler.tick, self.sampler.sample_ms)
+        )
+        self.sampler.refresh()
+
+    def spawn(self, index: int):
+        process = self.context.Process(
+            target=worker_main,
+            args=(self.listener, self.module_name, index, self.server_mode),
+            name=f'raven-worker-{index}'
+        )
+        process.start()
+        self.processes[index] = process
+        self.started_at[index] = time.time()
+        self.sampler.track(process.pid)
+
+    def monitor(self):
+        """Перезапуск завершившихся обработчиков"""
+        while True:
+            time.sleep(MONITOR_INTERVAL)
+            for index, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+                lived = time.time() - self.started_at[index]
+                print(f"⚠️ Обработчик {index} (PID {process.pid}) завершился с кодом "
+                      f"{process.exitcode}, перезапуск")
+                if lived < RESTART_BACKOFF:
+                    time.sleep(RESTART_BACKOFF - lived)
+                self.restarts += 1
+                self.spawn(index)
+
+    def shutdown(self):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join(timeout=5)
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self.writer is not None:
+            self.writer.close()
+        if self.listener is not None:
+            self.listener.close()
+        if self.state_path:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.state_path + suffix):
+                    os.remove(self.state_path + suffix)
+
+    def run(self):
+        self.setup()
+        print(f"🧵 Prefork: {self.workers} обработчиков на {self.host}:{self.port} "
+              f"(режим {self.server_mode}), метрики в общей памяти {self.writer.name}")
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            for index in range(self.workers):
+                self.spawn(index)
+            self.sampler.start()
+            self.monitor()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.shutdown()
+
+
+def serve_prefork(module_name: str, host: str = '127.0.0.1', port: int = 5000,
+                  workers: int = DEFAULT_WORKERS, server_mode: str = 'threaded'):
+    """Запуск обработчиков приложения module_name (модуль с app и start_services)"""
+    PreforkMaster(module_name, host, port, workers, server_mode).run()
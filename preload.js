@@ -1,11 +1,31 @@
 const { contextBridge, ipcRenderer } = require('electron');
 
 // Безопасно экспортируем API
-contextBridge.exposeInMainWorld('electronAPI', {
+const electronAPI = {
     // Управление окном
     minimize: () => ipcRenderer.send('minimize-window'),
     maximize: () => ipcRenderer.send('maximize-window'),
     close: () => ipcRenderer.send('close-window'),
+    minimizeWindow: () => ipcRenderer.send('minimize-window'),
+    maximizeWindow: () => ipcRenderer.send('maximize-window'),
+    closeWindow: () => ipcRenderer.send('close-window'),
+    
+    // Python backend через IPC главного процесса (транспорт stdio / unix)
+    backendTransport: () => ipcRenderer.invoke('backend:transport'),
+    backendRequest: (method, path, body = null) => {
+        return ipcRenderer.invoke('backend:request', { method, path, body });
+    },
+    backendStream: (method, path, body, onChunk) => {
+        const streamId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        const listener = (event, message) => {
+            if (message.streamId === streamId) {
+                onChunk(message.chunk);
+            }
+        };
+        ipcRenderer.on('backend:stream-chunk', listener);
+        return ipcRenderer.invoke('backend:stream', { streamId, method, path, body })
+            .finally(() => ipcRenderer.removeListener('backend:stream-chunk', listener));
+    },
     
     // Взаимодействие с Python
     sendToPython: (channel, data) => {
@@ -39,7 +59,13 @@ contextBridge.exposeInMainWorld('electronAPI', {
     executeSystemAction: (action, params) => {
         return ipcRenderer.invoke('system:action', { action, params });
     }
-});
+};
+
+if (process.contextIsolated) {
+    contextBridge.exposeInMainWorld('electronAPI', electronAPI);
+} else {
+    window.electronAPI = electronAPI;
+}
 
 // Защита от инъекций
 process.once('loaded', () => {
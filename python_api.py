@@ -6,48 +6,156 @@ import os
 import json
 from datetime import datetime
 
+# Транспорт: http - порт 5000; stdio - кадры IPC на stdin/stdout дочернего процесса
+# Electron; unix - кадры IPC на Unix сокете RAVEN_SOCKET (ipc_transport.py)
+TRANSPORT = os.environ.get('RAVEN_TRANSPORT', 'http')
+if TRANSPORT == 'stdio' and __name__ == '__main__':
+    # stdout занимается до любых print, иначе вывод смешается с кадрами
+    from ipc_transport import claim_stdout
+    IPC_FRAMES = claim_stdout()
+
 # Добавляем пути для импорта модулей
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-import psutil
+# Профиль запуска (RAVEN_PROFILE=headless - без аудио, GUI и torch):
+# запрет импортов ставится до загрузки остальных модулей
+from runtime_profile import (PROFILE, apply_profile, format_profile_report,
+                             get_profile_report, subsystem_enabled)
+
+apply_profile()
+
+from warmup import WarmupManager
+
+warmup = WarmupManager()
+
+with warmup.timing('flask'):
+    from flask import Flask, jsonify, request
+    from flask_cors import CORS
+with warmup.timing('psutil'):
+    import psutil
 import platform
 
+from admission import get_admission_controller
+from asgi_server import ASGIAdapter
+from memory_diagnostics import get_memory_diagnostics
+from openmetrics import get_metrics_exporter
+from request_metrics import get_request_metrics, phase
+from response_layer import get_response_layer
+from sampling_profiler import get_sampling_profiler
+from singleflight import get_single_flight, make_key
+from skill_executor import get_skill_executor
+from streaming import sse_response
+from system_sampler import get_system_sampler
+
 app = Flask(__name__)
 CORS(app)
+get_request_metrics().install(app)
+get_admission_controller().install(app)
+get_response_layer().install(app)
+get_metrics_exporter().install(app)
+get_sampling_profiler().install(app)
+get_memory_diagnostics().install(app)
 
-# Переменные для хранения экземпляров
-raven_ai = None
-neural_core = None
+# ASGI точка входа для внешних серверов: uvicorn python_api:asgi_app
+asgi_app = ASGIAdapter(app)
 
-def initialize_ai_modules():
-    """Инициализация модулей ИИ"""
-    global raven_ai, neural_core
+# Режим запуска: lazy - порт открывается сразу, модули грузятся в фоне;
+# eager - все модули загружаются до старта сервера
+STARTUP_MODE = os.environ.get('RAVEN_STARTUP', 'lazy')
+
+# Режим сервера: threaded - Werkzeug, поток на соединение;
+# async - asyncio сервер, обработчики в пуле потоков (asgi_server.py)
+SERVER_MODE = os.environ.get('RAVEN_SERVER', 'threaded')
+
+# Процессы-обработчики HTTP (prefork.py): порт и сэмплер в главном процессе,
+# метрики и состояние навыков общие для всех обработчиков
+WORKERS = int(os.environ.get('RAVEN_WORKERS', 1)) if TRANSPORT == 'http' else 1
+
+def load_raven_ai():
+    """Инициализация Raven AI (TTS и микрофон, если не отключены профилем)"""
+    from core.raven_ai import RavenAI
     
-    try:
-        # Ленивая загрузка модулей
-        from core.raven_ai import RavenAI
-        from core.neural_core import NeuralCore
-        
-        print("Инициализация Raven AI...")
-        raven_ai = RavenAI()
-        
-        print("Инициализация Neural Core...")
-        neural_core = NeuralCore()
-        
-        print("✅ AI модули инициализированы")
-        return True
-        
-    except ImportError as e:
-        print(f"⚠️ Не удалось загрузить AI модули: {e}")
-        return False
-    except Exception as e:
-        print(f"❌ Ошибка инициализации: {e}")
-        return False
+    print("Инициализация Raven AI...")
+    raven = RavenAI(lazy=True, voice=VOICE_ENABLED)
+    raven.warm_up()
+    return raven
+
+def load_neural_core():
+    """Инициализация Neural Core без загрузки модели"""
+    from core.neural_core import NeuralCore
+    
+    print("Инициализация Neural Core...")
+    return NeuralCore(lazy=True)
+
+def load_neural_model():
+    """Загрузка нейросетевой модели Neural Core (torch)"""
+    core = warmup.get('neural_core')
+    core.warm_up()
+    return True
+
+# Голос нужен Raven AI, только если профиль не отключил ни ввод, ни вывод
+VOICE_ENABLED = subsystem_enabled('voice_input') and subsystem_enabled('voice_output')
+
+# Компоненты загружаются при первом обращении или фоновым прогревом
+warmup.register('speech_recognition', lambda: warmup.timed_import('speech_recognition'))
+warmup.register('pyttsx3', lambda: warmup.timed_import('pyttsx3'))
+warmup.register('torch', lambda: warmup.timed_import('torch'))
+warmup.register('vosk', lambda: warmup.timed_import('vosk'))
+warmup.register('neural_core', load_neural_core)
+warmup.register('raven_ai', load_raven_ai,
+                depends=['speech_recognition', 'pyttsx3'] if VOICE_ENABLED else [])
+warmup.register('neural_model', load_neural_model, depends=['neural_core', 'torch'])
+
+# Порядок фонового прогрева: сначала то, что нужно для ответов
+WARMUP_ORDER = ['neural_core', 'raven_ai']
+if subsystem_enabled('neural_model'):
+    WARMUP_ORDER.append('neural_model')
+else:
+    warmup.disable('torch', 'Отключено профилем headless')
+    warmup.disable('neural_model', 'Отключено профилем headless')
+if not VOICE_ENABLED:
+    warmup.disable('speech_recognition', 'Отключено профилем headless')
+    warmup.disable('pyttsx3', 'Отключено профилем headless')
+if not subsystem_enabled('offline_stt'):
+    warmup.disable('vosk', 'Отключено профилем headless')
+elif os.path.exists(os.path.join('models', 'vosk-model-small-ru-0.22')):
+    WARMUP_ORDER.append('vosk')
+else:
+    warmup.disable('vosk', 'Модель Vosk не найдена')
+
+def get_raven_ai():
+    """Экземпляр Raven AI (загружается при первом использовании)"""
+    return warmup.get('raven_ai')
 
-# Проверяем инициализацию при запуске
-ai_initialized = initialize_ai_modules()
+def get_neural_core():
+    """Экземпляр Neural Core (загружается при первом использовании)"""
+    return warmup.get('neural_core')
+
+def ai_initialized():
+    """Доступен ли хотя бы один AI модуль"""
+    return warmup.is_ready('raven_ai') or warmup.is_ready('neural_core')
+
+def collect_backend_metrics():
+    """Метрики исполнителя навыков и объединения запросов для /metrics"""
+    executor = get_skill_executor().get_stats()
+    jobs = [('', {'status': status}, count) for status, count in sorted(executor['jobs'].items())]
+    coalescing = get_single_flight().get_stats()
+    coalesced = []
+    for route, stats in sorted(coalescing['routes'].items()):
+        coalesced.append(('_total', {'route': route}, stats['coalesced']))
+    return [
+        ('raven_skill_queue_depth', 'gauge', 'Skills waiting for an executor slot.',
+         [('', {}, executor['pending'])]),
+        ('raven_skill_jobs', 'gauge', 'Tracked skill jobs by status.', jobs),
+        ('raven_coalesced_requests', 'counter', 'Requests served by an identical in-flight call.',
+         coalesced)
+    ]
+
+get_metrics_exporter().add_collector(collect_backend_metrics)
+
+def print_import_report():
+    """Вывод отчёта о времени импорта и прогрева"""
+    print(warmup.format_import_report())
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -57,10 +165,26 @@ def health_check():
         'service': 'Raven AI Backend',
         'version': '2.2.0',
         'python_version': platform.python_version(),
-        'ai_initialized': ai_initialized,
+        'ai_initialized': ai_initialized(),
+        'startup_mode': STARTUP_MODE,
+        'profile': PROFILE,
+        'worker': {'id': os.environ.get('RAVEN_WORKER_ID'), 'pid': os.getpid()},
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Готовность компонентов (503 пока идёт прогрев)"""
+    ready = warmup.all_settled()
+    report = warmup.report()
+    report.update({
+        'ready': ready,
+        'startup_mode': STARTUP_MODE,
+        'profile': get_profile_report(),
+        'timestamp': datetime.now().isoformat()
+    })
+    return jsonify(report), 200 if ready else 503
+
 @app.route('/api/command', methods=['POST'])
 def process_command():
     """Обработка команды через ИИ"""
@@ -72,13 +196,19 @@ def process_command():
     
     try:
         response = ""
+        job_id = None
+        raven_ai = get_raven_ai()
+        neural_core = get_neural_core() if not raven_ai else None
         
         # Используем Raven AI если доступен
         if raven_ai:
-            response = raven_ai.process_command(command)
+            with phase('skill'):
+                response = raven_ai.process_command(command)
+            job_id = raven_ai.get_last_job_id()
         elif neural_core:
             result = neural_core.process_query(command)
             response = result.get('response', 'Команда обработана')
+            job_id = result.get('job_id')
         else:
             response = f"Получена команда: {command}"
         
@@ -86,6 +216,7 @@ def process_command():
             'success': True,
             'response': response,
             'command': command,
+            'job_id': job_id,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -102,13 +233,15 @@ def ai_chat():
     data = request.json
     message = data.get('message', '').strip()
     context = data.get('context', [])
+    session_id = data.get('session_id') or request.headers.get('X-Session-ID')
     
     if not message:
         return jsonify({'error': 'No message provided'}), 400
     
     try:
+        neural_core = get_neural_core()
         if neural_core:
-            result = neural_core.process_query(message, context)
+            result = neural_core.process_query(message, context, session_id)
             return jsonify(result)
         else:
             return jsonify({
@@ -123,83 +256,183 @@ def ai_chat():
             'response': 'Произошла ошибка при обработке запроса'
         }), 500
 
+@app.route('/api/ai/chat/stream', methods=['POST'])
+def ai_chat_stream():
+    """Потоковый чат с ИИ (Server-Sent Events)"""
+    data = request.json
+    message = data.get('message', '').strip()
+    context = data.get('context', [])
+    session_id = data.get('session_id') or request.headers.get('X-Session-ID')
+    
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    def events():
+        yield 'accepted', {'message': message, 'session_id': session_id}
+        neural_core = get_neural_core()
+        if neural_core:
+            yield from neural_core.process_query_stream(message, context, session_id)
+            return
+        
+        response = 'ИИ модуль не доступен. Это демо-ответ.'
+        yield 'chunk', {'text': response}
+        yield 'done', {
+            'response': response,
+            'intent': 'unknown',
+            'emotion': 'neutral',
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    return sse_response(events())
+
+@app.route('/api/knowledge/search', methods=['GET'])
+def knowledge_search():
+    """Поиск по базе знаний"""
+    neural_core = get_neural_core()
+    if not neural_core:
+        return jsonify({'error': 'Neural Core не доступен'}), 503
+    
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    
+    limit = request.args.get('limit', default=5, type=int)
+    return jsonify({
+        'query': query,
+        'results': neural_core.knowledge_base.search(query, top_k=limit),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/knowledge/reindex', methods=['POST'])
+def knowledge_reindex():
+    """Инкрементальная переиндексация базы знаний"""
+    neural_core = get_neural_core()
+    if not neural_core:
+        return jsonify({'error': 'Neural Core не доступен'}), 503
+    
+    kb = neural_core.knowledge_base
+    changes = kb.refresh()
+    if changes['files_changed']:
+        kb.save_index()
+    return jsonify({
+        'success': True,
+        'changes': changes,
+        'stats': kb.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/skills/jobs/<job_id>', methods=['GET'])
+def get_skill_job(job_id):
+    """Состояние фоновой задачи навыка"""
+    job = get_skill_executor().get_job(job_id)
+    if not job:
+        return jsonify({'error': f'Задача {job_id} не найдена'}), 404
+    return jsonify(job)
+
+@app.route('/api/skills/status', methods=['GET'])
+def get_skills_status():
+    """Статистика исполнителя навыков"""
+    return jsonify({
+        'executor': get_skill_executor().get_stats(),
+        'coalescing': get_single_flight().get_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/system/metrics', methods=['GET'])
 def get_system_metrics():
-    """Получение метрик системы"""
+    """Получение метрик системы (последний снимок фонового сэмплера, ETag на снимок)"""
     try:
-        cpu_percent = psutil.cpu_percent(interval=0.5)
-        ram = psutil.virtual_memory()
-        disk = psutil.disk_usage('C:/' if platform.system() == 'Windows' else '/')
-        
-        return jsonify({
-            'cpu': {
-                'percent': cpu_percent,
-                'cores': psutil.cpu_count(),
-                'frequency': psutil.cpu_freq().current if hasattr(psutil.cpu_freq(), 'current') else None
-            },
-            'ram': {
-                'percent': ram.percent,
-                'total_gb': round(ram.total / (1024**3), 2),
-                'used_gb': round(ram.used / (1024**3), 2),
-                'free_gb': round(ram.free / (1024**3), 2)
-            },
-            'disk': {
-                'percent': disk.percent,
-                'total_gb': round(disk.total / (1024**3), 2),
-                'used_gb': round(disk.used / (1024**3), 2),
-                'free_gb': round(disk.free / (1024**3), 2)
-            },
-            'processes': len(psutil.pids()),
-            'network': {
-                'bytes_sent': psutil.net_io_counters().bytes_sent,
-                'bytes_recv': psutil.net_io_counters().bytes_recv
-            },
-            'timestamp': datetime.now().isoformat()
-        })
+        with phase('sampler'):
+            snapshot = get_system_sampler().get_snapshot()
+        return get_response_layer().snapshot('system_metrics', snapshot['sampled_at'],
+                                             lambda: format_system_metrics(snapshot))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def format_system_metrics(snapshot):
+    """Метрики для дашборда: объёмы в гигабайтах"""
+    ram = snapshot['ram']
+    disk = snapshot['disk']
+    return {
+        'cpu': snapshot['cpu'],
+        'ram': {
+            'percent': ram['percent'],
+            'total_gb': round(ram['total'] / (1024**3), 2),
+            'used_gb': round(ram['used'] / (1024**3), 2),
+            'free_gb': round(ram['free'] / (1024**3), 2)
+        },
+        'disk': {
+            'percent': disk['percent'],
+            'total_gb': round(disk['total'] / (1024**3), 2),
+            'used_gb': round(disk['used'] / (1024**3), 2),
+            'free_gb': round(disk['free'] / (1024**3), 2)
+        },
+        'processes': snapshot['processes'],
+        'network': snapshot['network'],
+        'cadence': snapshot.get('cadence'),
+        'timestamp': snapshot['timestamp']
+    }
+
+@app.route('/api/system/cadence', methods=['GET'])
+def get_sampler_cadence():
+    """Режим и интервал сэмплера (чтение не считается спросом)"""
+    return jsonify(get_system_sampler().get_stats())
+
 @app.route('/api/system/processes', methods=['GET'])
 def get_system_processes():
-    """Получение списка процессов"""
+    """Получение списка процессов (обновляется не чаще одного раза за тик сэмплера)"""
     try:
         limit = request.args.get('limit', default=20, type=int)
         sort_by = request.args.get('sort_by', default='cpu')
         
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
-            try:
-                info = proc.info
-                processes.append({
-                    'pid': info['pid'],
-                    'name': info['name'][:50],  # Ограничиваем длину имени
-                    'cpu': round(info['cpu_percent'] or 0, 2),
-                    'memory': round(info['memory_percent'] or 0, 2),
-                    'status': info['status'],
-                    'memory_bytes': proc.memory_info().rss if hasattr(proc, 'memory_info') else 0
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-            
-            if len(processes) >= limit:
-                break
-        
-        # Сортировка
-        if sort_by == 'cpu':
-            processes.sort(key=lambda x: x['cpu'], reverse=True)
-        elif sort_by == 'memory':
-            processes.sort(key=lambda x: x['memory'], reverse=True)
-        elif sort_by == 'name':
-            processes.sort(key=lambda x: x['name'].lower())
-        
-        return jsonify({
-            'processes': processes,
-            'total': len(processes),
-            'timestamp': datetime.now().isoformat()
-        })
+        # Одинаковые одновременные запросы ждут один обход процессов;
+        # в пределах тика отдаётся готовое тело или 304 по ETag
+        with phase('sampler'):
+            version = get_system_sampler().get_snapshot()['sampled_at']
+            return get_response_layer().snapshot(
+                f'processes:{limit}:{sort_by}', version,
+                lambda: get_single_flight().do(
+                    make_key('processes', {'limit': limit, 'sort_by': sort_by}),
+                    lambda: collect_processes(limit, sort_by)
+                )[0]
+            )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def collect_processes(limit, sort_by):
+    """Сбор списка процессов с сортировкой"""
+    processes = []
+    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
+        try:
+            info = proc.info
+            processes.append({
+                'pid': info['pid'],
+                'name': info['name'][:50],  # Ограничиваем длину имени
+                'cpu': round(info['cpu_percent'] or 0, 2),
+                'memory': round(info['memory_percent'] or 0, 2),
+                'status': info['status'],
+                'memory_bytes': proc.memory_info().rss if hasattr(proc, 'memory_info') else 0
+            })
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+        
+        if len(processes) >= limit:
+            break
+    
+    # Сортировка
+    if sort_by == 'cpu':
+        processes.sort(key=lambda x: x['cpu'], reverse=True)
+    elif sort_by == 'memory':
+        processes.sort(key=lambda x: x['memory'], reverse=True)
+    elif sort_by == 'name':
+        processes.sort(key=lambda x: x['name'].lower())
+    
+    return {
+        'processes': processes,
+        'total': len(processes),
+        'timestamp': datetime.now().isoformat()
+    }
+
 @app.route('/api/system/actions', methods=['POST'])
 def system_actions():
     """Системные действия"""
@@ -234,10 +467,15 @@ def system_actions():
         }), 400
 
 def clean_ram(params):
-    """Очистка RAM"""
-    import gc
-    gc.collect()
-    return {'message': 'RAM очищена', 'details': 'Garbage collector запущен'}
+    """Урезание внутренних кэшей бэкенда до бюджетов и сборка мусора"""
+    result = get_memory_diagnostics().trim(params.get('budgets'))
+    removed = sum(count for count in result['removed'].values() if isinstance(count, int))
+    freed_mb = result['freed_bytes'] / (1024 ** 2)
+    return {
+        'message': f'Память бэкенда: освобождено {freed_mb:.1f} МБ',
+        'details': f"Удалено записей кэшей: {removed}, собрано объектов: {result['gc_collected']}",
+        'trim': result
+    }
 
 def get_system_info(params):
     """Получение информации о системе"""
@@ -269,6 +507,18 @@ def kill_process(params):
     except psutil.AccessDenied:
         raise ValueError(f'Нет прав для завершения процесса {pid}')
 
+def start_services():
+    """Сэмплер и загрузка AI модулей (в каждом обработчике prefork отдельно)"""
+    get_system_sampler().start()
+    if STARTUP_MODE == 'eager':
+        warmup.warm_up(WARMUP_ORDER)
+        print(f"AI модули: {'✅ Инициализированы' if ai_initialized() else '⚠️ Не доступны'}")
+        print_import_report()
+    else:
+        # Порт открывается сразу, тяжёлые модули грузятся в фоне
+        print("AI модули: ⏳ Загружаются в фоне (GET /api/ready)")
+        warmup.start_background(WARMUP_ORDER, on_done=print_import_report)
+
 if __name__ == '__main__':
     # Настройка кодировки для Windows
     if sys.platform == "win32":
@@ -279,20 +529,51 @@ if __name__ == '__main__':
     print("=" * 60)
     print("Raven AI Karasu - Расширенный Backend API")
     print("=" * 60)
-    print(f"AI модули: {'✅ Инициализированы' if ai_initialized else '⚠️ Не доступны'}")
-    print("📡 Сервер доступен по адресу: http://localhost:5000")
+    print(format_profile_report())
+    if WORKERS == 1:
+        start_services()
+    if TRANSPORT == 'http':
+        print(f"📡 Сервер доступен по адресу: http://localhost:5000 (режим {SERVER_MODE}, "
+              f"обработчиков: {WORKERS})")
+    else:
+        print(f"📡 Сервер доступен через IPC ({TRANSPORT}), TCP порт не открывается")
     print("\n🔗 API Endpoints:")
     print("   GET  /api/health             - Проверка состояния")
+    print("   GET  /api/ready              - Готовность AI модулей")
     print("   POST /api/command            - Обработка команды")
     print("   POST /api/ai/chat            - Чат с ИИ")
+    print("   POST /api/ai/chat/stream     - Потоковый чат (SSE)")
+    print("   GET  /api/skills/jobs/<id>   - Статус задачи навыка")
     print("   GET  /api/system/metrics     - Метрики системы")
+    print("   GET  /api/system/cadence     - Интервал сэмплера")
     print("   GET  /api/system/processes   - Список процессов")
     print("   POST /api/system/actions     - Системные действия")
+    print("   GET  /api/debug/stats        - Задержки и ошибки по маршрутам")
+    print("   GET  /api/debug/admission    - Нагрузка и отказы в допуске")
+    print("   GET  /api/debug/profile      - Профиль потоков (?seconds=30&format=speedscope)")
+    print("   GET  /api/debug/memory       - Память процесса и размеры кэшей")
+    print("   POST /api/debug/memory/snapshot - Рост выделений памяти (tracemalloc)")
+    print("   POST /api/debug/memory/trim  - Урезание кэшей до бюджетов")
+    print("   GET  /metrics                - Метрики OpenMetrics (Prometheus)")
     print("=" * 60)
     
-    app.run(
-        host='127.0.0.1',
-        port=5000,
-        debug=False,
-        threaded=True
-    )
\ No newline at end of file
+    if TRANSPORT == 'stdio':
+        from ipc_transport import serve_stdio
+        serve_stdio(app, IPC_FRAMES)
+    elif TRANSPORT == 'unix':
+        from ipc_transport import serve_unix
+        serve_unix(app)
+    elif WORKERS > 1:
+        from prefork import serve_prefork
+        serve_prefork('python_api', host='127.0.0.1', port=5000, workers=WORKERS,
+                      server_mode=SERVER_MODE)
+    elif SERVER_MODE == 'async':
+        from asgi_server import serve
+        serve(app, host='127.0.0.1', port=5000)
+    else:
+        app.run(
+            host='127.0.0.1',
+            port=5000,
+            debug=False,
+            threaded=True
+        )
\ No newline at end of file
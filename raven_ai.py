@@ -1,11 +1,8 @@
 """
 Ядро Raven AI с ИИ и голосовыми функциями
 """
-import speech_recognition as sr
-import pyttsx3
 import psutil
 import webbrowser
-import subprocess
 import platform
 from datetime import datetime
 import threading
@@ -13,22 +10,33 @@ import json
 import os
 import time
 
+from request_metrics import timed_operation
+from skill_executor import get_skill_executor
+
+
+def import_speech_recognition():
+    """Ленивый импорт speech_recognition (тянет PyAudio)"""
+    import speech_recognition
+    return speech_recognition
+
+
 class RavenAI:
     """Ядро ИИ ассистента"""
     
-    def __init__(self):
+    def __init__(self, lazy=False, voice=True):
         print("🧠 Инициализация Raven AI...")
         
-        # Инициализация голосового движка
-        self.tts_engine = pyttsx3.init()
-        self.setup_tts()
+        # voice=False (профиль headless): без pyttsx3 и микрофона, команды только текстом
+        self.voice_enabled = voice
         
-        # Инициализация распознавания речи
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        # Голосовой движок и микрофон создаются при первом использовании
+        self._tts_engine = None
+        self._recognizer = None
+        self._microphone = None
+        self._audio_init_lock = threading.RLock()
         
         # Состояние системы
-        self.is_voice_active = True
+        self.is_voice_active = voice
         self.is_listening = False
         
         # История команд
@@ -37,8 +45,51 @@ class RavenAI:
         # Загрузка навыков
         self.skills = self.load_skills()
         
+        # Исполнитель навыков с побочными эффектами
+        self.executor = get_skill_executor()
+        self._local = threading.local()
+        
+        if not lazy:
+            self.warm_up()
+        
         print("✅ Raven AI готов к работе")
     
+    def warm_up(self):
+        """Инициализация TTS и микрофона"""
+        if not self.voice_enabled:
+            return
+        self.tts_engine
+        self.microphone
+    
+    @property
+    def tts_engine(self):
+        """Голосовой движок pyttsx3 (ленивая инициализация)"""
+        if self._tts_engine is None:
+            with self._audio_init_lock:
+                if self._tts_engine is None:
+                    import pyttsx3
+                    self._tts_engine = pyttsx3.init()
+                    self.setup_tts()
+        return self._tts_engine
+    
+    @property
+    def recognizer(self):
+        """Распознаватель речи (ленивая инициализация)"""
+        if self._recognizer is None:
+            with self._audio_init_lock:
+                if self._recognizer is None:
+                    self._recognizer = import_speech_recognition().Recognizer()
+        return self._recognizer
+    
+    @property
+    def microphone(self):
+        """Микрофон (ленивая инициализация)"""
+        if self._microphone is None:
+            with self._audio_init_lock:
+                if self._microphone is None:
+                    self._microphone = import_speech_recognition().Microphone()
+        return self._microphone
+    
     def setup_tts(self):
         """Настройка синтеза речи"""
         try:
@@ -56,18 +107,25 @@ class RavenAI:
     
     def speak(self, text):
         """Озвучивание текста"""
+        if not self.voice_enabled:
+            return
+        
         def speak_thread():
             try:
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
+                with timed_operation('tts'):
+                    self.tts_engine.say(text)
+                    self.tts_engine.runAndWait()
             except Exception as e:
                 print(f"TTS Error: {e}")
         
-        thread = threading.Thread(target=speak_thread, daemon=True)
+        thread = threading.Thread(target=speak_thread, daemon=True, name='raven-tts')
         thread.start()
     
     def listen(self, timeout=5):
         """Распознавание речи"""
+        if not self.voice_enabled:
+            return None
+        sr = import_speech_recognition()
         try:
             with self.microphone as source:
                 print("🎤 Слушаю...")
@@ -80,7 +138,8 @@ class RavenAI:
                 
                 # Пробуем Google распознавание
                 try:
-                    text = self.recognizer.recognize_google(audio, language='ru-RU')
+                    with timed_operation('stt_google'):
+                        text = self.recognizer.recognize_google(audio, language='ru-RU')
                     print(f"📝 Распознано: {text}")
                     return text
                 except sr.UnknownValueError:
@@ -89,7 +148,8 @@ class RavenAI:
                 except sr.RequestError:
                     # Fallback на офлайн
                     try:
-                        text = self.recognizer.recognize_sphinx(audio)
+                        with timed_operation('stt_sphinx'):
+                            text = self.recognizer.recognize_sphinx(audio)
                         return text
                     except:
                         return None
@@ -102,9 +162,13 @@ class RavenAI:
     
     def start_voice_listening(self):
         """Запуск прослушивания голоса"""
+        if not self.voice_enabled:
+            print("⚠️ Голосовой ввод отключён профилем запуска")
+            return
         if not self.is_listening:
             self.is_listening = True
-            thread = threading.Thread(target=self._listening_loop, daemon=True)
+            thread = threading.Thread(target=self._listening_loop, daemon=True,
+                                      name='raven-listening')
             thread.start()
             print("✅ Голосовое прослушивание запущено")
     
@@ -122,9 +186,25 @@ class RavenAI:
                 print(f"Response: {response}")
             time.sleep(0.5)
     
+    def run_skill(self, skill, func, *args):
+        """Запуск навыка с побочным эффектом в пуле, возвращает ID задачи"""
+        def task():
+            func(*args)
+            return 'ok'
+        
+        job = self.executor.submit(skill, task)
+        if job.status == 'rejected':
+            print(f"⚠️ Навык {skill} отклонён: {job.error}")
+        return job.job_id
+    
+    def get_last_job_id(self):
+        """ID задачи последней команды, обработанной в текущем потоке"""
+        return getattr(self._local, 'job_id', None)
+    
     def process_command(self, command):
         """Обработка команды через ИИ"""
         command_lower = command.lower().strip()
+        job_id = None
         
         # Приветствие
         if any(word in command_lower for word in ['привет', 'здравствуй', 'hello', 'хай']):
@@ -145,16 +225,17 @@ class RavenAI:
         # Открытие приложений
         elif any(word in command_lower for word in ['открой', 'запусти']):
             if 'браузер' in command_lower or 'интернет' in command_lower:
-                webbrowser.open("https://www.google.com")
+                job_id = self.run_skill('open_url', webbrowser.open, "https://www.google.com")
                 response = "Открываю браузер"
             elif 'блокнот' in command_lower:
-                subprocess.Popen(['notepad.exe'])
+                job_id = self.run_skill('launch_app', self.executor.launch, ['notepad.exe'])
                 response = "Открываю блокнот"
             elif 'калькулятор' in command_lower:
-                subprocess.Popen(['calc.exe'])
+                job_id = self.run_skill('launch_app', self.executor.launch, ['calc.exe'])
                 response = "Открываю калькулятор"
             elif 'проводник' in command_lower:
-                subprocess.Popen(['explorer.exe'])
+                # explorer.exe передаёт окно уже запущенному процессу и выходит с кодом 1
+                job_id = self.run_skill('launch_app', self.executor.launch, ['explorer.exe'], 0)
                 response = "Открываю проводник"
             else:
                 response = "Какое приложение открыть?"
@@ -172,7 +253,7 @@ class RavenAI:
         elif 'найди' in command_lower or 'поиск' in command_lower:
             query = command_lower.replace('найди', '').replace('поиск', '').strip()
             if query:
-                webbrowser.open(f"https://www.google.com/search?q={query}")
+                job_id = self.run_skill('open_url', webbrowser.open, f"https://www.google.com/search?q={query}")
                 response = f"Ищу информацию по запросу: {query}"
             else:
                 response = "Что найти в интернете?"
@@ -203,8 +284,10 @@ class RavenAI:
         self.command_history.append({
             'time': datetime.now().isoformat(),
             'command': command,
-            'response': response
+            'response': response,
+            'job_id': job_id
         })
+        self._local.job_id = job_id
         
         # Ограничиваем историю
         if len(self.command_history) > 50:
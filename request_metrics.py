@@ -0,0 +1,365 @@
+"""
+Инструментирование запросов: гистограммы задержек по маршрутам, Server-Timing
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List
+
+# Логарифмически-линейные корзины (как в HDR Histogram): 8 корзин на октаву,
+# относительная погрешность не больше 12.5% на всём диапазоне
+SUB_BUCKET_BITS = 4
+SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+MAX_BUCKETS = 40 * SUB_BUCKET_HALF + (1 << SUB_BUCKET_BITS)
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+SERVER_TIMING_PHASES = ('sampler', 'nlu', 'skill')
+
+
+def bucket_index(value: int) -> int:
+    """Номер корзины для целого значения"""
+    if value < (1 << SUB_BUCKET_BITS):
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return min((shift << (SUB_BUCKET_BITS - 1)) + (value >> shift), MAX_BUCKETS - 1)
+
+
+def bucket_bounds(index: int):
+    """Границы корзины [нижняя, верхняя)"""
+    if index < (1 << SUB_BUCKET_BITS):
+        return index, index + 1
+    shift = index // SUB_BUCKET_HALF - 1
+    mantissa = index % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LogHistogram:
+    """Гистограмма целых значений с фиксированной относительной точностью"""
+
+    def __init__(self):
+        self.counts = [0] * MAX_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int):
+        """Учёт значения (вызывать под lock владельца)"""
+        value = int(value)
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        """Верхняя граница корзины, в которую попадает перцентиль"""
+        if not self.count:
+            return 0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_bounds(index)[1] - 1, self.max)
+        return self.max
+
+    def cumulative(self, bounds: List[int]) -> List[int]:
+        """Количество значений не больше каждой из границ (для экспорта)"""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            while index < MAX_BUCKETS and bucket_bounds(index)[1] - 1 <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def to_dict(self, scale: float = 1.0, digits: int = 2) -> Dict[str, Any]:
+        """Сводка: количество, среднее, перцентили и максимум"""
+        summary = {
+            'count': self.count,
+            'avg': round(self.total / self.count / scale, digits) if self.count else None,
+            'max': round(self.max / scale, digits) if self.count else None
+        }
+        for percent in PERCENTILES:
+            value = self.percentile(percent)
+            summary[f'p{percent:g}'] = round(value / scale, digits) if self.count else None
+        return summary
+
+
+class RouteStats:
+    """Счётчики одного маршрута"""
+
+    def __init__(self):
+        self.latency_us = LogHistogram()
+        self.request_bytes = LogHistogram()
+        self.response_bytes = LogHistogram()
+        self.phase_us: Dict[str, LogHistogram] = {}
+        self.in_flight = 0
+        self.status_counts = {}
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            requests = self.latency_us.count
+            return {
+                'requests': requests,
+                'in_flight': self.in_flight,
+                'errors': self.errors,
+                'error_rate': round(self.errors / requests, 4) if requests else 0.0,
+                'status': dict(self.status_counts),
+                'latency_ms': self.latency_us.to_dict(scale=1000.0, digits=3),
+                'request_bytes': self.request_bytes.to_dict(digits=0),
+                'response_bytes': self.response_bytes.to_dict(digits=0),
+                'phases_ms': {name: histogram.to_dict(scale=1000.0, digits=3)
+                              for name, histogram in sorted(self.phase_us.items())}
+            }
+
+    def record_phases(self, phases: Dict[str, float]):
+        """Учёт времени этапов запроса в мс (вызывать под lock)"""
+        for name in SERVER_TIMING_PHASES:
+            if name in phases:
+                histogram = self.phase_us.get(name)
+                if histogram is None:
+                    histogram = self.phase_us[name] = LogHistogram()
+                histogram.record(phases[name] * 1000)
+
+
+class ContextLocal:
+    """Аналог threading.local поверх contextvars: состояние принадлежит контексту запроса,
+    а не потоку (асинхронный сервер отдаёт потоковое тело из других потоков в том же контексте)"""
+
+    def __init__(self):
+        object.__setattr__(self, '_var', contextvars.ContextVar(f'context_local_{id(self)}'))
+
+    def _state(self) -> Dict[str, Any]:
+        state = self._var.get(None)
+        if state is None:
+            state = {}
+            self._var.set(state)
+        return state
+
+    def __getattr__(self, name: str):
+        try:
+            return self._state()[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value):
+        self._state()[name] = value
+
+
+class RequestMetrics:
+    """Middleware Flask: задержки, запросы в работе, размеры тел и ошибки по маршрутам"""
+
+    def __init__(self):
+        self.routes = {}
+        self.operations = {}
+        self.lock = threading.Lock()
+        self.local = ContextLocal()
+        self.started_at = time.time()
+
+    def _route(self, key: str) -> RouteStats:
+        stats = self.routes.get(key)
+        if stats is None:
+            with self.lock:
+                stats = self.routes.setdefault(key, RouteStats())
+        return stats
+
+    @contextmanager
+    def phase(self, name: str):
+        """Учёт времени этапа текущего запроса для заголовка Server-Timing"""
+        phases = getattr(self.local, 'phases', None)
+        if phases is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases[name] = phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    @contextmanager
+    def collect_phases(self, phases: Dict[str, float]):
+        """Этапы, выполняемые в другом потоке (обработчик очереди AI), копятся в phases
+        задачи; запрос забирает их через merge_phases"""
+        previous = getattr(self.local, 'phases', None)
+        self.local.phases = phases
+        try:
+            yield
+        finally:
+            self.local.phases = previous
+
+    def merge_phases(self, phases: Dict[str, float]):
+        """Добавление этапов завершённой задачи к текущему запросу. После ответа
+        (потоковое тело) этапы уже не попадут в Server-Timing, но учитываются в гистограммах"""
+        phases = dict(phases)
+        current = getattr(self.local, 'phases', None)
+        key = getattr(self.local, 'finished_route', None)
+        if current is not None and key is None:
+            for name, value in phases.items():
+                current[name] = current.get(name, 0.0) + value
+            return
+        # Тело потокового ответа отдаётся после finish в том же контексте запроса
+        if key is not None:
+            stats = self._route(key)
+            with stats.lock:
+                stats.record_phases(phases)
+
+    def begin(self, key: str):
+        """Начало запроса в текущем контексте"""
+        stats = self._route(key)
+        with stats.lock:
+            stats.in_flight += 1
+        self.local.route = key
+        self.local.phases = {}
+        self.local.finished_route = None
+        self.local.start = time.perf_counter()
+
+    def finish(self, status: int, request_bytes: int, response_bytes: int) -> Dict[str, float]:
+        """Учёт завершённого ответа, возвращает время этапов в мс"""
+        key = getattr(self.local, 'route', None)
+        if key is None:
+            return {}
+        elapsed = time.perf_counter() - self.local.start
+        phases = self.local.phases
+        phases['total'] = elapsed * 1000
+
+        stats = self._route(key)
+        with stats.lock:
+            stats.latency_us.record(elapsed * 1000000)
+            stats.request_bytes.record(request_bytes)
+            stats.response_bytes.record(response_bytes)
+            stats.status_counts[status] = stats.status_counts.get(status, 0) + 1
+            if status >= 500:
+                stats.errors += 1
+            stats.record_phases(phases)
+        self.local.finished_route = key
+        return phases
+
+    def end(self):
+        """Конец запроса (вызывается всегда, даже при исключении)"""
+        key = getattr(self.local, 'route', None)
+        if key is None:
+            return
+        stats = self._route(key)
+        with stats.lock:
+            stats.in_flight -= 1
+        self.local.route = None
+        self.local.phases = None
+
+    def record_operation(self, name: str, seconds: float, ok: bool = True):
+        """Учёт длительности операции вне HTTP запроса (STT, TTS)"""
+        stats = self.operations.get(name)
+        if stats is None:
+            with self.lock:
+                stats = self.operations.setdefault(name, RouteStats())
+        with stats.lock:
+            stats.latency_us.record(seconds * 1000000)
+            if not ok:
+                stats.errors += 1
+
+    @contextmanager
+    def operation(self, name: str):
+        """Замер операции; исключение учитывается как ошибка"""
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record_operation(name, time.perf_counter() - start, ok)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика по всем маршрутам и операциям"""
+        with self.lock:
+            routes = dict(self.routes)
+            operations = dict(self.operations)
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'in_flight': sum(stats.in_flight for stats in routes.values()),
+            'routes': {key: stats.to_dict() for key, stats in sorted(routes.items())},
+            'operations': {
+                name: {
+                    'count': stats.latency_us.count,
+                    'errors': stats.errors,
+                    'latency_ms': stats.latency_us.to_dict(scale=1000.0, digits=3)
+                }
+                for name, stats in sorted(operations.items())
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def install(self, app):
+        """Подключение хуков к приложению Flask и маршрута /api/debug/stats"""
+        from flask import jsonify, request
+
+        @app.before_request
+        def metrics_begin():
+            rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+            self.begin(f"{request.method} {rule}")
+
+        @app.after_request
+        def metrics_finish(response):
+            # У потоковых ответов длину не вычисляем: werkzeug собрал бы весь поток в память
+            response_bytes = 0 if response.is_streamed else response.calculate_content_length()
+            phases = self.finish(response.status_code, request.content_length or 0,
+                                 response_bytes or 0)
+            if phases:
+                response.headers['Server-Timing'] = format_server_timing(phases)
+            return response
+
+        @app.teardown_request
+        def metrics_end(error=None):
+            self.end()
+
+        @app.route('/api/debug/stats', methods=['GET'])
+        def debug_stats():
+            """Гистограммы задержек и счётчики по маршрутам"""
+            return jsonify(self.get_stats())
+
+
+def format_server_timing(phases: Dict[str, float]) -> str:
+    """Значение заголовка Server-Timing"""
+    parts = []
+    for name in SERVER_TIMING_PHASES + ('total',):
+        if name in phases:
+            parts.append(f"{name};dur={phases[name]:.2f}")
+    return ', '.join(parts)
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def get_request_metrics() -> RequestMetrics:
+    """Общий сборщик метрик запросов"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = RequestMetrics()
+        return _default_metrics
+
+
+def timed_operation(name: str):
+    """Замер операции вне запроса (stt_google, tts и т.п.)"""
+    return (_default_metrics or get_request_metrics()).operation(name)
+
+
+def phase(name: str):
+    """Этап текущего запроса (sampler, nlu, skill) для Server-Timing"""
+    return (_default_metrics or get_request_metrics()).phase(name)
+
+
+def collect_phases(phases: Dict[str, float]):
+    """Сбор этапов задачи, выполняемой вне потока запроса"""
+    return (_default_metrics or get_request_metrics()).collect_phases(phases)
+
+
+def merge_phases(phases: Dict[str, float]):
+    """Этапы завершённой задачи - в текущий запрос"""
+    (_default_metrics or get_request_metrics()).merge_phases(phases)
@@ -0,0 +1,274 @@
+"""
+Слой ответов: быстрая сериализация JSON, сжатие gzip/brotli, ETag для снимков
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+COMPRESS_MIN_BYTES = int(os.environ.get('RAVEN_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+COMPRESSIBLE_TYPES = ('application/json', 'application/openmetrics-text', 'text/plain',
+                      'text/html', 'text/css', 'text/javascript', 'application/javascript')
+
+# Снимки (ключ -> версия, тело, ETag) и сжатые тела снимков (ETag, кодировка)
+SNAPSHOT_CACHE_SIZE = 64
+COMPRESSED_CACHE_SIZE = 128
+
+orjson = None
+ORJSON_AVAILABLE = None
+brotli = None
+BROTLI_AVAILABLE = None
+
+
+def import_orjson() -> bool:
+    """Ленивый импорт orjson, возвращает доступность"""
+    global orjson, ORJSON_AVAILABLE
+    if ORJSON_AVAILABLE is None:
+        try:
+            import orjson as orjson_module
+            orjson = orjson_module
+            ORJSON_AVAILABLE = True
+        except ImportError:
+            ORJSON_AVAILABLE = False
+            print("⚠️ orjson не установлен. JSON сериализуется стандартным модулем.")
+    return ORJSON_AVAILABLE
+
+
+def import_brotli() -> bool:
+    """Ленивый импорт brotli (без него ответы сжимаются только gzip)"""
+    global brotli, BROTLI_AVAILABLE
+    if BROTLI_AVAILABLE is None:
+        try:
+            import brotli as brotli_module
+            brotli = brotli_module
+            BROTLI_AVAILABLE = True
+        except ImportError:
+            BROTLI_AVAILABLE = False
+    return BROTLI_AVAILABLE
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = True) -> bytes:
+    """JSON в UTF-8; даты и прочие типы - как у Flask"""
+    if import_orjson():
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=option)
+        except TypeError:
+            pass  # например, целые длиннее 64 бит - стандартный модуль справится
+    return json.dumps(obj, default=DefaultJSONProvider.default, ensure_ascii=False,
+                      sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+def make_etag(body: bytes) -> str:
+    """Хэш тела для ETag"""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON провайдер Flask: jsonify и request.get_json через orjson"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if not kwargs and import_orjson():
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # NaN, одиночные суррогаты - пусть решает стандартный модуль
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys), mimetype=self.mimetype)
+
+
+class ResponseLayer:
+    """Сжатие ответов по Accept-Encoding и условные ответы для снимков метрик"""
+
+    def __init__(self, min_size: int = COMPRESS_MIN_BYTES):
+        self.min_size = min_size
+        self.snapshots = OrderedDict()
+        self.compressed = OrderedDict()
+        self.lock = threading.Lock()
+        self.collector_added = False
+        self.stats = {
+            'serialized': 0,
+            'snapshot_hits': 0,
+            'not_modified': 0,
+            'compressed': {},
+            'bytes_before': 0,
+            'bytes_after': 0
+        }
+
+    def install(self, app):
+        """JSON провайдер и хук сжатия (ставить после RequestMetrics.install)"""
+        app.json = FastJSONProvider(app)
+        app.after_request(self.compress)
+        with self.lock:
+            if self.collector_added:
+                return
+            self.collector_added = True
+        from memory_diagnostics import get_memory_diagnostics
+        from openmetrics import get_metrics_exporter
+        get_metrics_exporter().add_collector(self.collect_metrics)
+        get_memory_diagnostics().register('response_snapshots', self)
+
+    def choose_encoding(self, accept_encodings) -> Optional[str]:
+        """Лучшая поддерживаемая кодировка из Accept-Encoding"""
+        supported = ['br', 'gzip'] if import_brotli() else ['gzip']
+        return accept_encodings.best_match(supported)
+
+    def encode(self, body: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+    def compress(self, response):
+        """after_request: сжатие крупных текстовых ответов"""
+        from flask import request
+
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        # Неизменный снимок сжимается один раз
+        etag, _ = response.get_etag()
+        key = (etag, encoding)
+        with self.lock:
+            data = self.compressed.get(key) if etag else None
+        if data is None:
+            data = self.encode(body, encoding)
+            if etag:
+                with self.lock:
+                    self.compressed[key] = data
+                    while len(self.compressed) > COMPRESSED_CACHE_SIZE:
+                        self.compressed.popitem(last=False)
+
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        with self.lock:
+            counts = self.stats['compressed']
+            counts[encoding] = counts.get(encoding, 0) + 1
+            self.stats['bytes_before'] += len(body)
+            self.stats['bytes_after'] += len(data)
+        return response
+
+    def snapshot(self, key: str, version: Any, build: Callable[[], Any],
+                 content_type: str = 'application/json'):
+        """Ответ-снимок: тело строится один раз на версию данных, ETag - хэш тела"""
+        with self.lock:
+            cached = self.snapshots.get(key)
+            if cached is not None and cached[0] == version:
+                self.snapshots.move_to_end(key)
+                self.stats['snapshot_hits'] += 1
+            else:
+                cached = None
+
+        if cached is None:
+            payload = build()
+            body = payload if isinstance(payload, bytes) else dumps_bytes(payload)
+            cached = (version, body, make_etag(body))
+            with self.lock:
+                self.snapshots[key] = cached
+                self.snapshots.move_to_end(key)
+                while len(self.snapshots) > SNAPSHOT_CACHE_SIZE:
+                    self.snapshots.popitem(last=False)
+                self.stats['serialized'] += 1
+
+        return self.conditional(cached[1], cached[2], content_type)
+
+    def conditional(self, body: bytes, etag: str, content_type: str):
+        """304 при совпадении If-None-Match, иначе тело с ETag"""
+        from flask import Response, request
+
+        # Слабый ETag: тело одинаково по смыслу в любой Content-Encoding
+        if request.if_none_match.contains_weak(etag):
+            with self.lock:
+                self.stats['not_modified'] += 1
+            response = Response(status=304)
+        else:
+            response = Response(body, content_type=content_type)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def trim(self, budget: Optional[int]) -> int:
+        """Вытеснение старых снимков и сжатых тел сверх budget каждого"""
+        removed = 0
+        with self.lock:
+            for cache in (self.snapshots, self.compressed):
+                while budget is not None and len(cache) > budget:
+                    cache.popitem(last=False)
+                    removed += 1
+        return removed
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Размер для диагностики памяти: снимки и сжатые тела"""
+        with self.lock:
+            return {
+                'entries': len(self.snapshots),
+                'compressed': len(self.compressed),
+                'bytes': sum(len(body) for _, body, _ in self.snapshots.values())
+                + sum(len(data) for data in self.compressed.values())
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Счётчики сериализации, 304 и сжатия"""
+        with self.lock:
+            stats = dict(self.stats, compressed=dict(self.stats['compressed']))
+        before = stats['bytes_before']
+        stats['compression_ratio'] = round(stats['bytes_after'] / before, 3) if before else None
+        stats['json_backend'] = 'orjson' if import_orjson() else 'json'
+        stats['brotli'] = import_brotli()
+        return stats
+
+    def collect_metrics(self):
+        """Семейства метрик слоя ответов для /metrics"""
+        stats = self.get_stats()
+        compressed = [('_total', {'encoding': encoding}, count)
+                      for encoding, count in sorted(stats['compressed'].items())]
+        return [
+            ('raven_http_compressed_responses', 'counter', 'Responses compressed by encoding.',
+             compressed),
+            ('raven_http_compression_saved_bytes', 'counter', 'Bytes saved by response compression.',
+             [('_total', {}, stats['bytes_before'] - stats['bytes_after'])]),
+            ('raven_http_not_modified_responses', 'counter', 'Snapshot requests answered with 304.',
+             [('_total', {}, stats['not_modified'])]),
+            ('raven_snapshot_serializations', 'counter', 'Snapshot bodies serialized.',
+             [('_total', {}, stats['serialized'])])
+        ]
+
+
+_default_layer = None
+_default_lock = threading.Lock()
+
+
+def get_response_layer() -> ResponseLayer:
+    """Общий слой ответов"""
+    global _default_layer
+    with _default_lock:
+        if _default_layer is None:
+            _default_layer = ResponseLayer()
+        return _default_layer
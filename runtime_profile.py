@@ -0,0 +1,102 @@
+"""
+Профили запуска: full - все подсистемы, headless - без аудио и GUI (серверы мониторинга)
+"""
+import importlib.abc
+import os
+import sys
+from typing import Any, Dict, List
+
+PROFILES = ('full', 'headless')
+PROFILE = os.environ.get('RAVEN_PROFILE', 'full')
+
+# Подсистемы, отключаемые в headless: имя -> (модули верхнего уровня, описание)
+HEADLESS_SUBSYSTEMS = {
+    'voice_output': (('pyttsx3',), 'Синтез речи (pyttsx3)'),
+    'voice_input': (('speech_recognition', 'pyaudio'), 'Микрофон и распознавание речи (PyAudio)'),
+    'offline_stt': (('vosk',), 'Офлайн распознавание речи (Vosk)'),
+    'gui': (('PyQt6', 'PyQt5', 'PySide6'), 'Графический интерфейс (PyQt)'),
+    'neural_model': (('torch',), 'Нейросетевая модель Neural Core (PyTorch)')
+}
+
+# Подсистемы, которые headless всё же оставляет: RAVEN_HEADLESS_KEEP=neural_model
+HEADLESS_KEEP = {name.strip() for name in os.environ.get('RAVEN_HEADLESS_KEEP', '').split(',')
+                 if name.strip()}
+
+
+class BlockedImportFinder(importlib.abc.MetaPathFinder):
+    """Запрет импорта модулей отключённых подсистем (ImportError, как при их отсутствии)"""
+
+    def __init__(self, modules: Dict[str, str]):
+        self.modules = modules
+
+    def find_spec(self, fullname, path=None, target=None):
+        subsystem = self.modules.get(fullname.partition('.')[0])
+        if subsystem is not None:
+            raise ImportError(f"{fullname}: подсистема {subsystem} отключена профилем {PROFILE}",
+                              name=fullname)
+        return None
+
+
+_finder = None
+
+
+def is_headless() -> bool:
+    return PROFILE == 'headless'
+
+
+def disabled_subsystems() -> Dict[str, str]:
+    """Отключённые подсистемы текущего профиля: имя -> описание"""
+    if not is_headless():
+        return {}
+    return {name: description for name, (_, description) in HEADLESS_SUBSYSTEMS.items()
+            if name not in HEADLESS_KEEP}
+
+
+def subsystem_enabled(name: str) -> bool:
+    return name not in disabled_subsystems()
+
+
+def blocked_modules() -> Dict[str, str]:
+    """Модули отключённых подсистем: модуль -> подсистема"""
+    disabled = disabled_subsystems()
+    return {module: name for name, (modules, _) in HEADLESS_SUBSYSTEMS.items()
+            if name in disabled for module in modules}
+
+
+def apply_profile():
+    """Установка запрета импортов (вызывать до импорта тяжёлых модулей)"""
+    global _finder
+    if PROFILE not in PROFILES:
+        print(f"⚠️ Неизвестный профиль {PROFILE}, используется full")
+        return
+    modules = blocked_modules()
+    if not modules or _finder is not None:
+        return
+    already = [module for module in modules if module in sys.modules]
+    if already:
+        print(f"⚠️ Уже импортированы до применения профиля: {', '.join(already)}")
+    _finder = BlockedImportFinder(modules)
+    sys.meta_path.insert(0, _finder)
+
+
+def get_profile_report() -> Dict[str, Any]:
+    """Профиль, отключённые подсистемы и проверка, что их модули не загружены"""
+    modules = blocked_modules()
+    loaded: List[str] = sorted(module for module in modules if module in sys.modules)
+    return {
+        'profile': PROFILE,
+        'disabled': disabled_subsystems(),
+        'blocked_modules': sorted(modules),
+        'blocked_loaded': loaded
+    }
+
+
+def format_profile_report() -> str:
+    """Текстовый отчёт для консоли при старте"""
+    disabled = disabled_subsystems()
+    if not disabled:
+        return f"🧩 Профиль: {PROFILE}"
+    lines = [f"🧩 Профиль: {PROFILE}, отключено:"]
+    for name, description in disabled.items():
+        lines.append(f"   ⛔ {name:<14} {description}")
+    return '\n'.join(lines)
@@ -0,0 +1,242 @@
+"""
+Встроенный сэмплирующий профилировщик: стеки всех потоков через sys._current_frames()
+с заданной частотой, результат - collapsed stacks (flamegraph.pl) или JSON speedscope
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_HZ = 100
+MAX_HZ = 1000
+DEFAULT_SECONDS = 10.0
+MAX_SECONDS = float(os.environ.get('RAVEN_PROFILE_MAX_SECONDS', 120))
+MAX_DEPTH = 128
+
+# Листовые функции ожидания: такие сэмплы по умолчанию не попадают в профиль
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socket.py', 'readinto'),
+    ('socketserver.py', 'serve_forever'),
+    ('thread.py', '_worker'),
+    ('base_events.py', '_run_once'),
+    ('ipc_transport.py', 'read_frame')
+}
+
+Frame = Tuple[str, str, int]  # функция, файл, первая строка
+
+
+class ProfilerBusy(Exception):
+    """Профилирование уже идёт"""
+
+
+def frame_key(frame) -> Frame:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def thread_group(name: str) -> str:
+    """Потоки одной роли - в один профиль: Thread-7 (process_request_thread) -> process_request_thread,
+    asgi-worker_3 -> asgi-worker"""
+    name = re.sub(r'^Thread-\d+ \((.+)\)$', r'\1', name)
+    return re.sub(r'_\d+$', '', name)
+
+
+def is_idle(leaf: Frame) -> bool:
+    return (os.path.basename(leaf[1]), leaf[0]) in IDLE_LEAVES
+
+
+class Profile:
+    """Результат профилирования: стеки по потокам в порядке сэмплов"""
+
+    def __init__(self, hz: int):
+        self.hz = hz
+        self.frames: Dict[Frame, int] = {}
+        self.frame_list: List[Frame] = []
+        self.samples: Dict[str, List[Tuple[int, ...]]] = {}
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.ticks = 0
+        self.idle_samples = 0
+        self.sampling_seconds = 0.0
+
+    def intern(self, key: Frame) -> int:
+        index = self.frames.get(key)
+        if index is None:
+            index = self.frames[key] = len(self.frame_list)
+            self.frame_list.append(key)
+        return index
+
+    def add(self, thread: str, stack: Tuple[int, ...]):
+        self.samples.setdefault(thread, []).append(stack)
+
+    def frame_name(self, index: int) -> str:
+        name, filename, line = self.frame_list[index]
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self) -> str:
+        """Строки "поток;корень;...;лист количество" для flamegraph.pl и speedscope"""
+        counts: Dict[str, int] = {}
+        for thread, stacks in self.samples.items():
+            for stack in stacks:
+                key = ';'.join([thread] + [self.frame_name(index) for index in stack])
+                counts[key] = counts.get(key, 0) + 1
+        return ''.join(f"{key} {count}\n" for key, count in sorted(counts.items()))
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Файл speedscope: профиль типа sampled на каждый поток"""
+        interval = 1.0 / self.hz
+        profiles = []
+        for thread, stacks in sorted(self.samples.items()):
+            profiles.append({
+                'type': 'sampled',
+                'name': thread,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': round(len(stacks) * interval, 6),
+                'samples': [list(stack) for stack in stacks],
+                'weights': [interval] * len(stacks)
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': 'Raven AI backend ' + time.strftime('%Y-%m-%d %H:%M:%S',
+                                                        time.localtime(self.started_at)),
+            'exporter': 'raven-ai sampling_profiler',
+            'activeProfileIndex': 0,
+            'shared': {
+                'frames': [{'name': name, 'file': filename, 'line': line}
+                           for name, filename, line in self.frame_list]
+            },
+            'profiles': profiles
+        }
+
+    def get_summary(self) -> Dict[str, Any]:
+        achieved = self.ticks / self.duration if self.duration else 0.0
+        return {
+            'hz': self.hz,
+            'achieved_hz': round(achieved, 1),
+            'duration_seconds': round(self.duration, 3),
+            'ticks': self.ticks,
+            'samples': sum(len(stacks) for stacks in self.samples.values()),
+            'idle_samples': self.idle_samples,
+            'threads': sorted(self.samples),
+            'overhead_percent': round(self.sampling_seconds / self.duration * 100, 2)
+            if self.duration else 0.0
+        }
+
+
+class SamplingProfiler:
+    """Профилировщик процесса; одновременно идёт не больше одного профилирования"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = False
+
+    def sample(self, profile: Profile, include_idle: bool, own_ident: int):
+        """Один сэмпл стеков всех потоков, кроме собственного"""
+        names = {thread.ident: thread_group(thread.name) for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(frame_key(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            if not include_idle and is_idle(stack[0]):
+                profile.idle_samples += 1
+                continue
+            thread = names.get(ident, f'thread-{ident}')
+            profile.add(thread, tuple(profile.intern(key) for key in reversed(stack)))
+
+    def run(self, seconds: float = DEFAULT_SECONDS, hz: int = DEFAULT_HZ,
+            include_idle: bool = False) -> Profile:
+        """Профилирование в вызывающем потоке в течение seconds"""
+        seconds = min(max(seconds, 0.1), MAX_SECONDS)
+        hz = min(max(int(hz), 1), MAX_HZ)
+        with self.lock:
+            if self.running:
+                raise ProfilerBusy('Профилирование уже выполняется')
+            self.running = True
+        try:
+            profile = Profile(hz)
+            own_ident = threading.get_ident()
+            interval = 1.0 / hz
+            start = time.perf_counter()
+            deadline = start + seconds
+            next_tick = start
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                    continue
+                began = time.perf_counter()
+                self.sample(profile, include_idle, own_ident)
+                profile.sampling_seconds += time.perf_counter() - began
+                profile.ticks += 1
+                # Пропущенные тики не догоняются пачкой
+                next_tick = max(next_tick + interval, time.perf_counter())
+            profile.duration = time.perf_counter() - start
+            return profile
+        finally:
+            with self.lock:
+                self.running = False
+
+    def install(self, app):
+        """Маршрут GET /api/debug/profile"""
+        from flask import Response, jsonify, request
+
+        @app.route('/api/debug/profile', methods=['GET'])
+        def debug_profile():
+            """Профиль всех потоков: ?seconds=30&hz=100&format=collapsed|speedscope&idle=1"""
+            try:
+                seconds = float(request.args.get('seconds', DEFAULT_SECONDS))
+                hz = int(request.args.get('hz', DEFAULT_HZ))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'seconds и hz должны быть числами'}), 400
+            output = request.args.get('format', 'collapsed')
+            if output not in ('collapsed', 'speedscope'):
+                return jsonify({'success': False,
+                                'error': 'format: collapsed или speedscope'}), 400
+            include_idle = request.args.get('idle', '0') in ('1', 'true', 'yes')
+            try:
+                profile = self.run(seconds, hz, include_idle)
+            except ProfilerBusy as e:
+                return jsonify({'success': False, 'error': str(e)}), 409
+
+            summary = profile.get_summary()
+            if output == 'speedscope':
+                body = json.dumps(profile.speedscope(), ensure_ascii=False)
+                response = Response(body, content_type='application/json')
+                response.headers['Content-Disposition'] = (
+                    f"attachment; filename=raven-profile-{int(profile.started_at)}.speedscope.json"
+                )
+            else:
+                response = Response(profile.collapsed(), content_type='text/plain; charset=utf-8')
+            response.headers['X-Profile-Samples'] = str(summary['samples'])
+            response.headers['X-Profile-Hz'] = str(summary['achieved_hz'])
+            response.headers['X-Profile-Overhead'] = f"{summary['overhead_percent']}%"
+            return response
+
+
+_default_profiler = None
+_default_lock = threading.Lock()
+
+
+def get_sampling_profiler() -> SamplingProfiler:
+    """Общий профилировщик процесса"""
+    global _default_profiler
+    with _default_lock:
+        if _default_profiler is None:
+            _default_profiler = SamplingProfiler()
+        return _default_profiler
@@ -0,0 +1,711 @@
+"""
+Самопроверка чистых алгоритмов бэкенда: планировщик, разбор потоков, ранжирование,
+таблицы фраз, общая память и контроль допуска - без сервера, звука и GUI
+
+Использование:
+    python self_check.py                          # все проверки
+    python self_check.py --only scheduler         # выбранные проверки через запятую
+"""
+import argparse
+import queue
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from typing import Callable, Dict
+
+CHECKS: Dict[str, Callable[[], None]] = OrderedDict()
+
+
+def check(name: str):
+    """Регистрация проверки: функция без аргументов, AssertionError - провал"""
+    def register(func: Callable[[], None]) -> Callable[[], None]:
+        CHECKS[name] = func
+        return func
+    return register
+
+
+@check('scheduler')
+def check_scheduler():
+    """Порядок классов, старение, лимит bulk и backpressure (ai_scheduler.py)"""
+    from ai_scheduler import PriorityWorkQueue
+
+    work = PriorityWorkQueue(aging_seconds=5.0)
+    work.put('bulk', 'bulk')
+    work.put('normal', 'normal')
+    work.put('interactive', 'interactive')
+    order = [work.get_with_priority(timeout=0)[0] for _ in range(3)]
+    assert order == ['interactive', 'normal', 'bulk'], order
+
+    # bulk, ждущий три интервала старения, обгоняет только что пришедший interactive
+    work = PriorityWorkQueue(aging_seconds=5.0)
+    work.put('old-bulk', 'bulk')
+    work.pending['bulk'][0] = (time.time() - 15.0, 'old-bulk')
+    work.put('fresh', 'interactive')
+    assert work.get(timeout=0) == 'old-bulk'
+    assert work.get(timeout=0) == 'fresh'
+
+    # Пока bulk занимает свой лимит, даже самый старый bulk ждёт
+    work = PriorityWorkQueue(concurrency={'bulk': 1})
+    work.put('bulk-1', 'bulk')
+    assert work.get_with_priority(timeout=0) == ('bulk-1', 'bulk')
+    work.put('bulk-2', 'bulk')
+    work.pending['bulk'][0] = (time.time() - 60.0, 'bulk-2')
+    work.put('normal', 'normal')
+    assert work.get(timeout=0) == 'normal'
+    try:
+        work.get(timeout=0)
+        raise AssertionError('bulk выдан сверх лимита параллельности')
+    except queue.Empty:
+        pass
+    work.task_done('bulk')
+    assert work.get(timeout=0) == 'bulk-2'
+
+    # Переполнение и забор interactive на границе чанка
+    work = PriorityWorkQueue(maxsize=2)
+    work.put('a', 'normal')
+    work.put('b', 'interactive')
+    try:
+        work.put('c', 'bulk')
+        raise AssertionError('очередь приняла задачу сверх maxsize')
+    except queue.Full:
+        pass
+    assert work.take_interactive() == 'b'
+    assert work.take_interactive() is None
+    assert work.get_stats()['preempted'] == 1
+    assert PriorityWorkQueue.normalize('unknown') == 'normal'
+
+
+def split_every(data, size: int):
+    """Фрагменты по size элементов (строки или байты)"""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@check('json_field_stream')
+def check_json_field_stream():
+    """Поле JSON и анализ текста не зависят от размера фрагментов (text_analytics.py)"""
+    import io
+    import json
+
+    from text_analytics import analyze_text_stream, decode_stream, iter_json_field
+
+    text = ('Отлично! Строка с "кавычками", \\ слэшем,\nпереводом строки, \t табуляцией, '
+            'эмодзи 😀 и суррогатами 𝄞. Спасибо, это прекрасно, хотя местами плохо.')
+    documents = [
+        json.dumps({'text': text}),
+        json.dumps({'text': text}, ensure_ascii=False),
+        # Нестроковое поле с тем же именем во вложенном объекте пропускается
+        json.dumps({'meta': {'text': 42}, 'title': 'x', 'text': text}),
+        '{ "text" :\n  ' + json.dumps(text) + ' }'
+    ]
+    for document in documents:
+        for size in list(range(1, 17)) + [31, 64, len(document)]:
+            parts = list(iter_json_field(split_every(document, size)))
+            assert ''.join(parts) == text, (size, document[:40])
+
+    # Разрезанные многобайтовые символы UTF-8 собираются обратно
+    payload = documents[1].encode('utf-8')
+    for size in (1, 2, 3, 5, 7):
+        assert ''.join(decode_stream(io.BytesIO(payload), chunk_size=size)) == documents[1]
+
+    whole = analyze_text_stream([text])
+    for size in (1, 2, 3, 7, 50):
+        assert analyze_text_stream(split_every(text, size)) == whole, size
+    assert whole['sentiment'] == 'positive' and whole['negative_hits'] == 1, whole
+
+
+@check('textrank')
+def check_textrank():
+    """Разбиение на предложения, TextRank против плотной матрицы и бюджет (summarizer.py)"""
+    import summarizer
+
+    sentences = summarizer.split_sentences(
+        'Проф. Иванов и А. С. Пушкин гуляли по ул. Ленина. Было тепло!\n\nНовый абзац без точки')
+    assert sentences == ['Проф. Иванов и А. С. Пушкин гуляли по ул. Ленина.', 'Было тепло!',
+                         'Новый абзац без точки'], sentences
+
+    text = ('Python is a popular programming language. '
+            'Python is used for data science and machine learning. '
+            'Data science with Python relies on libraries for machine learning. '
+            'Cats sleep most of the day. '
+            'Machine learning libraries in Python speed up data science.')
+    result = summarizer.summarize(text, max_sentences=2)
+    if not summarizer.import_scipy():
+        assert result['method'] == 'lead' and result['selected_sentences'] == [0, 1], result
+        return
+    np = summarizer.np
+
+    # Неявный степенной метод совпадает с PageRank по явной матрице сходства
+    matrix = summarizer.build_tfidf(summarizer.split_sentences(text))
+    similarity = (matrix @ matrix.T).toarray()
+    np.fill_diagonal(similarity, 0.0)
+    count = similarity.shape[0]
+    weights = similarity.sum(axis=1)
+    transition = np.where(weights[:, None] > 0, similarity / np.maximum(weights, 1e-12)[:, None],
+                          1.0 / count)
+    reference = np.full(count, 1.0 / count)
+    for _ in range(500):
+        reference = (1 - summarizer.DAMPING) / count + summarizer.DAMPING * transition.T @ reference
+    scores = summarizer.textrank_scores(matrix)
+    assert np.allclose(scores, reference, atol=1e-5), (scores, reference)
+    assert abs(scores.sum() - 1.0) < 1e-6
+
+    # Несвязанное предложение не попадает в выжимку, порядок предложений сохранён
+    assert result['method'] == 'textrank'
+    assert 3 not in result['selected_sentences'], result
+    assert result['selected_sentences'] == sorted(result['selected_sentences'])
+    assert int(np.argmin(scores)) == 3
+
+    budget = summarizer.summarize(text, max_sentences=5, max_chars=80)
+    assert budget['summary_length'] <= 80 and len(budget['selected_sentences']) >= 1, budget
+    assert summarizer.summarize('Одно предложение.')['method'] == 'none'
+
+
+@check('phrase_table')
+def check_phrase_table():
+    """Самое длинное совпадение в mmap таблице против перебора по словарю (phrase_table.py)"""
+    import os
+    import random
+    import tempfile
+
+    from phrase_table import PhraseTable, Translator, build_phrase_table
+
+    rng = random.Random(7)
+    vocabulary = ['а', 'б', 'аб', 'ёж', 'я', 'z', 'za', '-', 'в']
+    phrases = {}
+    for _ in range(300):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 4))]
+        phrases[' '.join(words)] = f'T{len(phrases)}'
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ru-en.rpt')
+        assert build_phrase_table(phrases.items(), path) == len(phrases)
+        table = PhraseTable(path)
+        try:
+            for key, target in phrases.items():
+                assert table.lookup(key) == target, key
+            assert table.lookup('нет такой фразы') is None
+            for _ in range(2000):
+                words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 6))]
+                expected = (0, None)
+                for length in range(1, len(words) + 1):
+                    key = ' '.join(words[:length])
+                    if key in phrases:
+                        expected = (length, phrases[key])
+                assert table.match_prefix(words) == expected, (words, expected)
+        finally:
+            table.close()
+
+        translator = Translator(tables_dir=directory)
+        build_phrase_table([('спасибо', 'thanks'), ('большое спасибо', 'thank you very much'),
+                            ('добрый', 'kind'), ('добрый день', 'good afternoon')],
+                           os.path.join(directory, 'ru-en.rpt'))
+        result = translator.translate('Большое спасибо, добрый день! Добрый кот.')
+        assert result['translation'] == 'thank you very much, good afternoon! kind кот.', result
+        assert result['unknown_words'] == ['кот'], result
+        assert translator.translate('Большое спасибо, добрый день! Добрый кот.')['cached_sentences'] == 2
+        for table in translator.tables.values():
+            table.close()
+
+
+def seqlock_snapshot(tick: int) -> dict:
+    """Снимок, все поля которого выводятся из tick: разорванное чтение сразу видно"""
+    return {
+        'cpu': {'percent': tick % 100 + 0.5, 'cores': tick % 64 + 1,
+                'frequency': None if tick % 2 else float(tick)},
+        'ram': {'percent': tick % 100 + 0.25, 'total': tick * 4, 'used': tick * 3, 'free': tick},
+        'disk': {'percent': tick % 100 + 0.75, 'total': tick * 8, 'used': tick * 5,
+                 'free': tick * 3},
+        'network': {'bytes_sent': tick * 7, 'bytes_recv': tick * 11},
+        'processes': tick + 1,
+        'backend': {'rss': tick * 13, 'threads': tick % 50 + 1, 'processes': 2},
+        'cadence': {'mode': 'fast' if tick % 2 else 'normal', 'interval': 0.5 if tick % 2 else None},
+        'sampled_at': 1700000000.0 + tick
+    }
+
+
+def seqlock_reader(name: str, last_tick: int, results):
+    """Дочерний процесс: читает, пока писатель публикует, и сверяет поля снимков"""
+    from shared_metrics import SharedSnapshotReader
+
+    reader = SharedSnapshotReader(name, untrack=False)
+    reads, torn, previous = 0, 0, 0
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        snapshot = reader.read()
+        if snapshot is None:
+            continue
+        reads += 1
+        tick = snapshot['ram']['free']
+        expected = seqlock_snapshot(tick)
+        if (snapshot['network']['bytes_recv'] != expected['network']['bytes_recv']
+                or snapshot['disk']['total'] != expected['disk']['total']
+                or snapshot['cpu']['frequency'] != expected['cpu']['frequency']
+                or snapshot['cadence'] != expected['cadence']
+                or snapshot['sampled_at'] != expected['sampled_at']
+                or tick < previous):
+            torn += 1
+        previous = tick
+        if tick >= last_tick:
+            break
+    results.put((reads, torn, previous, reader.retries))
+    reader.segment.close()
+
+
+@check('seqlock')
+def check_seqlock():
+    """Публикация и чтение снимка в общей памяти, в том числе из другого процесса
+    во время записи (shared_metrics.py)"""
+    import multiprocessing
+
+    import shared_metrics
+    from shared_metrics import SEQ, SharedSnapshotReader, SharedSnapshotWriter
+
+    writer = SharedSnapshotWriter()
+    try:
+        reader = SharedSnapshotReader(writer.name, untrack=False)
+        assert reader.read() is None and reader.tick == 0
+
+        writer.publish(seqlock_snapshot(3), tick=3, sample_ms=1.5)
+        snapshot = reader.read()
+        expected = seqlock_snapshot(3)
+        for key in ('cpu', 'ram', 'disk', 'network', 'processes', 'backend', 'cadence', 'sampled_at'):
+            assert snapshot[key] == expected[key], (key, snapshot[key], expected[key])
+        assert reader.tick == 1 and reader.sample_ms == 1.5
+        assert reader.read() is snapshot  # без новой публикации - кэш
+
+        # Запись в процессе (нечётная версия): читатель отдаёт последний согласованный снимок
+        SEQ.pack_into(writer.buffer, 0, writer.seq + 1)
+        writer.buffer[SEQ.size:SEQ.size + 8] = b'\xff' * 8
+        assert reader.read() is snapshot and reader.retries > 0
+        writer.publish(seqlock_snapshot(4), tick=4, sample_ms=1.0)
+        assert reader.read()['ram']['free'] == 4 and reader.tick == 2
+
+        # Публикация посреди чтения: разорванный снимок отбрасывается и читается заново
+        class RacingLayout:
+            def __init__(self, layout):
+                self.layout, self.raced = layout, False
+                self.pack_into = layout.pack_into
+
+            def unpack_from(self, buffer, offset):
+                head = self.layout.unpack_from(buffer, offset)
+                if self.raced:
+                    return head
+                self.raced = True
+                writer.publish(seqlock_snapshot(6), tick=6, sample_ms=1.0)
+                tail = self.layout.unpack_from(buffer, offset)
+                middle = len(head) // 2
+                return head[:middle] + tail[middle:]
+
+        writer.publish(seqlock_snapshot(5), tick=5, sample_ms=1.0)
+        shared_metrics.LAYOUT = RacingLayout(shared_metrics.LAYOUT)
+        try:
+            snapshot = reader.read()
+        finally:
+            shared_metrics.LAYOUT = shared_metrics.LAYOUT.layout
+        expected = seqlock_snapshot(6)
+        assert snapshot['ram'] == expected['ram'] and snapshot['network'] == expected['network']
+        assert snapshot['sampled_at'] == expected['sampled_at'] and reader.tick == 4
+
+        # Чтение через get_snapshot отмечает спрос для адаптивного сэмплера
+        before = time.time()
+        assert reader.get_snapshot()['ram']['free'] == 6
+        assert writer.last_demand() >= before
+        reader.segment.close()
+
+        # Читатель в другом процессе во время непрерывной записи
+        last_tick = 20000
+        results = multiprocessing.Queue()
+        child = multiprocessing.Process(target=seqlock_reader,
+                                        args=(writer.name, last_tick, results))
+        child.start()
+        for tick in range(7, last_tick + 1):
+            writer.publish(seqlock_snapshot(tick), tick=tick, sample_ms=0.1)
+        reads, torn, final, retries = results.get(timeout=60)
+        child.join(10)
+        assert final == last_tick, final
+        assert torn == 0, f'разорванных чтений: {torn} из {reads}'
+        assert reads > 0
+    finally:
+        writer.close()
+
+
+@check('admission')
+def check_admission():
+    """Token bucket, лимиты классов, сброс нагрузки, LRU вёдер и ключ клиента (admission.py)"""
+    import admission
+    from admission import AdmissionController, Rejection, TokenBucket, client_key
+
+    # Пополнение по времени: запас burst, затем rate токенов в секунду
+    bucket = TokenBucket(rate=2, burst=3)
+    start = bucket.updated
+    assert [bucket.take(start) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert abs(bucket.take(start) - 0.5) < 1e-9
+    assert bucket.take(start + 0.5) == 0.0
+    assert abs(bucket.take(start + 0.75) - 0.25) < 1e-9
+    assert [bucket.take(start + 100) for _ in range(4)][-1] > 0  # запас не растёт выше burst
+    fresh = TokenBucket(rate=0.5, burst=1)
+    assert fresh.take(fresh.updated - 0.01) == 0.0  # now взят до создания ведра
+
+    def rejected(controller, route_class, rule='/r', client='client:a'):
+        try:
+            controller.admit(route_class, rule, client)
+        except Rejection as rejection:
+            return rejection.status, rejection.reason, rejection.retry_after
+        return None
+
+    policies = {
+        'critical': {'concurrency': None, 'client_rate': None, 'route_rate': None, 'shed_level': None},
+        'interactive': {'concurrency': 2, 'client_rate': (1, 2), 'route_rate': None, 'shed_level': 2},
+        'streaming': {'concurrency': 1, 'client_rate': None, 'route_rate': None, 'shed_level': 2},
+        'heavy': {'concurrency': None, 'client_rate': None, 'route_rate': (0.5, 1), 'shed_level': 1}
+    }
+    controller = AdmissionController(policies)
+    controller.load_checked = time.monotonic() + 3600  # уровень нагрузки задаётся вручную
+
+    # Лимит клиента на маршруте: 429 с Retry-After, другой клиент и маршрут независимы
+    assert rejected(controller, 'interactive') is None
+    controller.release('interactive')
+    assert rejected(controller, 'interactive') is None
+    controller.release('interactive')
+    assert rejected(controller, 'interactive') == (429, 'client_rate', 1)
+    assert rejected(controller, 'interactive', client='client:b') is None
+    assert rejected(controller, 'interactive', rule='/other') is None
+    assert controller.in_flight['interactive'] == 2
+
+    # Лимит параллельности класса: 503, место освобождается в release
+    assert rejected(controller, 'interactive', client='client:c') == (503, 'concurrency', 1)
+    controller.release('interactive')
+    assert rejected(controller, 'interactive', client='client:c') is None
+
+    # Долгие соединения заполняют свой класс, не трогая interactive
+    assert rejected(controller, 'streaming') is None
+    assert rejected(controller, 'streaming', client='client:b') == (503, 'concurrency', 1)
+    controller.release('interactive')
+    assert rejected(controller, 'interactive', client='client:d') is None
+
+    # Лимит маршрута в целом - 503 для любого клиента
+    assert rejected(controller, 'heavy', client='client:a') is None
+    assert rejected(controller, 'heavy', client='client:b') == (503, 'route_rate', 2)
+
+    # Сброс нагрузки по уровню: critical допускается всегда
+    controller.level = 1
+    assert rejected(controller, 'heavy', client='client:e')[:2] == (503, 'overload')
+    assert rejected(controller, 'streaming', client='client:e')[:2] == (503, 'concurrency')
+    controller.level = 2
+    assert rejected(controller, 'interactive', client='client:e') == (503, 'overload', 2)
+    assert rejected(controller, 'critical') is None
+    stats = controller.get_stats()
+    assert stats['level'] == 'overloaded'
+    assert stats['classes']['interactive']['rejected'] == {
+        'client_rate': 1, 'concurrency': 1, 'overload': 1}
+
+    # LRU вёдер: вытесняется давно не использованное, использованное недавно остаётся
+    original_limit = admission.MAX_BUCKETS
+    admission.MAX_BUCKETS = 3
+    try:
+        controller = AdmissionController(policies)
+        controller.load_checked = time.monotonic() + 3600
+        for client in ('client:1', 'client:2', 'client:3'):
+            controller.admit('interactive', '/r', client)
+            controller.release('interactive')
+        controller.admit('interactive', '/r', 'client:1')
+        controller.release('interactive')
+        controller.admit('interactive', '/r', 'client:4')
+        assert list(controller.buckets) == [('client:3', '/r'), ('client:1', '/r'), ('client:4', '/r')]
+    finally:
+        admission.MAX_BUCKETS = original_limit
+
+    # Ключ клиента: заголовок клиента, затем сессия, адрес - в последнюю очередь
+    from flask import Flask, request
+    app = Flask(__name__)
+    cases = [
+        ({'headers': {'X-Client-Id': 'electron-1', 'X-Session-Id': 's1'},
+          'query_string': {'session_id': 'q1'}}, 'client:electron-1'),
+        ({'headers': {'X-Session-Id': 's1'}, 'query_string': {'session_id': 'q1'}}, 'client:s1'),
+        ({'query_string': {'session_id': 'q1'}}, 'client:q1'),
+        ({'headers': {'X-Client-Id': 'x' * 100}}, 'client:' + 'x' * 64),
+        ({'environ_base': {'REMOTE_ADDR': '10.0.0.7'}}, 'addr:10.0.0.7')
+    ]
+    for kwargs, expected in cases:
+        with app.test_request_context('/api/ai/chat', **kwargs):
+            assert client_key(request) == expected, (kwargs, client_key(request))
+
+
+@check('sampler_pause')
+def check_sampler_pause():
+    """Остановленный опрос (интервал None) не роняет поток сэмплера (system_sampler.py)"""
+    from system_sampler import SystemSampler
+
+    sampler = SystemSampler(0.05)
+    sampler.cadence.idle_interval = None
+    try:
+        sampler.start()
+        deadline = time.time() + 5
+        while sampler.tick == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        sampler.cadence.set_hidden(True)
+        sampler.wake_event.set()
+        time.sleep(0.2)
+        paused_tick = sampler.tick
+        time.sleep(0.3)
+        assert sampler.thread.is_alive() and sampler.tick == paused_tick
+        assert sampler.cadence.current() == ('hidden', None)
+
+        sampler.cadence.set_hidden(False)
+        sampler.wake_event.set()
+        deadline = time.time() + 5
+        while sampler.tick == paused_tick and time.time() < deadline:
+            time.sleep(0.01)
+        assert sampler.thread.is_alive() and sampler.tick > paused_tick
+    finally:
+        sampler.stop()
+
+
+@check('shared_contexts')
+def check_shared_contexts():
+    """Контексты prefork: хранилища в одном файле не урезают друг друга, бюджет памяти
+    соблюдается (shared_state.py)"""
+    import os
+    import tempfile
+
+    from context_store import estimate_entry_size
+    from shared_state import SharedContextStore, SharedStateDB
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SharedStateDB(os.path.join(directory, 'state.db'))
+        neural = SharedContextStore(db, 'neural_contexts', capacity=10)
+        chat = SharedContextStore(db, 'ai_contexts', capacity=100)
+        for index in range(30):
+            neural.append('s1', {'query': f'n{index}'})
+            chat.append('s1', {'user': f'c{index}'})
+        assert neural.count('s1') == 10 and chat.count('s1') == 30
+        assert [entry['user'] for entry in chat.get('s1', 3)] == ['c27', 'c28', 'c29']
+        neural.clear()
+        assert neural.count('s1') == 0 and chat.count('s1') == 30
+        assert chat.trim(0) == 30 and chat.get_stats()['entries'] == 0
+
+        # Бюджет памяти: вытесняются давно не пополнявшиеся сессии, активная урезается последней
+        entry = {'text': 'x' * 100}
+        size = estimate_entry_size(entry)
+        store = SharedContextStore(db, 'budget', capacity=10, memory_budget=size * 5)
+        for session_id in ('a', 'b', 'c'):
+            store.append(session_id, entry)
+            store.append(session_id, entry)
+        assert store.count('a') == 0 and store.count('b') == 2 and store.count('c') == 2
+        assert store.get_stats()['memory_bytes'] <= size * 5
+        for _ in range(8):
+            store.append('c', entry)
+        assert store.count('b') == 0 and store.count('c') == 5
+        assert store.get_stats()['evictions'] == 2
+
+        huge = SharedContextStore(db, 'huge', memory_budget=size // 2)
+        huge.append('a', entry)
+        huge.append('a', entry)
+        assert huge.count('a') == 1  # последняя запись активной сессии остаётся
+
+
+@check('request_phases')
+def check_request_phases():
+    """Этапы задачи из другого потока попадают в Server-Timing и гистограммы запроса
+    (request_metrics.py)"""
+    import threading
+
+    from request_metrics import RequestMetrics, format_server_timing
+
+    metrics = RequestMetrics()
+    job_phases = {}
+
+    def worker():
+        with metrics.collect_phases(job_phases):
+            with metrics.phase('nlu'):
+                time.sleep(0.002)
+            with metrics.phase('skill'):
+                time.sleep(0.005)
+
+    metrics.begin('POST /chat')
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    metrics.merge_phases(job_phases)
+    phases = metrics.finish(200, 10, 20)
+    metrics.end()
+    assert phases['skill'] >= 5 and phases['nlu'] >= 2, phases
+    assert format_server_timing(phases).startswith('nlu;dur='), phases
+    route = metrics.get_stats()['routes']['POST /chat']
+    assert route['phases_ms']['skill']['count'] == 1 and route['in_flight'] == 0
+
+    # Потоковый ответ: задача завершается после finish, этапы идут только в гистограммы
+    metrics.begin('POST /stream')
+    metrics.finish(200, 0, 0)
+    metrics.end()
+    metrics.merge_phases({'skill': 3.0})
+    route = metrics.get_stats()['routes']['POST /stream']
+    assert route['phases_ms']['skill']['count'] == 1, route
+    assert getattr(metrics.local, 'phases', None) is None
+
+
+@check('asgi_streams')
+def check_asgi_streams():
+    """Открытые потоковые ответы не занимают пул обработчиков, контекст запроса и этапы
+    доступны телу потока из пула ответов (asgi_server.py)"""
+    import asyncio
+    import threading
+
+    from flask import Flask, Response, request, stream_with_context
+
+    from asgi_server import ASGIAdapter
+    from request_metrics import RequestMetrics
+
+    app = Flask(__name__)
+    metrics = RequestMetrics()
+    metrics.install(app)
+    release = threading.Event()
+
+    @app.route('/stream')
+    def stream():
+        def body():
+            yield f"start {request.args['name']}\n"
+            release.wait(5)
+            metrics.merge_phases({'skill': 1.0})
+            yield f"end {request.args['name']}\n"
+        return Response(stream_with_context(body()), mimetype='text/event-stream')
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    adapter = ASGIAdapter(app, workers=1, stream_workers=8)
+
+    async def call(path, query=b''):
+        sent = []
+        done = asyncio.Event()
+
+        async def receive():
+            if not done.is_set():
+                done.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+                 'headers': [], 'http_version': '1.1'}
+        await adapter(scope, receive, send)
+        status = sent[0]['status']
+        return status, b''.join(message.get('body', b'') for message in sent[1:])
+
+    async def scenario():
+        streams = [asyncio.ensure_future(call('/stream', b'name=s%d' % i)) for i in range(4)]
+        # Четыре потока ждут, единственный поток обработчиков свободен для обычных запросов
+        status, content = await asyncio.wait_for(call('/ping'), 2)
+        assert (status, content) == (200, b'pong'), (status, content)
+        assert not any(task.done() for task in streams)
+        release.set()
+        results = await asyncio.wait_for(asyncio.gather(*streams), 5)
+        for i, (status, content) in enumerate(results):
+            assert content == b'start s%d\nend s%d\n' % (i, i), content
+
+    asyncio.run(scenario())
+    route = metrics.get_stats()['routes']['GET /stream']
+    assert route['phases_ms']['skill']['count'] == 4 and route['in_flight'] == 0, route
+
+
+@check('knowledge_search')
+def check_knowledge_search():
+    """MaxScore совпадает с полным подсчётом BM25, индекс переживает правки корпуса
+    и перезагрузку, тексты фрагментов не попадают в файл индекса (knowledge_base.py)"""
+    import heapq
+    import json
+    import math
+    import os
+    import random
+    import tempfile
+
+    from knowledge_base import KnowledgeBase
+
+    random.seed(5)
+    vocab = [f'term{i}' for i in range(200)]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+
+    def write(path, count):
+        items = [{'question': ' '.join(random.choices(vocab[:40], k=3)),
+                  'answer': ' '.join(random.choices(vocab, weights, k=random.randint(5, 30)))}
+                 for _ in range(count)]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+
+    def exhaustive(kb, terms, top_k):
+        snapshot, scores = kb.snapshot, {}
+        for term in set(terms):
+            ids, tfs = snapshot.postings.get(term, ((), ()))
+            idf = math.log(1 + (snapshot.doc_count - len(ids) + 0.5) / (len(ids) + 0.5))
+            for doc_id, tf in zip(ids, tfs):
+                scores[doc_id] = scores.get(doc_id, 0.0) + \
+                    idf * tf * (kb.k1 + 1) / (tf + snapshot.norms[doc_id])
+        return [round(score, 9) for _, score in
+                heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])]
+
+    def compare(kb):
+        for _ in range(200):
+            terms = random.choices(vocab, k=random.randint(1, 5))
+            top_k = random.choice([1, 3, 10])
+            found = [round(score, 9) for _, score in kb.snapshot.top(terms, top_k)]
+            assert found == exhaustive(kb, terms, top_k), terms
+
+    with tempfile.TemporaryDirectory() as root:
+        corpus = os.path.join(root, 'corpus')
+        os.makedirs(corpus)
+        for i in range(3):
+            write(os.path.join(corpus, f'faq{i}.json'), 300)
+        paths = (corpus, os.path.join(root, 'index.bin'), os.path.join(root, 'passages.db'))
+        kb = KnowledgeBase(*paths)
+        assert kb.load()['added'] == 900
+        compare(kb)
+
+        write(os.path.join(corpus, 'faq0.json'), 100)
+        os.remove(os.path.join(corpus, 'faq1.json'))
+        assert kb.refresh() == {'added': 100, 'removed': 600, 'files_changed': 2}
+        kb.save_index()
+        compare(kb)
+
+        query = ' '.join(vocab[10:14])
+        reloaded = KnowledgeBase(*paths)
+        assert reloaded.load()['files_changed'] == 0
+        assert reloaded.get_stats()['passages'] == 400
+        assert reloaded.search(query) == kb.search(query) != []
+        with open(paths[1], 'rb') as f:
+            assert kb.search(query)[0]['text'].encode('utf-8') not in f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Самопроверка алгоритмов Raven AI')
+    parser.add_argument('--only', help='проверки через запятую: ' + ', '.join(CHECKS))
+    args = parser.parse_args()
+
+    selected = args.only.split(',') if args.only else list(CHECKS)
+    unknown = set(selected) - set(CHECKS)
+    if unknown:
+        parser.error(f"неизвестные проверки: {', '.join(sorted(unknown))}")
+
+    failed = []
+    for name in selected:
+        start = time.perf_counter()
+        try:
+            CHECKS[name]()
+        except Exception:
+            failed.append(name)
+            print(f"❌ {name}")
+            traceback.print_exc()
+            continue
+        print(f"✅ {name} ({(time.perf_counter() - start) * 1000:.0f} мс)")
+
+    if failed:
+        print(f"\n❌ Не прошли: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n✅ Все проверки пройдены: {len(selected)}")
+
+
+if __name__ == '__main__':
+    main()
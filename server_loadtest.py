@@ -0,0 +1,322 @@
+"""
+Нагрузочное сравнение режимов сервера: Werkzeug (threaded) и asyncio (async)
+
+Использование:
+    python server_loadtest.py                      # оба режима, сводная таблица
+    python server_loadtest.py --modes async --connections 200 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+HOST = '127.0.0.1'
+BASE_PORT = 5100
+UNLIMITED_POLICY = {'concurrency': None, 'client_rate': None, 'route_rate': None, 'shed_level': None}
+
+
+def run_server(mode: str, port: int, admission: bool = False):
+    """Дочерний процесс: python_api в выбранном режиме без журнала запросов"""
+    import logging
+
+    os.environ.setdefault('RAVEN_STARTUP', 'lazy')
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    import python_api
+
+    if not admission:
+        # Все соединения теста - один клиент: лимиты допуска сравнивали бы отказы, а не режимы
+        from admission import get_admission_controller
+        controller = get_admission_controller()
+        controller.policies = {name: dict(UNLIMITED_POLICY) for name in controller.policies}
+
+    if mode == 'async':
+        from asgi_server import serve
+        serve(python_api.app, host=HOST, port=port)
+    else:
+        from werkzeug.serving import make_server
+        make_server(HOST, port, python_api.app, threaded=True).serve_forever()
+
+
+async def read_response(reader: asyncio.StreamReader, keep_body: bool = False) -> Dict[str, Any]:
+    """Разбор ответа HTTP/1.1: Content-Length, chunked или до закрытия
+    (keep_body - сохранить тело для проверки содержимого)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head[:-4].split(b'\r\n')
+    status = int(lines[0].split(b' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    first_byte = None
+    size = 0
+    parts = []
+    if b'content-length' in headers:
+        length = int(headers[b'content-length'])
+        data = await reader.readexactly(length)
+        size = len(data)
+        parts.append(data)
+        first_byte = time.perf_counter()
+    elif headers.get(b'transfer-encoding') == b'chunked':
+        while True:
+            size_line = await reader.readline()
+            if not size_line.endswith(b'\r\n'):
+                # Соединение закрыто без завершающей части: ответ оборван
+                raise asyncio.IncompleteReadError(size_line, None)
+            chunk_size = int(size_line.strip(), 16)
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            if chunk_size == 0:
+                await reader.readuntil(b'\r\n')
+                break
+            data = await reader.readexactly(chunk_size + 2)
+            size += len(data) - 2
+            parts.append(data[:-2])
+    else:
+        while True:
+            data = await reader.read(65536)
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            if not data:
+                break
+            size += len(data)
+            parts.append(data)
+    framed = b'content-length' in headers or headers.get(b'transfer-encoding') == b'chunked'
+    keep_alive = framed and headers.get(b'connection') != b'close'
+    return {'status': status, 'size': size, 'first_byte': first_byte, 'keep_alive': keep_alive,
+            'body': b''.join(parts) if keep_body else None}
+
+
+def build_request(method: str, path: str, body: Optional[Dict] = None) -> bytes:
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {HOST}", "Connection: keep-alive"]
+    if body is not None:
+        lines.append('Content-Type: application/json')
+    lines.append(f"Content-Length: {len(payload)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + payload
+
+
+class Client:
+    """Соединение keep-alive, переоткрывается, если сервер его закрыл"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None,
+                      keep_body: bool = False) -> Dict[str, Any]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+        start = time.perf_counter()
+        self.writer.write(build_request(method, path, body))
+        await self.writer.drain()
+        response = await read_response(self.reader, keep_body)
+        response['latency'] = time.perf_counter() - start
+        response['ttfb'] = (response['first_byte'] or time.perf_counter()) - start
+        if not response['keep_alive']:
+            self.close()
+        return response
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Перцентили задержки (мс) и пропускная способность"""
+    ordered = sorted(latencies)
+
+    def pick(percent):
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] * 1000, 2)
+
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': pick(50),
+        'p95_ms': pick(95),
+        'p99_ms': pick(99),
+        'max_ms': round(ordered[-1] * 1000, 2) if ordered else None
+    }
+
+
+async def scenario_poll(port: int, connections: int, requests: int) -> Dict[str, Any]:
+    """Опрос /api/health по keep-alive соединениям (как app.js)"""
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        client = Client(port)
+        for _ in range(requests):
+            try:
+                response = await client.request('GET', '/api/health')
+                if response['status'] != 200:
+                    errors += 1
+                latencies.append(response['latency'])
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                client.close()
+        client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def stream_problem(response: Dict[str, Any]) -> Optional[str]:
+    """Причина, по которой SSE поток считается неудачным; None - поток полный"""
+    if response['status'] != 200:
+        return f"status {response['status']}"
+    body = response['body'] or b''
+    if b'event: error' in body:
+        return 'event: error'
+    # Полный поток заканчивается событием done (streaming.py)
+    if b'event: done' not in body or not body.endswith(b'\n\n'):
+        return 'truncated'
+    return None
+
+
+async def scenario_stream(port: int, streams: int, concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """SSE потоки /api/ai/chat/stream, не больше concurrency одновременно (None - все сразу);
+    ошибка - код, обрыв или event: error"""
+    latencies, first_bytes, errors = [], [], 0
+    problems: Dict[str, int] = {}
+
+    async def worker(index):
+        nonlocal errors
+        client = Client(port)
+        try:
+            response = await client.request('POST', '/api/ai/chat/stream',
+                                             {'message': f'привет {index}', 'session_id': f'load-{index}'},
+                                             keep_body=True)
+            problem = stream_problem(response)
+            latencies.append(response['latency'])
+            first_bytes.append(response['ttfb'])
+        except (OSError, asyncio.IncompleteReadError) as e:
+            problem = type(e).__name__
+        finally:
+            client.close()
+        if problem is not None:
+            errors += 1
+            problems[problem] = problems.get(problem, 0) + 1
+
+    slots = asyncio.Semaphore(concurrency or streams)
+
+    async def limited(index):
+        async with slots:
+            await worker(index)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(streams)))
+    result = summarize(latencies, errors, time.perf_counter() - start)
+    ordered = sorted(first_bytes)
+    result['ttfb_p95_ms'] = round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 2) if ordered else None
+    result['problems'] = problems
+    return result
+
+
+async def scenario_idle(port: int, idle: int, requests: int) -> Dict[str, Any]:
+    """Опрос при большом числе простаивающих keep-alive соединений"""
+    idle_clients = []
+    for _ in range(idle):
+        client = Client(port)
+        try:
+            await client.request('GET', '/api/health')
+            idle_clients.append(client)
+        except OSError:
+            break
+    result = await scenario_poll(port, 10, requests)
+    result['idle_connections'] = len(idle_clients)
+    for client in idle_clients:
+        client.close()
+    return result
+
+
+async def wait_ready(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            client = Client(port)
+            await client.request('GET', '/api/health')
+            client.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Сервер на порту {port} не запустился")
+
+
+async def run_mode(port: int, args) -> Dict[str, Any]:
+    await wait_ready(port)
+    return {
+        # Последовательные потоки первыми: каждый попадает на ещё не работавший поток пула
+        'serial': await scenario_stream(port, 20, concurrency=1),
+        'poll': await scenario_poll(port, args.connections, args.requests),
+        'stream': await scenario_stream(port, args.streams),
+        'idle': await scenario_idle(port, args.idle, args.requests)
+    }
+
+
+def print_table(results: Dict[str, Dict[str, Any]]):
+    columns = ('requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+    print(f"\n{'режим':<10}{'сценарий':<10}" + ''.join(f"{name:>16}" for name in columns))
+    for mode, scenarios in results.items():
+        for name, stats in scenarios.items():
+            print(f"{mode:<10}{name:<10}" + ''.join(f"{str(stats.get(col)):>16}" for col in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение режимов сервера Raven AI под нагрузкой')
+    parser.add_argument('--modes', default='threaded,async')
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--streams', type=int, default=100)
+    parser.add_argument('--idle', type=int, default=300)
+    parser.add_argument('--json', dest='json_path')
+    parser.add_argument('--admission', action='store_true',
+                        help='оставить лимиты контроля допуска (admission.py)')
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=BASE_PORT, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        run_server(args.serve, args.port, args.admission)
+        return
+
+    results = {}
+    for offset, mode in enumerate(args.modes.split(',')):
+        port = BASE_PORT + offset
+        command = [sys.executable, __file__, '--serve', mode, '--port', str(port)]
+        if args.admission:
+            command.append('--admission')
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            print(f"⏱️ Режим {mode}...")
+            results[mode] = asyncio.run(run_mode(port, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_table(results)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты: {args.json_path}")
+
+    broken = [(mode, name, scenarios[name]['problems']) for mode, scenarios in results.items()
+              for name in ('serial', 'stream') if scenarios[name]['errors']]
+    if broken:
+        for mode, name, problems in broken:
+            print(f"❌ {mode} {name}: неполные SSE потоки {problems}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Снимок системных метрик в multiprocessing.shared_memory: один писатель (сэмплер),
+читатели в процессах-обработчиках без блокировок (seqlock)
+"""
+import math
+import struct
+import threading
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional
+
+from cadence import MODES
+
+# Счётчик версии: нечётный - идёт запись, чётный - снимок согласован
+SEQ = struct.Struct('<Q')
+
+# Фиксированная раскладка снимка (little-endian, без выравнивания)
+LAYOUT = struct.Struct(
+    '<Q d d'        # tick, sampled_at, sample_ms
+    ' d q d'        # cpu: percent, cores, frequency (NaN - неизвестна)
+    ' d Q Q Q'      # ram: percent, total, used, free
+    ' d Q Q Q'      # disk: percent, total, used, free
+    ' Q Q Q'        # network: bytes_sent, bytes_recv; processes
+    ' Q Q Q'        # backend: rss, threads, processes
+    ' d B'          # cadence: interval (NaN - опрос остановлен), код режима
+)
+# После снимка - время последнего чтения обработчиками: спрос для интервала сэмплера.
+# Пишется без seqlock: разорванное значение лишь сдвинет момент перехода в простой
+DEMAND = struct.Struct('<d')
+DEMAND_OFFSET = SEQ.size + LAYOUT.size
+SEGMENT_SIZE = DEMAND_OFFSET + DEMAND.size
+READ_RETRIES = 1000
+
+
+def pack_snapshot(snapshot: Dict[str, Any], tick: int, sample_ms: float) -> tuple:
+    """Снимок SystemSampler -> значения раскладки"""
+    cpu, ram, disk = snapshot['cpu'], snapshot['ram'], snapshot['disk']
+    network, backend = snapshot['network'], snapshot['backend']
+    frequency = cpu['frequency']
+    cadence = snapshot.get('cadence') or {'mode': 'normal', 'interval': None}
+    return (
+        tick, snapshot['sampled_at'], sample_ms,
+        cpu['percent'], cpu['cores'] or 0, float('nan') if frequency is None else frequency,
+        ram['percent'], ram['total'], ram['used'], ram['free'],
+        disk['percent'], disk['total'], disk['used'], disk['free'],
+        network['bytes_sent'], network['bytes_recv'], snapshot['processes'],
+        backend['rss'], backend['threads'], backend.get('processes', 1),
+        float('nan') if cadence['interval'] is None else cadence['interval'],
+        MODES.index(cadence['mode'])
+    )
+
+
+def unpack_snapshot(values: tuple) -> Dict[str, Any]:
+    """Значения раскладки -> снимок в формате SystemSampler"""
+    (tick, sampled_at, sample_ms, cpu_percent, cores, frequency,
+     ram_percent, ram_total, ram_used, ram_free,
+     disk_percent, disk_total, disk_used, disk_free,
+     bytes_sent, bytes_recv, processes, rss, threads, backend_processes,
+     interval, mode) = values
+    return {
+        'cpu': {
+            'percent': cpu_percent,
+            'cores': cores or None,
+            'frequency': None if math.isnan(frequency) else frequency
+        },
+        'ram': {'percent': ram_percent, 'total': ram_total, 'used': ram_used, 'free': ram_free},
+        'disk': {'percent': disk_percent, 'total': disk_total, 'used': disk_used, 'free': disk_free},
+        'network': {'bytes_sent': bytes_sent, 'bytes_recv': bytes_recv},
+        'processes': processes,
+        'backend': {'rss': rss, 'threads': threads, 'processes': backend_processes},
+        'cadence': {'mode': MODES[mode], 'interval': None if math.isnan(interval) else interval},
+        'sampled_at': sampled_at,
+        'timestamp': datetime.fromtimestamp(sampled_at).isoformat()
+    }
+
+
+def attach_segment(name: str, untrack: bool = True) -> shared_memory.SharedMemory:
+    """Подключение к существующему сегменту без передачи владения"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # До Python 3.13 подключение регистрирует сегмент в resource_tracker, и он удалил бы
+        # сегмент при выходе процесса. Дочерние процессы multiprocessing делят трекер
+        # с владельцем - там регистрация повторная и снимать её нельзя (untrack=False)
+        segment = shared_memory.SharedMemory(name=name)
+        if untrack:
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(segment._name, 'shared_memory')
+            except Exception:
+                pass
+        return segment
+
+
+class SharedSnapshotWriter:
+    """Писатель снимков (единственный, в процессе сэмплера)"""
+
+    def __init__(self):
+        self.segment = shared_memory.SharedMemory(create=True, size=SEGMENT_SIZE)
+        self.buffer = self.segment.buf
+        self.seq = 0
+        SEQ.pack_into(self.buffer, 0, 0)
+        DEMAND.pack_into(self.buffer, DEMAND_OFFSET, 0.0)
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    def last_demand(self) -> float:
+        """Время последнего чтения снимка обработчиками"""
+        return DEMAND.unpack_from(self.buffer, DEMAND_OFFSET)[0] if self.buffer is not None else 0.0
+
+    def publish(self, snapshot: Dict[str, Any], tick: int, sample_ms: float):
+        """Запись снимка: версия нечётная на время записи"""
+        values = pack_snapshot(snapshot, tick, sample_ms)
+        self.seq += 1
+        SEQ.pack_into(self.buffer, 0, self.seq)
+        LAYOUT.pack_into(self.buffer, SEQ.size, *values)
+        self.seq += 1
+        SEQ.pack_into(self.buffer, 0, self.seq)
+
+    def close(self):
+        """Закрытие и удаление сегмента"""
+        self.buffer = None
+        self.segment.close()
+        try:
+            self.segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedSnapshotReader:
+    """Читатель с интерфейсом SystemSampler (get_snapshot, tick, get_stats)"""
+
+    def __init__(self, name: str, untrack: bool = True):
+        self.segment = attach_segment(name, untrack)
+        self.buffer = self.segment.buf
+        self.cached_seq = None
+        self.cached = None
+        self.sample_ms = 0.0
+        self.retries = 0
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    @property
+    def tick(self) -> int:
+        """Номер опубликованного снимка (растёт с каждой записью)"""
+        return SEQ.unpack_from(self.buffer, 0)[0] // 2
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Согласованный снимок: повтор, если запись шла во время чтения"""
+        for _ in range(READ_RETRIES):
+            before = SEQ.unpack_from(self.buffer, 0)[0]
+            if before == 0:
+                return None  # сэмплер ещё ничего не опубликовал
+            if before & 1:
+                self.retries += 1
+                time.sleep(0)
+                continue
+            if before == self.cached_seq:
+                return self.cached
+            values = LAYOUT.unpack_from(self.buffer, SEQ.size)
+            if SEQ.unpack_from(self.buffer, 0)[0] != before:
+                self.retries += 1
+                continue
+            snapshot = unpack_snapshot(values)
+            self.cached_seq, self.cached = before, snapshot
+            self.sample_ms = values[2]
+            self._notify(snapshot)
+            return snapshot
+        return self.cached
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Последний снимок; до первой публикации ждёт сэмплер. Чтение отмечается как спрос"""
+        DEMAND.pack_into(self.buffer, DEMAND_OFFSET, time.time())
+        snapshot = self.read()
+        deadline = time.time() + 5.0
+        while snapshot is None and time.time() < deadline:
+            time.sleep(0.01)
+            snapshot = self.read()
+        if snapshot is None:
+            raise RuntimeError('Сэмплер не опубликовал снимок метрик')
+        return snapshot
+
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]):
+        """Вызов listener(snapshot), когда читатель видит новый снимок"""
+        with self.lock:
+            self.listeners.append(listener)
+
+    def _notify(self, snapshot: Dict[str, Any]):
+        for listener in list(self.listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"⚠️ Ошибка подписчика сэмплера: {e}")
+
+    def start(self):
+        """Сэмплер работает в отдельном процессе"""
+
+    def stop(self):
+        """Сэмплер работает в отдельном процессе"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self.read()
+        cadence = snapshot['cadence'] if snapshot else None
+        return {
+            'interval_seconds': cadence and cadence['interval'],
+            'shared_segment': self.segment.name,
+            'tick': self.tick,
+            'last_sample_ms': round(self.sample_ms, 2),
+            'read_retries': self.retries,
+            'running': True,
+            'cadence': cadence
+        }
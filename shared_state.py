@@ -0,0 +1,267 @@
+"""
+Состояние навыков, общее для процессов-обработчиков prefork: контексты сессий и задачи навыков
+в одном файле SQLite (WAL)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from context_store import DEFAULT_SESSION, SessionContextStore, estimate_entry_size
+
+# Путь задаёт главный процесс prefork; без него состояние живёт в памяти процесса
+SHARED_STATE_ENV = 'RAVEN_SHARED_STATE'
+TRIM_EVERY = 200  # вытеснение простаивающих сессий раз в N добавлений
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_context (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    bytes INTEGER NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_context ON session_context (namespace, session_id, id);
+CREATE TABLE IF NOT EXISTS skill_jobs (
+    job_id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    job TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_skill_jobs_ts ON skill_jobs (ts);
+"""
+
+
+def shared_state_path() -> Optional[str]:
+    return os.environ.get(SHARED_STATE_ENV) or None
+
+
+class SharedStateDB:
+    """Соединения SQLite по потокам к общему файлу состояния"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.connection().executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+
+class SharedContextStore:
+    """Контексты сессий в SQLite: интерфейс SessionContextStore для нескольких процессов.
+    Каждое хранилище работает в своём namespace: ёмкость, число сессий и бюджет памяти
+    считаются отдельно, и хранилища не урезают записи друг друга"""
+
+    def __init__(self, db: SharedStateDB, namespace: str, capacity: int = 10,
+                 max_sessions: int = 256, idle_timeout: float = 1800,
+                 memory_budget: int = 8 * 1024 * 1024):
+        self.db = db
+        self.namespace = namespace
+        self.capacity = capacity
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_budget = memory_budget
+        self.appends = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def append(self, session_id: Optional[str], entry: Dict[str, Any]):
+        """Добавление записи; в сессии остаются последние capacity записей,
+        сверх бюджета памяти вытесняются давно не пополнявшиеся сессии"""
+        session_id = session_id or DEFAULT_SESSION
+        conn = self.db.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT INTO session_context (namespace, session_id, ts, bytes, entry)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (self.namespace, session_id, time.time(), estimate_entry_size(entry),
+                 json.dumps(entry, ensure_ascii=False, default=str))
+            )
+            conn.execute(
+                'DELETE FROM session_context WHERE namespace = ? AND session_id = ? AND id <= ('
+                ' SELECT id FROM session_context WHERE namespace = ? AND session_id = ?'
+                ' ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                (self.namespace, session_id, self.namespace, session_id, self.capacity)
+            )
+            evicted = self._enforce_budget(conn, session_id)
+        with self.lock:
+            self.appends += 1
+            self.evictions += evicted
+            trim = self.appends % TRIM_EVERY == 0
+        if trim:
+            self.trim()
+
+    def _enforce_budget(self, conn: sqlite3.Connection, keep: str) -> int:
+        """Вытеснение сессий сверх memory_budget, активная урезается последней
+        (вызывать в транзакции); возвращает число вытесненных сессий"""
+        total = conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM session_context'
+                             ' WHERE namespace = ?', (self.namespace,)).fetchone()[0]
+        if total <= self.memory_budget:
+            return 0
+        evicted = 0
+        sessions = conn.execute(
+            'SELECT session_id, SUM(bytes) FROM session_context WHERE namespace = ?'
+            ' AND session_id != ? GROUP BY session_id ORDER BY MAX(id)',
+            (self.namespace, keep)
+        ).fetchall()
+        for session_id, size in sessions:
+            if total <= self.memory_budget:
+                return evicted
+            conn.execute('DELETE FROM session_context WHERE namespace = ? AND session_id = ?',
+                         (self.namespace, session_id))
+            total -= size
+            evicted += 1
+
+        # Остаётся только активная сессия: урезаем её историю, последняя запись сохраняется
+        rows = conn.execute(
+            'SELECT id, bytes FROM session_context WHERE namespace = ? AND session_id = ?'
+            ' ORDER BY id', (self.namespace, keep)
+        ).fetchall()
+        for row_id, size in rows[:-1]:
+            if total <= self.memory_budget:
+                break
+            conn.execute('DELETE FROM session_context WHERE id = ?', (row_id,))
+            total -= size
+        return evicted
+
+    def trim(self, budget: Optional[int] = None) -> int:
+        """Удаление простаивающих сессий и самых старых сверх budget (или max_sessions);
+        возвращает число удалённых записей"""
+        limit = self.max_sessions if budget is None else min(budget, self.max_sessions)
+        conn = self.db.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            removed = conn.execute(
+                'DELETE FROM session_context WHERE namespace = ? AND session_id IN ('
+                ' SELECT session_id FROM session_context WHERE namespace = ?'
+                ' GROUP BY session_id HAVING MAX(ts) < ?)',
+                (self.namespace, self.namespace, time.time() - self.idle_timeout)
+            ).rowcount
+            removed += conn.execute(
+                'DELETE FROM session_context WHERE namespace = ? AND session_id IN ('
+                ' SELECT session_id FROM session_context WHERE namespace = ?'
+                ' GROUP BY session_id ORDER BY MAX(id) DESC LIMIT -1 OFFSET ?)',
+                (self.namespace, self.namespace, limit)
+            ).rowcount
+        return removed
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Размер для диагностики памяти (записи лежат в общем файле, не в процессе)"""
+        stats = self.get_stats()
+        return {'entries': stats['sessions'], 'rows': stats['entries'],
+                'bytes': stats['memory_bytes'], 'shared': stats['shared']}
+
+    def get(self, session_id: Optional[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Контекст сессии, от старых записей к новым"""
+        count = limit if limit is not None and limit > 0 else self.capacity
+        rows = self.db.connection().execute(
+            'SELECT entry FROM session_context WHERE namespace = ? AND session_id = ?'
+            ' ORDER BY id DESC LIMIT ?',
+            (self.namespace, session_id or DEFAULT_SESSION, count)
+        ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def count(self, session_id: Optional[str]) -> int:
+        row = self.db.connection().execute(
+            'SELECT COUNT(*) FROM session_context WHERE namespace = ? AND session_id = ?',
+            (self.namespace, session_id or DEFAULT_SESSION)
+        ).fetchone()
+        return row[0]
+
+    def clear(self, session_id: Optional[str] = None):
+        """Очистка одной сессии или всех"""
+        conn = self.db.connection()
+        if session_id is None:
+            conn.execute('DELETE FROM session_context WHERE namespace = ?', (self.namespace,))
+        else:
+            conn.execute('DELETE FROM session_context WHERE namespace = ? AND session_id = ?',
+                         (self.namespace, session_id))
+
+    def get_stats(self) -> Dict[str, Any]:
+        row = self.db.connection().execute(
+            'SELECT COUNT(DISTINCT session_id), COUNT(*), COALESCE(SUM(bytes), 0)'
+            ' FROM session_context WHERE namespace = ?', (self.namespace,)
+        ).fetchone()
+        with self.lock:
+            evictions = self.evictions
+        return {
+            'namespace': self.namespace,
+            'sessions': row[0],
+            'entries': row[1],
+            'capacity_per_session': self.capacity,
+            'max_sessions': self.max_sessions,
+            'memory_bytes': row[2],
+            'memory_budget': self.memory_budget,
+            'evictions': evictions,
+            'shared': self.db.db_path
+        }
+
+
+class SharedJobBoard:
+    """Состояния задач навыков, видимые всем обработчикам"""
+
+    def __init__(self, db: SharedStateDB, max_jobs_kept: int = 1000):
+        self.db = db
+        self.max_jobs_kept = max_jobs_kept
+        self.puts = 0
+        self.lock = threading.Lock()
+
+    def put(self, job: Dict[str, Any]):
+        """Запись текущего состояния задачи"""
+        conn = self.db.connection()
+        conn.execute('INSERT OR REPLACE INTO skill_jobs (job_id, ts, job) VALUES (?, ?, ?)',
+                     (job['job_id'], time.time(), json.dumps(job, ensure_ascii=False, default=str)))
+        with self.lock:
+            self.puts += 1
+            trim = self.puts % TRIM_EVERY == 0
+        if trim:
+            conn.execute('DELETE FROM skill_jobs WHERE job_id IN ('
+                         ' SELECT job_id FROM skill_jobs ORDER BY ts DESC LIMIT -1 OFFSET ?)',
+                         (self.max_jobs_kept,))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.connection().execute(
+            'SELECT job FROM skill_jobs WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+_default_db = None
+_default_lock = threading.Lock()
+
+
+def get_shared_state() -> Optional[SharedStateDB]:
+    """Общий файл состояния или None вне режима prefork"""
+    global _default_db
+    path = shared_state_path()
+    if path is None:
+        return None
+    with _default_lock:
+        if _default_db is None:
+            _default_db = SharedStateDB(path)
+        return _default_db
+
+
+def create_context_store(namespace: str, capacity: int = 10):
+    """Хранилище контекстов: общее в режиме prefork (в своём namespace), иначе в памяти процесса"""
+    db = get_shared_state()
+    if db is None:
+        return SessionContextStore(capacity=capacity)
+    return SharedContextStore(db, namespace, capacity=capacity)
+
+
+def get_job_board() -> Optional[SharedJobBoard]:
+    """Общая доска задач навыков или None вне режима prefork"""
+    db = get_shared_state()
+    return SharedJobBoard(db) if db is not None else None
@@ -0,0 +1,111 @@
+"""
+Объединение одинаковых одновременных запросов (single-flight)
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+def make_key(route: str, payload: Any) -> str:
+    """Ключ запроса: маршрут + хэш нормализованного payload"""
+    normalized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    return f"{route}:{digest}"
+
+
+class StreamKey:
+    """Ключ make_key(route, text) для текста, приходящего по частям: JSON-экранирование
+    посимвольное, поэтому хэш частей совпадает с хэшем всего текста"""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.digest = hashlib.sha1(b'"')
+
+    def update(self, text: str):
+        self.digest.update(json.dumps(text, ensure_ascii=False)[1:-1].encode('utf-8'))
+
+    def key(self) -> str:
+        digest = self.digest.copy()
+        digest.update(b'"')
+        return f"{self.route}:{digest.hexdigest()}"
+
+
+class _Call:
+    """Вычисление, выполняющееся в данный момент"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Одновременные запросы с одинаковым ключом ждут одно вычисление"""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def _route_stats(self, key: str) -> Dict[str, int]:
+        """Счётчики для маршрута ключа (вызывать под lock)"""
+        route = key.split(':', 1)[0]
+        stats = self.stats.get(route)
+        if stats is None:
+            stats = self.stats[route] = {'requests': 0, 'executions': 0, 'coalesced': 0}
+        return stats
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Результат func() и признак того, что он получен от чужого вычисления"""
+        with self.lock:
+            stats = self._route_stats(key)
+            stats['requests'] += 1
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self.calls[key] = _Call()
+                stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика объединения по маршрутам"""
+        with self.lock:
+            return {
+                'in_flight': len(self.calls),
+                'routes': {route: dict(stats) for route, stats in self.stats.items()}
+            }
+
+
+_default_single_flight = None
+_default_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Общий объединитель запросов для всех API модулей"""
+    global _default_single_flight
+    with _default_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
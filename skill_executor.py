@@ -0,0 +1,366 @@
+"""
+Исполнитель навыков с побочными эффектами (запуск приложений, браузер, процессы)
+"""
+import queue
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+from shared_state import get_job_board
+
+# Таймауты по умолчанию для навыков (секунды)
+DEFAULT_SKILL_TIMEOUTS = {
+    'launch_app': 10.0,
+    'open_url': 5.0,
+    'close_app': 15.0,
+    'default': 20.0
+}
+
+# Сколько ждать выхода запущенного процесса, чтобы заметить ошибку запуска
+LAUNCH_CHECK_SECONDS = 1.0
+# Сколько ждать завершения процесса после terminate() перед kill()
+TERMINATE_WAIT_SECONDS = 5.0
+# Сторож проверяет сроки задач не реже этого интервала
+WATCHDOG_INTERVAL = 1.0
+
+
+class SkillJob:
+    """Задача навыка, выполняемая рабочим потоком исполнителя"""
+
+    def __init__(self, skill: str, timeout: float):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.skill = skill
+        self.timeout = timeout
+        self.status = 'queued'  # queued, running, done, error, timeout, rejected
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Поток, выполняющий задачу, процессы, запущенные ею, и занятое место в очереди
+        self.thread = None
+        self.processes: List[subprocess.Popen] = []
+        self.holds_slot = False
+
+    def deadline(self) -> float:
+        """Срок задачи: таймаут от запуска, для ожидающей в очереди - от постановки"""
+        return (self.started_at or self.created_at) + self.timeout
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация задачи для API"""
+        return {
+            'job_id': self.job_id,
+            'skill': self.skill,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'timeout': self.timeout,
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'duration_ms': round((self.finished_at - self.started_at) * 1000, 1)
+            if self.started_at and self.finished_at else None
+        }
+
+
+def kill_process_tree(proc: subprocess.Popen):
+    """Принудительное завершение процесса и его потомков (shell=True запускает оболочку)"""
+    try:
+        children = psutil.Process(proc.pid).children(recursive=True)
+    except psutil.Error:
+        children = []
+    for child in children:
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+    try:
+        proc.kill()
+        proc.wait(timeout=TERMINATE_WAIT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def terminate_process(proc: psutil.Process, wait: float = TERMINATE_WAIT_SECONDS) -> bool:
+    """terminate() с ограниченным ожиданием, затем kill(); True, если пришлось убить"""
+    proc.terminate()
+    try:
+        proc.wait(timeout=wait)
+        return False
+    except psutil.TimeoutExpired:
+        proc.kill()
+        return True
+
+
+class SkillExecutor:
+    """Ограниченный набор рабочих потоков для навыков с таймаутами
+
+    Сторож снимает задачу по сроку сам, не дожидаясь опроса: освобождает место в очереди,
+    убивает запущенные задачей процессы, а вместо зависшего потока запускает новый -
+    зависший поток завершится, когда функция навыка всё-таки вернёт управление.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 32,
+                 timeouts: Optional[Dict[str, float]] = None, max_jobs_kept: int = 200,
+                 max_abandoned: Optional[int] = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeouts = dict(DEFAULT_SKILL_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.max_jobs_kept = max_jobs_kept
+        # Предел брошенных потоков: дальше зависшие навыки уменьшают число рабочих
+        self.max_abandoned = max_abandoned if max_abandoned is not None else max_workers * 4
+
+        self.tasks = queue.Queue()
+        self.workers = set()
+        self.abandoned = set()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.expired = 0
+        self.running = True
+        self.watchdog = None
+        self.wake = threading.Event()
+        self._local = threading.local()
+        # В режиме prefork задачу могут запросить у другого процесса-обработчика
+        self.board = get_job_board()
+
+    def submit(self, skill: str, func: Callable, *args, **kwargs) -> SkillJob:
+        """Постановка навыка в очередь, возвращает задачу сразу"""
+        job = SkillJob(skill, self.timeouts.get(skill, self.timeouts['default']))
+
+        with self.lock:
+            self._trim_jobs()
+            self.jobs[job.job_id] = job
+            if self.pending >= self.max_pending:
+                job.status = 'rejected'
+                job.error = 'Очередь навыков переполнена'
+                job.finished_at = time.time()
+            else:
+                self.pending += 1
+                job.holds_slot = True
+                self._start_threads()
+
+        self._publish(job)
+        if job.status == 'queued':
+            self.tasks.put((job, func, args, kwargs))
+            self.wake.set()
+        return job
+
+    def _start_threads(self):
+        """Рабочие потоки до max_workers и сторож (вызывать под lock)"""
+        while self.running and len(self.workers) < self.max_workers:
+            thread = threading.Thread(target=self._worker, daemon=True,
+                                      name=f'raven-skill-{uuid.uuid4().hex[:4]}')
+            self.workers.add(thread)
+            thread.start()
+        if self.watchdog is None:
+            self.watchdog = threading.Thread(target=self._watch, daemon=True,
+                                             name='raven-skill-watchdog')
+            self.watchdog.start()
+
+    def _publish(self, job: SkillJob):
+        """Запись состояния задачи на общую доску (только в режиме prefork)"""
+        if self.board is None:
+            return
+        try:
+            self.board.put(job.to_dict())
+        except Exception as e:
+            print(f"⚠️ Не удалось опубликовать задачу {job.job_id}: {e}")
+
+    def _release(self, job: SkillJob):
+        """Освобождение места задачи в очереди (вызывать под lock)"""
+        if job.holds_slot:
+            job.holds_slot = False
+            self.pending -= 1
+
+    def _worker(self):
+        """Рабочий поток: задачи из очереди, пока поток не брошен сторожем"""
+        me = threading.current_thread()
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            self._run(*task)
+            with self.lock:
+                if me in self.abandoned:
+                    # Вместо этого потока уже работает новый
+                    self.abandoned.discard(me)
+                    return
+        with self.lock:
+            self.workers.discard(me)
+
+    def _run(self, job: SkillJob, func: Callable, args, kwargs):
+        """Выполнение задачи в рабочем потоке"""
+        with self.lock:
+            if job.status != 'queued':
+                # Задача просрочена ещё в очереди, место уже освобождено сторожем
+                return
+            job.started_at = time.time()
+            job.status = 'running'
+            job.thread = threading.current_thread()
+        self.wake.set()
+        self._local.job = job
+        try:
+            result = func(*args, **kwargs)
+            with self.lock:
+                finished = job.status == 'running'
+                if finished:
+                    job.result = result
+                    job.status = 'done'
+        except Exception as e:
+            with self.lock:
+                finished = job.status == 'running'
+                if finished:
+                    job.error = str(e)
+                    job.status = 'error'
+        finally:
+            self._local.job = None
+        if not finished:
+            # Задачу уже снял сторож: итог опоздал и не публикуется
+            return
+        with self.lock:
+            job.finished_at = time.time()
+            # Запущенные приложения продолжают работать после успешного навыка
+            job.processes = []
+            self._release(job)
+        self._publish(job)
+
+    def launch(self, args, check_seconds: float = LAUNCH_CHECK_SECONDS,
+               **popen_kwargs) -> subprocess.Popen:
+        """Запуск процесса из навыка: выход с ошибкой за check_seconds - исключение (0 - без
+        проверки); процесс привязан к задаче и будет убит, если сторож снимет её по таймауту"""
+        proc = subprocess.Popen(args, **popen_kwargs)
+        job = getattr(self._local, 'job', None)
+        if job is not None:
+            with self.lock:
+                expired = job.status != 'running'
+                if not expired:
+                    job.processes.append(proc)
+            if expired:
+                # Сторож уже снял задачу, пока поток был занят
+                kill_process_tree(proc)
+                raise RuntimeError(f'Задача {job.job_id} снята по таймауту')
+        if not check_seconds:
+            return proc
+        try:
+            code = proc.wait(timeout=check_seconds)
+        except subprocess.TimeoutExpired:
+            return proc
+        if code != 0:
+            raise RuntimeError(f'Процесс {args} завершился с кодом {code}')
+        return proc
+
+    def _watch(self):
+        """Сторож: снятие задач по сроку независимо от опроса статуса"""
+        while self.running:
+            self.wake.clear()
+            now = time.time()
+            expired = []
+            with self.lock:
+                wait = WATCHDOG_INTERVAL
+                for job in self.jobs.values():
+                    if job.status not in ('queued', 'running'):
+                        continue
+                    if now >= job.deadline():
+                        expired.append((job, job.processes))
+                        job.processes = []
+                        self._expire(job, now)
+                    else:
+                        wait = min(wait, job.deadline() - now)
+            for job, processes in expired:
+                for proc in processes:
+                    kill_process_tree(proc)
+                self._publish(job)
+            self.wake.wait(max(wait, 0.01))
+
+    def _expire(self, job: SkillJob, now: float):
+        """Пометка задачи просроченной и замена зависшего потока (вызывать под lock)"""
+        was_running = job.status == 'running'
+        job.status = 'timeout'
+        job.error = f'Превышен таймаут {job.timeout} с'
+        job.finished_at = now
+        self.expired += 1
+        self._release(job)
+        if not was_running or job.thread not in self.workers:
+            return
+        if len(self.abandoned) >= self.max_abandoned:
+            print(f"⚠️ Навык {job.skill} завис, брошенных потоков уже {len(self.abandoned)}")
+            return
+        print(f"⚠️ Навык {job.skill} ({job.job_id}) превысил таймаут {job.timeout} с, "
+              f"поток заменён")
+        self.workers.discard(job.thread)
+        self.abandoned.add(job.thread)
+        self._start_threads()
+
+    def _trim_jobs(self):
+        """Удаление старых завершённых задач (вызывать под lock)"""
+        if len(self.jobs) < self.max_jobs_kept:
+            return
+        finished = [j for j in self.jobs.values()
+                    if j.status not in ('queued', 'running')]
+        finished.sort(key=lambda j: j.created_at)
+        for job in finished[:len(self.jobs) - self.max_jobs_kept + 1]:
+            del self.jobs[job.job_id]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Состояние задачи по ID"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            info = job.to_dict() if job is not None else None
+        if job is None:
+            # Задачу мог поставить другой процесс-обработчик
+            return self.board.get(job_id) if self.board is not None else None
+        return info
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Ожидание завершения задачи (для синхронных вызовов)"""
+        deadline = time.time() + (timeout if timeout is not None else 60)
+        while time.time() < deadline:
+            info = self.get_job(job_id)
+            if not info or info['status'] not in ('queued', 'running'):
+                return info
+            time.sleep(0.05)
+        return self.get_job(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика исполнителя"""
+        with self.lock:
+            by_status = {}
+            for job in self.jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'workers': len(self.workers),
+                'abandoned_threads': len(self.abandoned),
+                'expired': self.expired,
+                'jobs': by_status
+            }
+
+    def shutdown(self):
+        """Остановка рабочих потоков и сторожа"""
+        with self.lock:
+            self.running = False
+            workers = len(self.workers)
+        for _ in range(workers):
+            self.tasks.put(None)
+        self.wake.set()
+
+
+_default_executor = None
+_default_lock = threading.Lock()
+
+
+def get_skill_executor() -> SkillExecutor:
+    """Общий исполнитель навыков для RavenAI и NeuralCore"""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = SkillExecutor()
+        return _default_executor
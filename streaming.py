@@ -0,0 +1,46 @@
+"""
+Потоковая передача ответов: Server-Sent Events и разбиение текста на части
+"""
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+STREAM_CHUNK_WORDS = 4
+
+
+def split_response_chunks(text: str, words_per_chunk: int = STREAM_CHUNK_WORDS) -> List[str]:
+    """Разбиение ответа на части по словам (пробелы сохраняются)"""
+    if not text:
+        return []
+    chunks = []
+    words = text.split(' ')
+    for i in range(0, len(words), words_per_chunk):
+        chunk = ' '.join(words[i:i + words_per_chunk])
+        if i + words_per_chunk < len(words):
+            chunk += ' '
+        chunks.append(chunk)
+    return chunks
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Форматирование одного события SSE"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_stream(events: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[str]:
+    """Генератор SSE из пар (событие, данные); ошибки передаются событием error"""
+    try:
+        for event, data in events:
+            yield sse_event(event, data)
+    except Exception as e:
+        yield sse_event('error', {'error': str(e)})
+
+
+def sse_response(events: Iterable[Tuple[str, Dict[str, Any]]]):
+    """Flask Response с потоком событий (text/event-stream, без буферизации)"""
+    from flask import Response, stream_with_context
+
+    response = Response(stream_with_context(sse_stream(events)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -2,13 +2,14 @@
 Улучшенное распознавание речи с несколькими движками и обработкой ошибок
 """
 import speech_recognition as sr
-import vosk
 import json
 import os
 import time
 from typing import Optional
 import threading
 
+from request_metrics import timed_operation
+
 class EnhancedSTT:
     """Улучшенное распознавание речи с поддержкой офлайн/онлайн движков"""
     
@@ -31,8 +32,10 @@ class EnhancedSTT:
     def _init_vosk(self):
         """Инициализация Vosk модели"""
         try:
+            # vosk импортируется только если модель установлена
             model_path = os.path.join('models', 'vosk-model-small-ru-0.22')
             if os.path.exists(model_path):
+                import vosk
                 self.vosk_model = vosk.Model(model_path)
                 print("✅ Vosk модель загружена")
             else:
@@ -65,7 +68,8 @@ class EnhancedSTT:
                     continue
                     
                 try:
-                    result = engine_func(audio)
+                    with timed_operation(f'stt_{engine_name}'):
+                        result = engine_func(audio)
                     if result and result.strip():
                         print(f"✅ {engine_name.capitalize()}: '{result}'")
                         self.last_result = result
@@ -99,6 +103,7 @@ class EnhancedSTT:
             return None
         
         try:
+            import vosk
             audio_data = audio.get_raw_data()
             rec = vosk.KaldiRecognizer(self.vosk_model, audio.sample_rate)
             
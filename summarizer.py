@@ -0,0 +1,226 @@
+"""
+Экстрактивная суммаризация TextRank: TF-IDF предложений и степенной метод
+"""
+import math
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from text_analytics import STOP_WORDS, tokenize
+
+# numpy/scipy импортируются лениво при первой суммаризации
+np = None
+sparse = None
+SCIPY_AVAILABLE = None
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+DEFAULT_MAX_SENTENCES = 3
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+BATCH_WORKERS = 4
+# Пакеты меньше порога дешевле обработать в текущем потоке, чем передавать в процессы
+BATCH_PROCESS_CHARS = 200000
+
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+SENTENCE_END_RE = re.compile(r'([.!?…]+["»”)\]]*)\s+(?=["«“(\[]?[A-ZА-ЯЁ0-9])')
+WORD_BEFORE_RE = re.compile(r'(\w+)$', re.UNICODE)
+
+# Сокращения, после которых точка не завершает предложение
+ABBREVIATIONS = {
+    'г', 'гг', 'ул', 'им', 'стр', 'рис', 'табл', 'см', 'проф', 'акад', 'тов',
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'vs', 'no', 'fig', 'jr', 'sr'
+}
+
+
+
+def import_scipy() -> bool:
+    """Ленивый импорт numpy и scipy.sparse, возвращает доступность"""
+    global np, sparse, SCIPY_AVAILABLE
+    if SCIPY_AVAILABLE is None:
+        try:
+            import numpy as numpy_module
+            import scipy.sparse as sparse_module
+            np, sparse = numpy_module, sparse_module
+            SCIPY_AVAILABLE = True
+        except ImportError:
+            SCIPY_AVAILABLE = False
+            print("⚠️ numpy/scipy не установлены. Суммаризация по первым предложениям.")
+    return SCIPY_AVAILABLE
+
+
+def _is_abbreviation(paragraph: str, position: int) -> bool:
+    """Точка в позиции относится к сокращению или инициалу"""
+    match = WORD_BEFORE_RE.search(paragraph[max(0, position - 16):position])
+    if not match:
+        return False
+    word = match.group(1)
+    if len(word) == 1 and word.isupper():
+        return True
+    return word.lower() in ABBREVIATIONS
+
+
+def split_sentences(text: str) -> List[str]:
+    """Разбиение текста на предложения с учётом сокращений и инициалов"""
+    sentences = []
+    for paragraph in PARAGRAPH_RE.split(text):
+        start = 0
+        for match in SENTENCE_END_RE.finditer(paragraph):
+            if match.group(1) == '.' and _is_abbreviation(paragraph, match.start(1)):
+                continue
+            sentence = ' '.join(paragraph[start:match.end(1)].split())
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        sentence = ' '.join(paragraph[start:].split())
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def build_tfidf(sentences: List[str]):
+    """Разреженная матрица TF-IDF предложений (строки нормированы по L2)"""
+    vocabulary = {}
+    rows, cols, values = [], [], []
+    for row, sentence in enumerate(sentences):
+        counts = {}
+        for token in tokenize(sentence):
+            if token not in STOP_WORDS:
+                counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            col = vocabulary.setdefault(token, len(vocabulary))
+            rows.append(row)
+            cols.append(col)
+            values.append(1.0 + math.log(count))
+
+    matrix = sparse.csr_matrix(
+        (np.array(values, dtype=np.float64), (rows, cols)),
+        shape=(len(sentences), max(len(vocabulary), 1))
+    )
+
+    document_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1.0 + len(sentences)) / (1.0 + document_freq)) + 1.0
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+def textrank_scores(matrix, damping: float = DAMPING,
+                    max_iterations: int = MAX_ITERATIONS,
+                    tolerance: float = TOLERANCE):
+    """TextRank степенным методом.
+
+    Матрица сходства W = X·Xᵀ без диагонали не строится явно: произведение
+    W·v считается как X·(Xᵀ·v) - diag·v, что стоит O(nnz(X)) на итерацию.
+    """
+    count = matrix.shape[0]
+    transposed = matrix.T.tocsr()
+    self_similarity = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+
+    def similarity_dot(vector):
+        return matrix @ (transposed @ vector) - self_similarity * vector
+
+    weights = similarity_dot(np.ones(count))
+    dangling = weights <= 1e-12
+    weights[dangling] = 1.0
+
+    scores = np.full(count, 1.0 / count)
+    for _ in range(max_iterations):
+        leaked = scores[dangling].sum() / count
+        updated = (1.0 - damping) / count + damping * (
+            similarity_dot(np.where(dangling, 0.0, scores / weights)) + leaked
+        )
+        delta = np.abs(updated - scores).sum()
+        scores = updated
+        if delta < tolerance:
+            break
+    return scores
+
+
+def select_sentences(sentences: List[str], ranking: List[int],
+                     max_sentences: int, max_chars: Optional[int]) -> List[int]:
+    """Выбор лучших предложений в пределах бюджета, в порядке текста"""
+    chosen = []
+    used_chars = 0
+    for index in ranking:
+        if len(chosen) >= max_sentences:
+            break
+        length = len(sentences[index]) + (1 if chosen else 0)
+        if max_chars is not None and used_chars + length > max_chars:
+            continue
+        chosen.append(index)
+        used_chars += length
+    if not chosen and ranking:
+        chosen.append(ranking[0])
+    return sorted(chosen)
+
+
+def summarize(text: str, max_sentences: int = DEFAULT_MAX_SENTENCES,
+              max_chars: Optional[int] = None, ratio: Optional[float] = None,
+              checkpoint: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Экстрактивная суммаризация одного текста с бюджетом длины"""
+    if checkpoint:
+        checkpoint()
+    sentences = split_sentences(text)
+    if ratio is not None:
+        ratio_chars = int(len(text) * ratio)
+        max_chars = ratio_chars if max_chars is None else min(max_chars, ratio_chars)
+
+    method = 'textrank'
+    if len(sentences) <= 1:
+        ranking = list(range(len(sentences)))
+        method = 'none'
+    elif import_scipy():
+        matrix = build_tfidf(sentences)
+        if checkpoint:
+            checkpoint()
+        scores = textrank_scores(matrix)
+        ranking = [int(index) for index in np.argsort(-scores, kind='stable')]
+    else:
+        ranking = list(range(len(sentences)))
+        method = 'lead'
+
+    chosen = select_sentences(sentences, ranking, max(1, max_sentences), max_chars)
+    summary = ' '.join(sentences[index] for index in chosen) if chosen else text
+
+    return {
+        'original_length': len(text),
+        'summary_length': len(summary),
+        'reduction_percent': round((1 - len(summary) / len(text)) * 100, 1) if text else 0.0,
+        'summary': summary,
+        'sentence_count': len(sentences),
+        'selected_sentences': chosen,
+        'method': method
+    }
+
+
+def get_batch_pool(workers: int = BATCH_WORKERS) -> ProcessPoolExecutor:
+    """Общий пул процессов для пакетной суммаризации (создаётся при первом пакете)"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(max_workers=workers)
+        return _batch_pool
+
+
+def summarize_batch(texts: List[str], workers: int = BATCH_WORKERS,
+                    checkpoint: Optional[Callable[[], None]] = None,
+                    **budget) -> List[Dict[str, Any]]:
+    """Параллельная суммаризация нескольких документов"""
+    total_chars = sum(len(text) for text in texts)
+    if len(texts) <= 1 or workers <= 1 or total_chars < BATCH_PROCESS_CHARS:
+        return [summarize(text, checkpoint=checkpoint, **budget) for text in texts]
+
+    # Токенизация занимает GIL, поэтому большие пакеты считаются в процессах
+    futures = [get_batch_pool(workers).submit(summarize, text, **budget) for text in texts]
+    results = []
+    for future in futures:
+        if checkpoint:
+            checkpoint()
+        results.append(future.result())
+    return results
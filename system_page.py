@@ -8,10 +8,12 @@ from datetime import datetime
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QFrame, QGroupBox, QTableWidget,
                              QTableWidgetItem, QProgressBar, QTabWidget,
-                             QTreeWidget, QTreeWidgetItem, QSplitter)
-from PyQt6.QtCore import Qt, QTimer, QSize
+                             QTreeWidget, QTreeWidgetItem, QSplitter, QMessageBox)
+from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QFont, QColor, QBrush
 
+from ui.components.adaptive_timer import AdaptiveTimer
+
 class SystemPage(QWidget):
     """Страница мониторинга системы"""
     
@@ -312,9 +314,9 @@ class SystemPage(QWidget):
     
     def setup_timers(self):
         """Настройка таймеров обновления"""
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_system_info)
-        self.update_timer.start(2000)
+        # Пока страница скрыта или окно свёрнуто, таблица процессов не обновляется
+        self.update_timer = AdaptiveTimer(self, self.update_system_info, 2000, fast_ms=1000)
+        self.update_timer.start()
         
         self.update_system_info()
     
@@ -340,6 +342,7 @@ Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         ram = psutil.virtual_memory()
         self.ram_progress.setValue(int(ram.percent))
         self.ram_percent.setText(f"{ram.percent:.1f}%")
+        self.update_timer.observe(cpu_percent, ram.percent)
         
         disk = psutil.disk_usage('C:/' if os.name == 'nt' else '/')
         self.disk_progress.setValue(int(disk.percent))
@@ -446,10 +449,22 @@ Free: {disk_usage.free / (1024**3):.1f} GB
                     self.raven.speak(f"Error terminating process: {str(e)}")
     
     def perform_cleanup(self):
-        """Выполнить очистку системы"""
-        import gc
-        gc.collect()
-        self.raven.speak("System cleanup performed")
+        """Урезание кэшей бэкенда до бюджетов и сборка мусора (запрос к процессу Flask)"""
+        from core.memory_diagnostics import trim_backend
+        try:
+            result = trim_backend()
+        except Exception as e:
+            QMessageBox.warning(self, "Cleanup", f"Backend memory trim failed: {e}")
+            self.raven.speak("Backend is not available for cleanup")
+            return
+        freed_mb = result['freed_bytes'] / (1024 ** 2)
+        caches = ', '.join(f"{name}: {count}" for name, count in result['removed'].items() if count)
+        QMessageBox.information(
+            self, "Cleanup",
+            f"Backend memory trimmed: {freed_mb:.1f} MB freed, "
+            f"{result['gc_collected']} objects collected"
+            + (f"\nRemoved {caches}" if caches else ""))
+        self.raven.speak(f"Cleanup performed, {freed_mb:.0f} megabytes freed")
     
     def cleanup(self):
         """Очистка ресурсов"""
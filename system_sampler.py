@@ -0,0 +1,218 @@
+"""
+Фоновый сбор метрик системы: один поток опрашивает psutil, API читает снимок;
+интервал адаптивный (cadence.py): реже без клиентов, чаще на всплесках нагрузки
+"""
+import os
+import platform
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+import psutil
+
+from cadence import Cadence
+
+DEFAULT_INTERVAL = float(os.environ.get('RAVEN_SAMPLER_INTERVAL', 1.0))
+DISK_PATH = 'C:/' if platform.system() == 'Windows' else '/'
+
+
+class SystemSampler:
+    """Периодический снимок CPU/RAM/диска/сети; номер тика растёт с каждым снимком"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.cadence = Cadence(interval)
+        self.snapshot = None
+        self.tick = 0
+        self.sample_ms = 0.0
+        self.listeners = []
+        self.process = psutil.Process()
+        # Процессы бэкенда, память и потоки которых суммируются (обработчики prefork)
+        self.tracked = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+
+        # Первый вызов cpu_percent(None) задаёт точку отсчёта для следующих
+        psutil.cpu_percent(interval=None)
+
+    def sample(self) -> Dict[str, Any]:
+        """Снимок метрик (неблокирующий, CPU - с момента прошлого снимка)"""
+        start = time.perf_counter()
+        ram = psutil.virtual_memory()
+        disk = psutil.disk_usage(DISK_PATH)
+        network = psutil.net_io_counters()
+        try:
+            frequency = psutil.cpu_freq()
+        except Exception:
+            frequency = None
+        cpu_percent = psutil.cpu_percent(interval=None)
+        if self.tick:
+            # Первый замер покрывает запуск самого бэкенда - это не всплеск
+            self.cadence.observe(cpu_percent, ram.percent)
+        mode, interval = self.cadence.current()
+
+        snapshot = {
+            'cpu': {
+                'percent': cpu_percent,
+                'cores': psutil.cpu_count(),
+                'frequency': frequency.current if frequency else None
+            },
+            'ram': {
+                'percent': ram.percent,
+                'total': ram.total,
+                'used': ram.used,
+                'free': ram.free
+            },
+            'disk': {
+                'percent': disk.percent,
+                'total': disk.total,
+                'used': disk.used,
+                'free': disk.free
+            },
+            'network': {
+                'bytes_sent': network.bytes_sent if network else 0,
+                'bytes_recv': network.bytes_recv if network else 0
+            },
+            'processes': len(psutil.pids()),
+            'backend': self.sample_backend(),
+            'cadence': {'mode': mode, 'interval': interval},
+            'sampled_at': time.time(),
+            'timestamp': datetime.now().isoformat()
+        }
+        self.sample_ms = (time.perf_counter() - start) * 1000
+        return snapshot
+
+    def track(self, pid: int):
+        """Учёт процесса-обработчика в метриках бэкенда"""
+        with self.lock:
+            self.tracked.append(psutil.Process(pid))
+
+    def sample_backend(self) -> Dict[str, Any]:
+        """Память и потоки этого процесса и отслеживаемых обработчиков"""
+        with self.lock:
+            processes = [self.process] + self.tracked
+        rss = threads = alive = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+                threads += process.num_threads()
+                alive += 1
+            except psutil.Error:
+                with self.lock:
+                    if process in self.tracked:
+                        self.tracked.remove(process)
+        return {'rss': rss, 'threads': threads, 'processes': alive}
+
+    def refresh(self) -> Dict[str, Any]:
+        """Новый снимок, оповещение подписчиков"""
+        snapshot = self.sample()
+        with self.lock:
+            self.snapshot = snapshot
+            self.tick += 1
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"⚠️ Ошибка подписчика сэмплера: {e}")
+        return snapshot
+
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]):
+        """Вызов listener(snapshot) после каждого тика"""
+        with self.lock:
+            self.listeners.append(listener)
+
+    @property
+    def interval(self) -> float:
+        """Интервал обычного режима"""
+        return self.cadence.interval
+
+    @interval.setter
+    def interval(self, value: float):
+        self.cadence.interval = value
+        self.wake_event.set()
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Последний снимок (при первом обращении снимается синхронно); чтение - спрос
+        для адаптивного интервала"""
+        self.start()
+        woke = self.cadence.touch()
+        with self.lock:
+            snapshot = self.snapshot
+        if snapshot is None:
+            return self.refresh()
+        if woke:
+            # После простоя снимок мог устареть на интервал простоя - первый клиент
+            # получает свежий, поток сэмплера возвращается к обычному интервалу
+            self.wake_event.set()
+            if time.time() - snapshot['sampled_at'] > self.cadence.interval * 2:
+                return self.refresh()
+        return snapshot
+
+    def start(self):
+        """Запуск фонового потока (повторные вызовы ничего не делают)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._loop, name='system-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Остановка фонового потока"""
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            interval = self.cadence.current()[1]
+            if interval is None:
+                # Опрос остановлен (idle_interval=None): ждём пробуждения от клиента,
+                # режим пересматривается с обычным интервалом ради спроса из prefork
+                self.wake_event.wait(self.cadence.interval)
+                self.wake_event.clear()
+                continue
+            with self.lock:
+                sampled_at = self.snapshot['sampled_at'] if self.snapshot else 0.0
+            age = time.time() - sampled_at
+            if age >= interval * 0.95:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠️ Ошибка сбора метрик: {e}")
+                age = 0.0
+            # Режим пересматривается не реже обычного интервала: спрос из других
+            # процессов (prefork) приходит без wake_event
+            self.wake_event.wait(min(interval - age, self.cadence.interval))
+            self.wake_event.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Состояние сэмплера и режим интервала"""
+        cadence = self.cadence.get_stats()
+        return {
+            'interval_seconds': cadence['interval_seconds'],
+            'tick': self.tick,
+            'last_sample_ms': round(self.sample_ms, 2),
+            'running': self.thread is not None and not self.stop_event.is_set(),
+            'cadence': cadence
+        }
+
+
+_default_sampler = None
+_default_lock = threading.Lock()
+
+
+def get_system_sampler() -> SystemSampler:
+    """Общий сэмплер системы; в обработчике prefork - читатель общего снимка"""
+    global _default_sampler
+    with _default_lock:
+        if _default_sampler is None:
+            segment = os.environ.get('RAVEN_SHARED_METRICS')
+            if segment:
+                from shared_metrics import SharedSnapshotReader
+                # Обработчики запущены главным процессом и делят с ним resource_tracker
+                _default_sampler = SharedSnapshotReader(segment, untrack=False)
+            else:
+                _default_sampler = SystemSampler()
+        return _default_sampler
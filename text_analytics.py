@@ -0,0 +1,249 @@
+"""
+Потоковый анализ текста за один проход с постоянным потреблением памяти
+"""
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List
+
+POSITIVE_WORDS = ['хорошо', 'отлично', 'прекрасно', 'спасибо', 'люблю']
+NEGATIVE_WORDS = ['плохо', 'ужасно', 'ненавижу', 'разочарован']
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+READ_CHUNK_BYTES = 64 * 1024
+MAX_CARRY_CHARS = 64 * 1024
+
+# Служебные слова: не несут смысла для ранжирования (суммаризация, индекс знаний)
+STOP_WORDS = {
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а', 'то',
+    'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же', 'вы', 'за',
+    'бы', 'по', 'только', 'ее', 'её', 'мне', 'было', 'вот', 'от', 'меня', 'еще',
+    'ещё', 'нет', 'о', 'из', 'ему', 'это', 'этот', 'эта', 'эти', 'для', 'при',
+    'или', 'ли', 'если', 'уже', 'до', 'они', 'мы', 'их', 'был', 'была', 'были',
+    'the', 'a', 'an', 'and', 'or', 'of', 'to', 'in', 'on', 'at', 'is', 'are',
+    'was', 'were', 'be', 'it', 'this', 'that', 'for', 'with', 'as', 'by', 'from'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова текста в нижнем регистре без однобуквенных (индекс знаний, суммаризация)"""
+    return [token for token in TOKEN_RE.findall(text.lower()) if len(token) > 1]
+
+
+class StreamingTextAnalyzer:
+    """Подсчёт слов, предложений и тональности по лексикону за один проход"""
+
+    def __init__(self, positive_words: Iterable[str] = POSITIVE_WORDS,
+                 negative_words: Iterable[str] = NEGATIVE_WORDS):
+        self.lexicon = {}
+        for word in positive_words:
+            self.lexicon[word] = 'positive'
+        for word in negative_words:
+            self.lexicon[word] = 'negative'
+        # Слова лексикона сравниваются с началом токена (учёт словоформ)
+        self.prefix_lengths = sorted({len(word) for word in self.lexicon})
+
+        self.carry = ''
+        self.character_count = 0
+        self.word_count = 0
+        self.sentence_count = 0
+        self.found = {'positive': set(), 'negative': set()}
+        self.hits = {'positive': 0, 'negative': 0}
+
+    def feed(self, chunk: str):
+        """Обработка очередного фрагмента текста"""
+        if not chunk:
+            return
+        self.character_count += len(chunk)
+        self.sentence_count += chunk.count('.') + chunk.count('!') + chunk.count('?')
+
+        text = self.carry + chunk
+        # Незавершённое слово в конце переносится в следующий фрагмент
+        if not text[-1].isspace():
+            cut = max(text.rfind(' '), text.rfind('\n'), text.rfind('\t'), text.rfind('\r'))
+            if cut >= 0 and len(text) - cut <= MAX_CARRY_CHARS:
+                self.carry = text[cut + 1:]
+                text = text[:cut + 1]
+            elif cut < 0 and len(text) <= MAX_CARRY_CHARS:
+                self.carry = text
+                return
+            else:
+                self.carry = ''
+        else:
+            self.carry = ''
+
+        self._process(text)
+
+    def _process(self, text: str):
+        """Подсчёт по завершённой части текста"""
+        self.word_count += len(text.split())
+        lexicon = self.lexicon
+        lengths = self.prefix_lengths
+        for match in TOKEN_RE.finditer(text.lower()):
+            token = match.group()
+            for length in lengths:
+                if length > len(token):
+                    break
+                polarity = lexicon.get(token[:length])
+                if polarity:
+                    self.found[polarity].add(token[:length])
+                    self.hits[polarity] += 1
+                    break
+
+    def finish(self) -> Dict[str, Any]:
+        """Завершение анализа и итоговые показатели"""
+        if self.carry:
+            self._process(self.carry)
+            self.carry = ''
+
+        positive_count = len(self.found['positive'])
+        negative_count = len(self.found['negative'])
+        sentiment = 'neutral'
+        if positive_count > negative_count:
+            sentiment = 'positive'
+        elif negative_count > positive_count:
+            sentiment = 'negative'
+
+        return {
+            'word_count': self.word_count,
+            'character_count': self.character_count,
+            'sentence_count': self.sentence_count,
+            'reading_time_minutes': round(self.word_count / 200, 1),  # 200 слов в минуту
+            'sentiment': sentiment,
+            'positive_words': positive_count,
+            'negative_words': negative_count,
+            'positive_hits': self.hits['positive'],
+            'negative_hits': self.hits['negative']
+        }
+
+
+def decode_stream(stream, chunk_size: int = READ_CHUNK_BYTES,
+                  encoding: str = 'utf-8') -> Iterator[str]:
+    """Инкрементальное декодирование бинарного потока (например, request.stream)"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class JSONStringFieldStream:
+    """Извлечение строкового поля JSON по частям без загрузки всего документа"""
+
+    def __init__(self, field: str = 'text'):
+        self.key = '"' + field + '"'
+        self.state = 'search'  # search, colon, value, done
+        self.buffer = ''
+        self.found = False
+
+    def feed(self, chunk: str) -> str:
+        """Очередной фрагмент JSON; возвращает декодированную часть значения поля"""
+        if self.state == 'done':
+            return ''
+        data = self.buffer + chunk
+        self.buffer = ''
+        position = 0
+
+        if self.state == 'search':
+            index = data.find(self.key)
+            if index < 0:
+                # Ключ может быть разрезан границей фрагмента
+                self.buffer = data[-len(self.key):]
+                return ''
+            position = index + len(self.key)
+            self.state = 'colon'
+
+        if self.state == 'colon':
+            while position < len(data) and data[position] in ' \t\r\n:':
+                position += 1
+            if position >= len(data):
+                return ''
+            if data[position] != '"':
+                # Поле не строковое - ищем следующее вхождение ключа
+                self.state = 'search'
+                return self.feed(data[position:])
+            position += 1
+            self.state = 'value'
+            self.found = True
+
+        raw = data[position:]
+        end = find_closing_quote(raw)
+        if end >= 0:
+            self.state = 'done'
+            return decode_json_string(raw[:end])
+
+        # Незавершённая escape-последовательность ждёт следующего фрагмента
+        cut = complete_escape_boundary(raw)
+        self.buffer = raw[cut:]
+        return decode_json_string(raw[:cut])
+
+
+def find_closing_quote(raw: str) -> int:
+    """Позиция неэкранированной кавычки или -1"""
+    position = raw.find('"')
+    while position >= 0:
+        slashes = 0
+        while position - slashes > 0 and raw[position - slashes - 1] == '\\':
+            slashes += 1
+        if slashes % 2 == 0:
+            return position
+        position = raw.find('"', position + 1)
+    return -1
+
+
+def complete_escape_boundary(raw: str) -> int:
+    """Длина префикса, не обрывающегося внутри escape или суррогатной пары"""
+    cut = len(raw)
+    while True:
+        backslash = raw.rfind('\\', max(0, cut - 12), cut)
+        if backslash < 0:
+            return cut
+        slashes = 0
+        while backslash - slashes > 0 and raw[backslash - slashes - 1] == '\\':
+            slashes += 1
+        if slashes % 2 == 1:
+            # Последний слэш сам экранирован - последовательность завершена
+            return cut
+        rest = raw[backslash:cut]
+        incomplete = len(rest) < 2 or (rest[1] == 'u' and len(rest) < 6)
+        high_surrogate = (len(rest) == 6 and rest[1] == 'u'
+                          and rest[2] in 'dD' and rest[3] in '89abAB')
+        if not (incomplete or high_surrogate):
+            return cut
+        cut = backslash
+
+
+def decode_json_string(raw: str) -> str:
+    """Декодирование содержимого строки JSON (без кавычек)"""
+    if not raw:
+        return ''
+    if '\\' not in raw:
+        return raw
+    return json.loads('"' + raw + '"', strict=False)
+
+
+def analyze_text_stream(chunks: Iterable[str], checkpoint=None) -> Dict[str, Any]:
+    """Анализ последовательности фрагментов текста"""
+    analyzer = StreamingTextAnalyzer()
+    for chunk in chunks:
+        if checkpoint:
+            checkpoint()
+        analyzer.feed(chunk)
+    return analyzer.finish()
+
+
+def iter_json_field(chunks: Iterable[str], field: str = 'text') -> Iterator[str]:
+    """Части строкового поля из потока JSON"""
+    extractor = JSONStringFieldStream(field)
+    for chunk in chunks:
+        part = extractor.feed(chunk)
+        if part:
+            yield part
+        if extractor.state == 'done':
+            break
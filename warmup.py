@@ -0,0 +1,146 @@
+"""
+Отложенная загрузка тяжёлых компонентов и отчёт о времени импорта
+"""
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional
+
+PROCESS_START = time.time()
+
+
+class Component:
+    """Компонент с отложенной инициализацией"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], depends: Iterable[str] = ()):
+        self.name = name
+        self.loader = loader
+        self.depends = list(depends)
+        self.state = 'pending'  # pending, loading, ready, failed, disabled
+        self.value = None
+        self.error = None
+        self.duration_ms = None
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Состояние компонента для /api/ready"""
+        return {
+            'state': self.state,
+            'duration_ms': self.duration_ms,
+            'error': self.error
+        }
+
+
+class WarmupManager:
+    """Реестр компонентов: загрузка при первом использовании или фоновый прогрев"""
+
+    def __init__(self):
+        self.components = OrderedDict()
+        self.import_times = OrderedDict()
+        self.warmup_thread = None
+
+    def timed_import(self, module_name: str):
+        """Импорт модуля с замером времени для отчёта"""
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if module_name not in self.import_times:
+            self.import_times[module_name] = round((time.perf_counter() - start) * 1000, 1)
+        return module
+
+    @contextmanager
+    def timing(self, label: str):
+        """Замер времени блока импортов для отчёта"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.import_times[label] = round((time.perf_counter() - start) * 1000, 1)
+
+    def register(self, name: str, loader: Callable[[], Any], depends: Iterable[str] = ()):
+        """Регистрация компонента"""
+        self.components[name] = Component(name, loader, depends)
+
+    def disable(self, name: str, reason: str):
+        """Отключение компонента (не будет загружаться)"""
+        component = self.components[name]
+        component.state = 'disabled'
+        component.error = reason
+
+    def get(self, name: str) -> Optional[Any]:
+        """Значение компонента; загружает его синхронно при первом обращении"""
+        component = self.components[name]
+        if component.state == 'ready':
+            return component.value
+        if component.state in ('failed', 'disabled'):
+            return None
+
+        for dependency in component.depends:
+            if self.get(dependency) is None and \
+                    self.components[dependency].state != 'ready':
+                with component.lock:
+                    if component.state in ('pending', 'loading'):
+                        component.state = 'failed'
+                        component.error = f'Зависимость {dependency} недоступна'
+                return None
+
+        with component.lock:
+            if component.state in ('pending', 'loading'):
+                component.state = 'loading'
+                start = time.perf_counter()
+                try:
+                    component.value = component.loader()
+                    component.state = 'ready'
+                except Exception as e:
+                    component.state = 'failed'
+                    component.error = str(e)
+                    print(f"⚠️ Компонент {name} не загружен: {e}")
+                component.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        return component.value
+
+    def is_ready(self, name: str) -> bool:
+        """Загружен ли компонент"""
+        return self.components[name].state == 'ready'
+
+    def warm_up(self, names: Optional[Iterable[str]] = None):
+        """Синхронная загрузка компонентов"""
+        for name in (names or list(self.components)):
+            self.get(name)
+
+    def start_background(self, names: Optional[Iterable[str]] = None,
+                         on_done: Optional[Callable[[], None]] = None):
+        """Фоновый прогрев компонентов"""
+        if self.warmup_thread and self.warmup_thread.is_alive():
+            return
+        names = list(names or self.components)
+
+        def run():
+            self.warm_up(names)
+            if on_done:
+                on_done()
+
+        self.warmup_thread = threading.Thread(target=run, daemon=True, name='raven-warmup')
+        self.warmup_thread.start()
+
+    def all_settled(self) -> bool:
+        """Все компоненты загружены, отключены или завершились ошибкой"""
+        return all(c.state in ('ready', 'failed', 'disabled') for c in self.components.values())
+
+    def report(self) -> Dict[str, Any]:
+        """Отчёт о состоянии прогрева"""
+        return {
+            'components': {name: c.to_dict() for name, c in self.components.items()},
+            'imports_ms': dict(self.import_times),
+            'uptime_s': round(time.time() - PROCESS_START, 2)
+        }
+
+    def format_import_report(self) -> str:
+        """Текстовый отчёт о времени импорта (самые медленные сверху)"""
+        lines = ["⏱️ Время импорта модулей:"]
+        for module, ms in sorted(self.import_times.items(), key=lambda item: -item[1]):
+            lines.append(f"   {module:<24} {ms:>8.1f} ms")
+        for name, component in self.components.items():
+            if component.duration_ms is not None:
+                lines.append(f"   [{name}] {component.state} за {component.duration_ms} ms")
+        return '\n'.join(lines)